@@ -0,0 +1,147 @@
+"""
+Block-page (CAPTCHA / bot wall) detection.
+
+Checks run cheapest first and stop at the first conclusive signal:
+
+1. the URL: challenge redirects such as /captcha or risk/verify;
+2. DOM markers: CAPTCHA widgets and challenge forms, found by XPath;
+3. content: the product or listing markup the caller is waiting for, which a block
+   page never has;
+4. the title: "Verify you are human", "Access denied", ... (checked after content,
+   so a product named "Captcha Print Tee" is not a block page).
+
+In a browser, steps 1-4 come from one small execute_script call (PROBE_SCRIPT) rather
+than the full page_source. Only when none of them is conclusive, as with an empty or
+unfamiliar page, does the detector read the whole document and look for block
+phrases in its visible text. Whole phrases are used, never single words like
+"verify" that product descriptions contain. detect_html runs the same steps over
+HTML that is already in hand (the HTTP fast path and the fixture corpus), on a tree
+the caller has parsed already when it passes one; the tree is never modified.
+"""
+import re
+
+from lxml import etree
+
+from extraction import XPATHS, parse_page
+
+# Whole path segments, so a product called "Challenge Cup" (/challenge-cup-p-1.html) doesn't match
+BLOCK_URL_RE = re.compile(r"/(captcha|challenge|cdn-cgi/challenge-platform|sec/verify|risk/verify)(/|\?|#|\.|$)")
+BLOCK_TITLE_MARKERS = (
+    "captcha", "access denied", "security check", "bot detection", "verify you are human",
+    "are you a robot", "just a moment", "attention required", "robot check", "request blocked",
+)
+BLOCK_DOM_MARKERS = {
+    "captcha_container": "//*[@id='captcha-container' or @id='captcha' or @id='px-captcha']",
+    "geetest": "//*[contains(@class, 'geetest_')]",
+    "captcha_iframe": "//iframe[contains(@src, 'captcha') or contains(@src, 'challenge')]",
+    "challenge_form": "//*[@id='challenge-form' or @id='cf-challenge-running' or @id='challenge-running']",
+    "risk_verify": "//*[contains(@class, 'risk-verify') or contains(@id, 'risk-verify')]",
+}
+# Markup of the pages the scraper expects; any of it means the page is not a block page
+CONTENT_MARKERS = {key: XPATHS[key] for key in ("product_title", "product_link")}
+# Fallback: whole phrases in the visible text of a page none of the cheap checks settled
+BLOCK_PHRASES = (
+    "complete the captcha", "verify you are human", "verify that you are human", "are you a robot",
+    "unusual traffic", "press and hold", "access denied", "request blocked", "too many requests",
+    "checking your browser", "enable javascript and cookies to continue",
+)
+
+# Returns the cheap signals in one round trip: arguments[0] is [[name, xpath], ...] of
+# block markers, arguments[1] the content XPaths
+PROBE_SCRIPT = """
+var found = function (path) {
+  try {
+    return document.evaluate(path, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null)
+      .singleNodeValue !== null;
+  } catch (e) {
+    return false;
+  }
+};
+return {
+  url: location.href,
+  title: document.title || '',
+  markers: arguments[0].filter(function (m) { return found(m[1]); }).map(function (m) { return m[0]; }),
+  content: arguments[1].some(found)
+};
+"""
+
+_COMPILED_MARKERS = {name: etree.XPath(xpath) for name, xpath in BLOCK_DOM_MARKERS.items()}
+_COMPILED_CONTENT = {key: etree.XPath(xpath) for key, xpath in CONTENT_MARKERS.items()}
+_VISIBLE_TEXT = etree.XPath(
+    "//text()[not(ancestor::script or ancestor::style or ancestor::noscript or ancestor::template)]"
+)
+_TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.I | re.S)
+
+
+class Verdict:
+    """`blocked` is True/False, or None while only the cheap checks have run and were inconclusive"""
+
+    def __init__(self, blocked, signal, detail='', content=False):
+        self.blocked = blocked
+        # url / dom / content / title / text / none
+        self.signal = signal
+        self.detail = detail
+        self.content = content
+
+    def __repr__(self):
+        return f"Verdict(blocked={self.blocked!r}, signal={self.signal!r}, detail={self.detail!r})"
+
+
+def classify(url, title, markers, content):
+    """Verdict from the cheap signals; blocked is None when they don't settle it"""
+    match = BLOCK_URL_RE.search((url or '').lower())
+    if match:
+        return Verdict(True, "url", match.group(1))
+    if markers:
+        return Verdict(True, "dom", markers[0])
+    if content:
+        return Verdict(False, "content", content=True)
+    lowered = " ".join((title or '').lower().split())
+    for marker in BLOCK_TITLE_MARKERS:
+        if marker in lowered:
+            return Verdict(True, "title", marker)
+    return Verdict(None, "none")
+
+
+def text_verdict(doc):
+    """Fallback over the visible text of a parsed document"""
+    if doc is None:
+        return Verdict(False, "none")
+    text = " ".join(" ".join(_VISIBLE_TEXT(doc)).lower().split())
+    for phrase in BLOCK_PHRASES:
+        if phrase in text:
+            return Verdict(True, "text", phrase)
+    return Verdict(False, "none")
+
+
+def probe(driver, content_keys=None):
+    """The cheap signals of the page open in `driver`, from one script call"""
+    content = [CONTENT_MARKERS[k] for k in (content_keys or CONTENT_MARKERS)]
+    return driver.execute_script(PROBE_SCRIPT, [list(item) for item in BLOCK_DOM_MARKERS.items()], content)
+
+
+def detect_driver(driver, content_keys=None, signals=None):
+    """Verdict for the page open in `driver`; reads page_source only if the probe is inconclusive"""
+    signals = signals or probe(driver, content_keys)
+    verdict = classify(signals.get("url"), signals.get("title"), signals.get("markers"), signals.get("content"))
+    if verdict.blocked is None:
+        verdict = text_verdict(parse_page(driver.page_source))
+    return verdict
+
+
+def detect_html(page_source, url='', content_keys=None, cheap_only=False, doc=None):
+    """Verdict for HTML already in hand (`doc`: the same page, parsed); `cheap_only` skips the text fallback"""
+    if doc is None:
+        doc = parse_page(page_source)
+    if doc is None:
+        verdict = classify(url, '', [], False)
+        return verdict if verdict.blocked is not None or cheap_only else Verdict(False, "none")
+    match = _TITLE_RE.search(page_source[:8192]) if isinstance(page_source, str) else None
+    title = match.group(1) if match else ''
+    markers = [name for name, xpath in _COMPILED_MARKERS.items() if xpath(doc)]
+    content = any(_COMPILED_CONTENT[k](doc) for k in (content_keys or CONTENT_MARKERS))
+    verdict = classify(url, title, markers, content)
+    if verdict.blocked is None and not cheap_only:
+        verdict = text_verdict(doc)
+    return verdict
+
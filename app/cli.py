@@ -0,0 +1,132 @@
+"""
+Headless batch runner: scrape categories without the web app.
+
+    python app/cli.py categories.txt > products.jsonl
+    python app/cli.py - --db shein_scraper.db --workers 4 -o products.jsonl < categories.txt
+
+Category URLs are read one per line from a file or stdin ("-"); blank lines and lines
+starting with # are skipped. Each product is written as one JSON line as soon as it
+has been extracted. With --db the run also keeps its products, frontier and proxy
+cache in that database, so repeat runs skip products that are still fresh. Without it
+the crawl state lives in a scratch database that is removed afterwards. A summary goes
+to stderr. The exit status is 0 once every category has been processed, 1 after an
+error or a CAPTCHA, and 130 when interrupted.
+
+Only the standard library is imported until a scrape actually starts, so --help
+returns at once. The scraper (main.py) loads Selenium only when it launches a browser.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+
+def read_categories(source):
+    lines = sys.stdin if source == "-" else open(source, encoding="utf8")
+    try:
+        urls = [line.strip() for line in lines]
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+    return list(dict.fromkeys(url for url in urls if url and not url.startswith("#")))
+
+
+class JsonLines:
+    """Thread-safe JSONL sink; every product is flushed as it arrives"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def write(self, record):
+        line = json.dumps(record) + "\n"
+        with self.lock:
+            self.stream.write(line)
+            self.stream.flush()
+            self.count += 1
+
+
+def run(args):
+    from network_policy import resolve_policy
+
+    categories = read_categories(args.source)
+    if not categories:
+        print("No category URLs given", file=sys.stderr)
+        return 2
+    try:
+        resolve_policy(args.network)
+    except (TypeError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    scratch = None if args.db else tempfile.mkdtemp(prefix="shein-cli-")
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf8")
+    try:
+        import main
+        from jobs import Job, bound
+
+        main.init_db(args.db or os.path.join(scratch, "state.db"))
+        sink = JsonLines(out)
+        job = Job({
+            "category_urls": categories,
+            "network": args.network,
+            "download_images": args.download_images or None,
+        }, main.STATUS_DEFAULTS)
+        job.on_product = lambda data: sink.write(dict(data, category_url=main.get_status("current_category")))
+        workers = args.workers or main.DEFAULT_WORKERS
+        freshness = main.FRESHNESS_TTL_HOURS if args.freshness_hours is None else args.freshness_hours
+
+        def scrape():
+            try:
+                main.scraper_job(categories, use_proxies=args.use_proxies, workers=workers,
+                                 freshness_hours=freshness, fetch_mode=args.fetch_mode)
+            except Exception as e:
+                job.status.update(status="Error", error=f"Error: {e}")
+
+        started = time.monotonic()
+        runner = threading.Thread(target=bound(scrape, job), daemon=True)
+        runner.start()
+        interrupted = False
+        try:
+            while runner.is_alive():
+                runner.join(0.5)
+        except KeyboardInterrupt:
+            # Cancel cooperatively so queued rows are still committed before exiting
+            interrupted = True
+            print("Interrupted - finishing the pages in flight", file=sys.stderr)
+            job.cancelled.set()
+            job.unpaused.set()
+            runner.join()
+        status = job.status
+        print(f"{status['status']}: {sink.count} products from {len(categories)} categories in "
+              f"{time.monotonic() - started:.1f}s ({status['products_skipped_fresh']} skipped as fresh, "
+              f"{status['retries']} retries, {status['dead_letters']} failed)", file=sys.stderr)
+        if status["error"]:
+            print(status["error"], file=sys.stderr)
+        if interrupted:
+            return 130
+        return 0 if status["status"] == "Completed" else 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", nargs="?", default="-", help="File of category URLs, one per line (- for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file (default: stdout)")
+    parser.add_argument("--db", help="Also store products and crawl state in this SQLite database")
+    parser.add_argument("--workers", type=int, help="Product workers, one browser each (default: main.DEFAULT_WORKERS)")
+    parser.add_argument("--fetch-mode", choices=("browser", "http"), default="browser")
+    parser.add_argument("--freshness-hours", type=float,
+                        help="Skip products scraped within this many hours (needs --db; default: main.FRESHNESS_TTL_HOURS)")
+    parser.add_argument("--use-proxies", action="store_true")
+    parser.add_argument("--network", help="Network policy preset (network_policy.POLICIES)")
+    parser.add_argument("--download-images", action="store_true")
+    sys.exit(run(parser.parse_args()))
@@ -0,0 +1,127 @@
+"""
+Single-writer thread for SQLite.
+
+Scraper workers hand (sql, params) pairs to a bounded queue; one thread owning a
+persistent WAL-mode connection drains it and commits them with executemany, one
+transaction per batch, flushing when `batch_size` rows are pending or
+`flush_interval` seconds have passed. If a batch fails, each unit queued with put()
+or put_many() is retried in its own transaction, so only the units that fail again
+are lost. Those are counted and passed to `on_error` instead of being dropped.
+"""
+import queue
+import sqlite3
+import threading
+import time
+
+_STOP = object()
+
+
+def configure_connection(conn):
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+class BatchWriter(threading.Thread):
+    def __init__(self, db_path, batch_size=200, flush_interval=1.0, max_queue=2000, on_error=None,
+                 on_flush=None):
+        super().__init__(name="sqlite-writer", daemon=True)
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_error = on_error
+        # Called with (seconds, rows) after every committed batch
+        self.on_flush = on_flush
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.batches = 0
+        self.errors = []
+
+    def put(self, sql, params):
+        # Blocks when the queue is full so producers can't outrun the disk
+        self.queue.put([(sql, params)])
+
+    def put_many(self, statements):
+        """Queue statements that must land in the same transaction"""
+        self.queue.put(list(statements))
+
+    def close(self, timeout=None):
+        """Flush everything queued so far and stop the thread"""
+        if self.is_alive():
+            self.queue.put(_STOP)
+            self.join(timeout)
+        return self.stats()
+
+    def stats(self):
+        return {
+            "rows_written": self.rows_written,
+            "rows_failed": self.rows_failed,
+            "batches": self.batches,
+            "errors": self.errors[-5:],
+        }
+
+    def run(self):
+        conn = configure_connection(sqlite3.connect(self.db_path))
+        # One list of statements per put()/put_many() call
+        pending = []
+        rows = 0
+        deadline = time.monotonic() + self.flush_interval
+        try:
+            while True:
+                try:
+                    item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    item = None
+                if item is _STOP:
+                    break
+                if item is not None:
+                    pending.append(item)
+                    rows += len(item)
+                if rows >= self.batch_size or time.monotonic() >= deadline:
+                    self._flush(conn, pending)
+                    pending = []
+                    rows = 0
+                    deadline = time.monotonic() + self.flush_interval
+            self._flush(conn, pending)
+        finally:
+            conn.close()
+
+    def _flush(self, conn, pending):
+        if not pending:
+            return
+        started = time.perf_counter()
+        statements = [statement for unit in pending for statement in unit]
+        try:
+            self._commit(conn, statements)
+            written = len(statements)
+        except sqlite3.Error:
+            # Find the offending units: the others still land, one transaction each
+            written = 0
+            for unit in pending:
+                try:
+                    self._commit(conn, unit)
+                    written += len(unit)
+                except sqlite3.Error as e:
+                    self.rows_failed += len(unit)
+                    self.errors.append(str(e))
+                    if self.on_error:
+                        self.on_error(e, len(unit))
+        if written:
+            self.rows_written += written
+            self.batches += 1
+            if self.on_flush:
+                self.on_flush(time.perf_counter() - started, written)
+
+    def _commit(self, conn, statements):
+        # Group consecutive rows sharing a statement so each group is one executemany
+        groups = []
+        for sql, params in statements:
+            if groups and groups[-1][0] == sql:
+                groups[-1][1].append(params)
+            else:
+                groups.append((sql, [params]))
+        with conn:
+            for sql, rows in groups:
+                conn.executemany(sql, rows)
@@ -0,0 +1,163 @@
+"""
+Warm pool of Chrome drivers.
+
+The chromedriver binary is resolved once per process and browsers are kept
+running between uses, keyed by the proxy and launch profile (e.g. a network
+policy) they were started with, since neither can be changed afterwards. A released browser has its cookies,
+cache and site storage wiped and gets a fresh user agent before it is handed out
+again; it is quit instead once it has served `max_pages` pages, its JS heap has
+grown past `max_heap_mb`, or it has sat idle longer than `idle_ttl` seconds.
+"""
+import functools
+import threading
+import time
+from urllib.parse import urlparse
+
+
+@functools.lru_cache(maxsize=1)
+def chromedriver_path():
+    from webdriver_manager.chrome import ChromeDriverManager
+    return ChromeDriverManager().install()
+
+
+class PooledDriver:
+    def __init__(self, driver, proxy, profile=None):
+        self.driver = driver
+        self.proxy = proxy
+        self.profile = profile
+        self.pages = 0
+        self.created = time.monotonic()
+        self.last_used = self.created
+
+
+class DriverPool:
+    def __init__(self, factory, size=4, max_pages=100, max_heap_mb=768, idle_ttl=600,
+                 user_agent_factory=None):
+        self.factory = factory
+        self.size = size
+        self.max_pages = max_pages
+        self.max_heap_mb = max_heap_mb
+        self.idle_ttl = idle_ttl
+        self.user_agent_factory = user_agent_factory
+        self.lock = threading.Lock()
+        self.idle = []
+        self.in_use = {}
+        self.launched = 0
+        self.reused = 0
+        self.recycled = 0
+
+    def prewarm(self, proxies, profile=None):
+        """Launch one browser per entry in `proxies` in parallel and park them in the pool"""
+        def launch(proxy):
+            try:
+                record = PooledDriver(self.factory(proxy, profile), proxy, profile)
+            except Exception:
+                return
+            with self.lock:
+                self.launched += 1
+                self.idle.append(record)
+        threads = [threading.Thread(target=launch, args=(p,), daemon=True) for p in proxies]
+        for thr in threads:
+            thr.start()
+        for thr in threads:
+            thr.join()
+
+    def acquire(self, proxy=None, profile=None):
+        """A browser launched with `proxy` and `profile` (passed to the factory as is)"""
+        with self.lock:
+            self._reap_idle()
+            for i, record in enumerate(self.idle):
+                if record.proxy == proxy and record.profile == profile:
+                    self.idle.pop(i)
+                    self.in_use[id(record.driver)] = record
+                    self.reused += 1
+                    return record.driver
+        record = PooledDriver(self.factory(proxy, profile), proxy, profile)
+        with self.lock:
+            self.launched += 1
+            self.in_use[id(record.driver)] = record
+        return record.driver
+
+    def release(self, driver, pages=1, broken=False):
+        with self.lock:
+            record = self.in_use.pop(id(driver), None)
+        if record is None:
+            _quit(driver)
+            return
+        record.pages += pages
+        record.last_used = time.monotonic()
+        if broken or self._needs_recycle(record) or not self._reset(record):
+            with self.lock:
+                self.recycled += 1
+            _quit(driver)
+            return
+        with self.lock:
+            if len(self.idle) < self.size:
+                self.idle.append(record)
+                return
+        _quit(driver)
+
+    def close(self):
+        with self.lock:
+            records = self.idle + list(self.in_use.values())
+            self.idle = []
+            self.in_use = {}
+        for record in records:
+            _quit(record.driver)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "idle": len(self.idle),
+                "in_use": len(self.in_use),
+                "launched": self.launched,
+                "reused": self.reused,
+                "recycled": self.recycled,
+            }
+
+    def _reap_idle(self):
+        now = time.monotonic()
+        stale = [r for r in self.idle if now - r.last_used > self.idle_ttl]
+        for record in stale:
+            self.idle.remove(record)
+            _quit(record.driver)
+
+    def _needs_recycle(self, record):
+        if record.pages >= self.max_pages:
+            return True
+        if not self.max_heap_mb:
+            return False
+        try:
+            record.driver.execute_cdp_cmd("Performance.enable", {})
+            metrics = record.driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+            heap = next((m["value"] for m in metrics if m["name"] == "JSHeapTotalSize"), 0)
+            return heap / (1024 * 1024) > self.max_heap_mb
+        except Exception:
+            return False
+
+    def _reset(self, record):
+        """Wipe cookies, cache and storage left by the previous user; False if the browser is unusable"""
+        driver = record.driver
+        try:
+            current = urlparse(driver.current_url)
+            if current.scheme in ("http", "https"):
+                driver.execute_cdp_cmd("Storage.clearDataForOrigin", {
+                    "origin": f"{current.scheme}://{current.netloc}",
+                    "storageTypes": "all",
+                })
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+            driver.delete_all_cookies()
+            if self.user_agent_factory:
+                driver.execute_cdp_cmd("Network.setUserAgentOverride", {"userAgent": self.user_agent_factory()})
+            driver.get("about:blank")
+            return True
+        except Exception:
+            return False
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
@@ -0,0 +1,191 @@
+"""
+Streaming product exports.
+
+Rows are read from the database in fetchmany() chunks and serialized straight into
+the HTTP response, so nothing is written to disk and the first bytes go out as
+soon as the first chunk is encoded. CSV and JSONL need only the standard library;
+Parquet and Arrow IPC use pyarrow when it is installed.
+"""
+import csv
+import io
+import json
+import sqlite3
+import zlib
+from datetime import datetime
+
+CSV_HEADER = ['title', 'price', 'color', 'size', 'description', 'images', 'product_url']
+EXPORT_COLUMNS = ['product_url', 'title', 'price', 'color', 'size', 'description', 'images',
+                  'category_url', 'currency', 'price_current', 'price_original', 'scraped_at']
+FORMATS = {
+    # format: (mimetype, file extension)
+    "csv": ("text/csv", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+CHUNK_ROWS = 500
+
+
+def parse_since(value):
+    """Epoch seconds or an ISO 8601 timestamp -> epoch seconds"""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError as e:
+        raise ValueError(f"Invalid since timestamp: {value}") from e
+
+
+def iter_row_chunks(db_path, since=None, chunk_rows=CHUNK_ROWS):
+    """Yield lists of product rows as dicts; `since` keeps rows scraped at or after that time"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        sql = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM products"
+        params = ()
+        if since is not None:
+            sql += " WHERE scraped_at >= ?"
+            params = (since,)
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                return
+            yield [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def flatten_description(description):
+    # For description, flatten JSON into key:value; for color/size/images, use as string
+    try:
+        return "; ".join([f"{d['key']}: {d['value']}" for d in json.loads(description)])
+    except Exception:
+        return description
+
+
+def csv_chunks(chunks):
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(CSV_HEADER)
+    for rows in chunks:
+        for row in rows:
+            w.writerow([
+                row["title"], row["price"], row["color"], row["size"],
+                flatten_description(row["description"]), row["images"], row["product_url"]
+            ])
+        yield buf.getvalue().encode("utf8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf8")
+
+
+def jsonl_chunks(chunks):
+    for rows in chunks:
+        lines = []
+        for row in rows:
+            rec = dict(row)
+            try:
+                rec["description"] = json.loads(rec["description"])
+            except Exception:
+                pass
+            lines.append(json.dumps(rec))
+        yield ("\n".join(lines) + "\n").encode("utf8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that buffers bytes until drained"""
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+NUMERIC_COLUMNS = ('price_current', 'price_original', 'scraped_at')
+
+
+def _arrow_schema(pa):
+    return pa.schema([
+        pa.field(c, pa.float64() if c in NUMERIC_COLUMNS else pa.string()) for c in EXPORT_COLUMNS
+    ])
+
+
+def _arrow_batch(pa, schema, rows):
+    return pa.RecordBatch.from_pylist(rows, schema=schema)
+
+
+def parquet_chunks(chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = _arrow_schema(pa)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    try:
+        for rows in chunks:
+            # Each chunk becomes one row group, flushed to the client right away
+            writer.write_batch(_arrow_batch(pa, schema, rows))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def arrow_chunks(chunks):
+    import pyarrow as pa
+    schema = _arrow_schema(pa)
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+    try:
+        for rows in chunks:
+            writer.write_batch(_arrow_batch(pa, schema, rows))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {
+    "csv": csv_chunks,
+    "jsonl": jsonl_chunks,
+    "parquet": parquet_chunks,
+    "arrow": arrow_chunks,
+}
+
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(db_path, fmt="csv", since=None, gzip=False):
+    """Byte chunks of the full export in `fmt`; raises ValueError/ImportError before streaming starts"""
+    if fmt not in ENCODERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt in ("parquet", "arrow"):
+        import pyarrow  # noqa: F401  (fail before the response starts)
+    stream = ENCODERS[fmt](iter_row_chunks(db_path, since))
+    return gzip_stream(stream) if gzip else stream
@@ -0,0 +1,289 @@
+"""
+Product extraction that works on an HTML snapshot instead of live WebDriver elements.
+
+Every selector in XPATHS is compiled once with lxml and evaluated in-process, so a
+product page costs a single page_source transfer instead of one chromedriver
+round-trip (and possibly a full timeout) per field.
+
+Shein product pages also ship the whole goods payload as inline script state
+(gbRawData / productIntroData); extract_from_state reads that directly and the
+XPath extractor only fills in whatever the payload lacks.
+"""
+import json
+import re
+from urllib.parse import urljoin
+
+from lxml import etree, html as lxml_html
+
+# --- UPDATED XPATHS ---
+# Using all XPaths and notes provided by user
+XPATHS = {
+    # Collected from the category/PLP page, not from the product page; Shein product URLs end in -p-<goods id>[...].html
+    "product_link": "//a[contains(@href, '-p-') and contains(@href, '.html')]",
+    "pagination_next": "//span[@aria-label='Page Next']",
+    "pagination_numbers": "//div[contains(@class, 'sui-pagination__center')]//span[contains(@class, 'sui-pagination__inner')]",
+    "product_images": "//div[@class = 'product-intro']//img[@class = 'lazyload crop-image-container__img']",
+    "product_title": "//div[@class = 'product-intro']//h1[contains(@class, 'product-intro__head-name')]",
+    "product_price_1": "//div[@class = 'product-intro']//div[contains(@class, 'from original')]",
+    "product_price_2": "//div[@class = 'product-intro']//p[contains(@class, 'product-intro__ssr-priceDel')]",
+    "product_price_3": "//div[@class = 'product-intro']//div[contains(@class, 'from original')]/span",
+    "product_color": "//div[@class = 'goods-color__radio-container']//div[contains(@class, 'goods-color__radio_block')]",
+    "product_size": "//div[@class = 'product-intro__size']//p[contains(@class, 'product-intro__sizes-item-text--one')]",
+    "product_description_btn": "//div[@class = 'product-intro__description']//span[contains(@class, 'head-icon')]",
+    "product_description": "//div[@class = 'product-intro__description-table']//div[contains(@class, 'product-intro__description-table-item')]",
+}
+
+PRICE_KEYS = ("product_price_1", "product_price_2", "product_price_3")
+
+
+def _compile(xpaths):
+    compiled = {}
+    for key, expr in xpaths.items():
+        try:
+            compiled[key] = etree.XPath(expr)
+        except etree.XPathSyntaxError:
+            # A selector lxml can't compile simply evaluates to nothing
+            compiled[key] = None
+    return compiled
+
+
+COMPILED_XPATHS = _compile(XPATHS)
+# Equivalent of By.CLASS_NAME lookups used for description key/value cells
+_KEY_CELL = etree.XPath(".//*[contains(concat(' ', normalize-space(@class), ' '), ' key ')]")
+_VAL_CELL = etree.XPath(".//*[contains(concat(' ', normalize-space(@class), ' '), ' val ')]")
+
+
+def parse_html(page_source):
+    return lxml_html.fromstring(page_source)
+
+
+def parse_page(page_source):
+    """parse_html(), or None for an empty page or one lxml can't parse"""
+    try:
+        return parse_html(page_source) if page_source and page_source.strip() else None
+    except (etree.ParserError, ValueError):
+        return None
+
+
+def select(doc, key):
+    xpath = COMPILED_XPATHS.get(key)
+    if xpath is None:
+        return []
+    return [el for el in xpath(doc) if isinstance(el, etree._Element)]
+
+
+def element_text(el):
+    # Collapse whitespace the way WebElement.text reports rendered text
+    return " ".join(el.text_content().split())
+
+
+def first_text(doc, key):
+    elems = select(doc, key)
+    return element_text(elems[0]) if elems else ''
+
+
+def text_list(doc, key):
+    return [t for t in (element_text(el) for el in select(doc, key)) if t]
+
+
+def attr_list(doc, key, attrib, base_url=None):
+    values = []
+    for el in select(doc, key):
+        value = el.get(attrib)
+        if value is None:
+            continue
+        # WebElement.get_attribute("src") returns the resolved URL
+        values.append(urljoin(base_url, value) if base_url else value)
+    return values
+
+
+def extract_descriptions(doc):
+    descriptions = []
+    for item in select(doc, "product_description"):
+        key_els = _KEY_CELL(item)
+        val_els = _VAL_CELL(item)
+        key = element_text(key_els[0]).strip() if key_els else ''
+        val = element_text(val_els[0]).strip() if val_els else ''
+        if key or val:
+            descriptions.append({"key": key, "value": val})
+    return descriptions
+
+
+def extract_from_html(page_source, base_url=None):
+    """Build the same dict as extract_product_data from a single page_source snapshot."""
+    doc = parse_html(page_source) if isinstance(page_source, (str, bytes)) else page_source
+    prices = [p for p in (first_text(doc, k) for k in PRICE_KEYS) if p]
+    return {
+        "title": first_text(doc, "product_title"),
+        "price": "; ".join(prices) if prices else "",
+        "color": text_list(doc, "product_color"),
+        "size": text_list(doc, "product_size"),
+        "description": extract_descriptions(doc),
+        "images": attr_list(doc, "product_images", "src", base_url),
+    }
+
+
+# --- Embedded JSON state ---
+# Inline script assignments that carry the goods payload, most specific first
+STATE_PATTERNS = [
+    re.compile(r"\bgbRawData\s*=\s*"),
+    re.compile(r"\bwindow\.__INITIAL_STATE__\s*=\s*"),
+    re.compile(r"[\"']?productIntroData[\"']?\s*[:=]\s*"),
+]
+SIZE_ATTR_NAMES = ("size", "尺码")
+_decoder = json.JSONDecoder()
+
+
+def find_state_payload(page_source):
+    """Return the first decodable JSON object assigned to a known state variable, or None"""
+    if isinstance(page_source, bytes):
+        page_source = page_source.decode("utf8", "replace")
+    for pattern in STATE_PATTERNS:
+        for match in pattern.finditer(page_source):
+            start = page_source.find("{", match.end(), match.end() + 16)
+            if start < 0:
+                continue
+            try:
+                payload, _ = _decoder.raw_decode(page_source, start)
+            except ValueError:
+                continue
+            if isinstance(payload, dict):
+                return payload
+    return None
+
+
+def find_key(obj, key, depth=8):
+    """Depth-first search for the first value stored under `key`"""
+    if depth < 0:
+        return None
+    if isinstance(obj, dict):
+        if key in obj:
+            return obj[key]
+        children = obj.values()
+    elif isinstance(obj, list):
+        children = obj
+    else:
+        return None
+    for child in children:
+        if isinstance(child, (dict, list)):
+            found = find_key(child, key, depth - 1)
+            if found is not None:
+                return found
+    return None
+
+
+def _amount(price):
+    if isinstance(price, dict):
+        return str(price.get("amountWithSymbol") or price.get("amount") or "").strip()
+    return str(price or "").strip()
+
+
+def _unique(values):
+    seen = set()
+    out = []
+    for v in values:
+        if v and v not in seen:
+            seen.add(v)
+            out.append(v)
+    return out
+
+
+def _image_url(value, base_url):
+    if isinstance(value, dict):
+        value = value.get("origin_image") or value.get("image_url") or value.get("src")
+    if not value:
+        return None
+    if value.startswith("//"):
+        value = "https:" + value
+    return urljoin(base_url, value) if base_url else value
+
+
+def state_images(payload, detail, base_url):
+    imgs = find_key(payload, "goods_imgs") or {}
+    values = []
+    if isinstance(imgs, dict):
+        values.append(imgs.get("main_image"))
+        values.extend(imgs.get("detail_image") or [])
+    elif isinstance(imgs, list):
+        values.extend(imgs)
+    if not values and detail.get("goods_img"):
+        values.append(detail["goods_img"])
+    return _unique(_image_url(v, base_url) for v in values)
+
+
+def state_colors(payload, detail):
+    color_list = find_key(payload, "colorList")
+    if isinstance(color_list, list):
+        names = [c.get("goods_color_name") or c.get("attr_value") for c in color_list if isinstance(c, dict)]
+    else:
+        related = find_key(payload, "relation_color") or []
+        names = [detail.get("goods_color_name")]
+        names += [c.get("goods_color_name") for c in related if isinstance(c, dict)]
+    return _unique(str(n).strip() for n in names if n)
+
+
+def state_sizes(payload):
+    sizes = []
+    for sku in find_key(payload, "sku_list") or []:
+        for attr in (sku.get("sku_sale_attr") or []) if isinstance(sku, dict) else []:
+            if str(attr.get("attr_name", "")).strip().lower() in SIZE_ATTR_NAMES:
+                sizes.append(str(attr.get("attr_value_name") or "").strip())
+    return _unique(sizes)
+
+
+def state_descriptions(detail):
+    descriptions = []
+    for attr in detail.get("productDetails") or []:
+        if not isinstance(attr, dict):
+            continue
+        key = str(attr.get("attr_name") or "").strip()
+        val = str(attr.get("attr_value") or "").strip()
+        if key and not key.endswith(":"):
+            # Match the "Label:" text shown in the description table
+            key += ":"
+        if key or val:
+            descriptions.append({"key": key, "value": val})
+    return descriptions
+
+
+def extract_from_state(page_source, base_url=None):
+    """Build the extract_product_data dict from the inline goods payload, or None if absent"""
+    payload = find_state_payload(page_source)
+    if payload is None:
+        return None
+    detail = find_key(payload, "detail")
+    if not isinstance(detail, dict) or "goods_name" not in detail:
+        detail = payload if "goods_name" in payload else None
+    if detail is None:
+        return None
+    prices = _unique([_amount(detail.get("salePrice")), _amount(detail.get("retailPrice"))])
+    return {
+        "title": " ".join(str(detail.get("goods_name") or "").split()),
+        "price": "; ".join(prices),
+        "color": state_colors(payload, detail),
+        "size": state_sizes(payload),
+        "description": state_descriptions(detail),
+        "images": state_images(payload, detail, base_url),
+    }
+
+
+def complete_from_dom(data, doc, base_url=None):
+    """Fill the fields extract_from_state() left empty (or all of them, for None) from the parsed page"""
+    dom = extract_from_html(doc, base_url)
+    if not data:
+        return dom
+    for key, value in data.items():
+        if not value:
+            data[key] = dom[key]
+    return data
+
+
+def extract_product_from_html(page_source, base_url=None):
+    """
+    JSON-state extraction with the XPath snapshot as fallback: the DOM is only
+    parsed when the payload is missing or leaves a field empty.
+    """
+    data = extract_from_state(page_source, base_url)
+    if data and all(data.values()):
+        return data
+    return complete_from_dom(data, parse_html(page_source), base_url)
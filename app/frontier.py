@@ -0,0 +1,114 @@
+"""
+Persistent crawl frontier.
+
+Every product URL discovered on a category listing is recorded in the `frontier`
+table with its state (pending / done / failed), the time it was last scraped and
+the number of consecutive failed attempts. A run only revisits URLs that are
+pending, failed fewer than `max_attempts` times, or were scraped longer ago than
+the freshness TTL, so an interrupted crawl picks up where it stopped and a
+repeat run skips everything that is still fresh.
+"""
+import sqlite3
+import time
+
+FRONTIER_SCHEMA = '''CREATE TABLE IF NOT EXISTS frontier (
+    url TEXT PRIMARY KEY,
+    category_url TEXT,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,  -- consecutive failures, reset on success
+    last_scraped REAL,
+    last_error TEXT,
+    discovered_at REAL,
+    updated_at REAL
+)'''
+FRONTIER_INDEX = "CREATE INDEX IF NOT EXISTS idx_frontier_category_state ON frontier (category_url, state)"
+
+ADD_SQL = '''INSERT OR IGNORE INTO frontier (url, category_url, state, attempts, discovered_at, updated_at)
+    VALUES (?, ?, 'pending', 0, ?, ?)'''
+DONE_SQL = '''INSERT INTO frontier (url, category_url, state, attempts, last_scraped, discovered_at, updated_at)
+    VALUES (?, NULL, 'done', 0, ?, ?, ?)
+    ON CONFLICT(url) DO UPDATE SET state = 'done', attempts = 0, last_error = NULL,
+        last_scraped = excluded.last_scraped, updated_at = excluded.updated_at'''
+FAILED_SQL = '''INSERT INTO frontier (url, category_url, state, attempts, last_error, discovered_at, updated_at)
+    VALUES (?, NULL, 'failed', 1, ?, ?, ?)
+    ON CONFLICT(url) DO UPDATE SET state = 'failed', attempts = frontier.attempts + 1,
+        last_error = excluded.last_error, updated_at = excluded.updated_at'''
+
+# SQLite's default limit on bound parameters is 999 on older builds
+_CHUNK = 900
+
+
+class Frontier:
+    def __init__(self, db_path, write=None, freshness_ttl=24 * 3600, max_attempts=3):
+        """`write(sql, params)` lets callers route updates through a shared writer thread"""
+        self.db_path = db_path
+        self.write = write or self._write_direct
+        self.freshness_ttl = freshness_ttl
+        self.max_attempts = max_attempts
+        conn = sqlite3.connect(db_path)
+        with conn:
+            conn.execute(FRONTIER_SCHEMA)
+            conn.execute(FRONTIER_INDEX)
+        conn.close()
+
+    def _write_direct(self, sql, params):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                conn.execute(sql, params)
+        finally:
+            conn.close()
+
+    def add(self, category_url, urls):
+        now = time.time()
+        for url in urls:
+            self.write(ADD_SQL, (url, category_url, now, now))
+
+    def mark_done(self, url):
+        now = time.time()
+        self.write(DONE_SQL, (url, now, now, now))
+
+    def mark_failed(self, url, error=''):
+        now = time.time()
+        self.write(FAILED_SQL, (url, str(error)[:500], now, now))
+
+    def leftovers(self, category_url, freshness_ttl=None):
+        """URLs of `category_url` recorded by earlier runs that are due for a visit"""
+        ttl = self.freshness_ttl if freshness_ttl is None else freshness_ttl
+        cutoff = time.time() - ttl
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute(
+                '''SELECT url FROM frontier WHERE category_url = ? AND (
+                    state = 'pending'
+                    OR (state = 'failed' AND (attempts < ? OR updated_at < ?))
+                    OR (state = 'done' AND last_scraped < ?)
+                ) ORDER BY state = 'done', discovered_at''',
+                (category_url, self.max_attempts, cutoff, cutoff),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [r[0] for r in rows]
+
+    def not_due(self, urls, freshness_ttl=None):
+        """Subset of `urls` that should be skipped: scraped within the TTL or out of retries"""
+        ttl = self.freshness_ttl if freshness_ttl is None else freshness_ttl
+        cutoff = time.time() - ttl
+        urls = list(urls)
+        skip = set()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for i in range(0, len(urls), _CHUNK):
+                chunk = urls[i:i + _CHUNK]
+                marks = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f'''SELECT url FROM frontier WHERE url IN ({marks}) AND (
+                        (state = 'done' AND last_scraped >= ?)
+                        OR (state = 'failed' AND attempts >= ? AND updated_at >= ?)
+                    )''',
+                    (*chunk, cutoff, self.max_attempts, cutoff),
+                ).fetchall()
+                skip.update(r[0] for r in rows)
+        finally:
+            conn.close()
+        return skip
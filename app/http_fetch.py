@@ -0,0 +1,136 @@
+"""
+Lightweight HTTP fetch path for product pages.
+
+Pages are downloaded with one pooled aiohttp session (keep-alive, at most
+`concurrency` requests in flight) on a background event loop that lives as long as
+the URL stream feeding it, and results are handed back through a queue as each one
+completes, so extraction overlaps with the remaining downloads. With a `pacer`
+(rate_control.RateController) each request first awaits its reserved slot. Callers
+escalate a URL to the Selenium path when the response looks like a block page or the
+snapshot lacks required fields.
+"""
+import asyncio
+import queue
+import threading
+
+from block_detection import classify, detect_html
+
+_DONE = object()
+
+BLOCK_STATUSES = {403, 429, 503}
+
+
+class FetchResult:
+    def __init__(self, url, status=None, body='', final_url=None, error=None):
+        self.url = url
+        self.status = status
+        self.body = body
+        self.final_url = final_url or url
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None and self.status == 200
+
+
+def looks_blocked(result, doc=None):
+    """
+    Without `doc` only the checks that need no parsing run: the status and a challenge
+    URL. With `doc`, the page already parsed by the caller, the full detector runs on it.
+    """
+    if result.status in BLOCK_STATUSES:
+        return True
+    if doc is None:
+        return classify(result.final_url, '', [], False).blocked is True
+    return detect_html(result.body, result.final_url, doc=doc).blocked is True
+
+
+class HttpFetcher:
+    def __init__(self, concurrency=8, timeout=20, proxy=None, user_agent=None, pacer=None):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.proxy = proxy
+        self.pacer = pacer
+        self.headers = {
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "en-ZA,en;q=0.9",
+        }
+        if user_agent:
+            self.headers["User-Agent"] = user_agent
+
+    def iter_fetch(self, urls):
+        """
+        Yield a FetchResult per URL in completion order. `urls` may be any iterable,
+        including one that blocks until more URLs arrive (main.LinkStream); it is read
+        only as request slots free up, and one session serves all of it.
+        """
+        results = queue.Queue()
+        stopped = threading.Event()
+        thread = threading.Thread(target=lambda: asyncio.run(self._run(urls, results, stopped)), daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = results.get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            # The caller stopped early: start no further requests
+            stopped.set()
+        thread.join()
+
+    async def _run(self, urls, results, stopped):
+        loop = asyncio.get_running_loop()
+        source = iter(urls)
+        pending = set()
+
+        def report(result):
+            pending.discard(result.url)
+            results.put(result)
+
+        try:
+            import aiohttp
+            proxy = self.proxy
+            if proxy and "://" not in proxy:
+                proxy = "http://" + proxy
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=30)
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=self.headers) as session:
+                slots = asyncio.Semaphore(self.concurrency)
+                tasks = set()
+
+                async def fetch(url):
+                    try:
+                        # Slots are reserved only as requests can actually start, so the pace adapts mid-stream
+                        if self.pacer is not None:
+                            await asyncio.sleep(self.pacer.reserve(self.proxy, url))
+                        try:
+                            async with session.get(url, proxy=proxy) as resp:
+                                body = await resp.text(errors="replace")
+                                report(FetchResult(url, resp.status, body, str(resp.url)))
+                        except Exception as e:
+                            report(FetchResult(url, error=e))
+                    finally:
+                        slots.release()
+
+                while not stopped.is_set():
+                    await slots.acquire()
+                    # The source may block waiting for URLs, so it is read off the loop
+                    url = await loop.run_in_executor(None, next, source, _DONE)
+                    if url is _DONE:
+                        break
+                    pending.add(url)
+                    task = loop.create_task(fetch(url))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                if tasks:
+                    await asyncio.gather(*tasks)
+        except Exception as e:
+            # e.g. aiohttp not installed: every unfinished URL goes back to the caller as failed
+            for url in list(pending):
+                report(FetchResult(url, error=e))
+            if not stopped.is_set():
+                for url in source:
+                    report(FetchResult(url, error=e))
+        finally:
+            results.put(_DONE)
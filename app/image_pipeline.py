@@ -0,0 +1,357 @@
+"""
+Optional product image stage.
+
+Image URLs from scraped products are queued on an ImageStage thread, which
+downloads them in batches. Every batch goes through the pipeline's one aiohttp
+session, which lives on its own event loop thread until close(), so connections to
+the image CDN stay open from batch to batch; at most `concurrency` requests are in
+flight. Bodies are stored once per SHA-256 in a
+content-addressed directory (root/ab/abcdef....ext), so the same picture served under
+different URLs, as with colour variants, takes up space only once.
+
+Thumbnails are made in a process pool when Pillow is installed. The image_urls table
+maps every URL to its blob and keeps the ETag/Last-Modified validators. A re-crawl
+sends conditional requests and skips URLs checked within `recheck_after` entirely,
+so an unchanged image costs at most a 304. When the store grows past `max_bytes`,
+the least recently used blobs are evicted. Their URLs then lose their validators and
+are downloaded again the next time they show up.
+"""
+import asyncio
+import hashlib
+import mimetypes
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from db_writer import configure_connection
+
+IMAGE_SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS image_blobs (
+        sha256 TEXT PRIMARY KEY,
+        path TEXT NOT NULL,
+        thumb_path TEXT,
+        size INTEGER NOT NULL,
+        content_type TEXT,
+        created_at REAL,
+        last_used REAL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS image_urls (
+        url TEXT PRIMARY KEY,
+        sha256 TEXT,
+        etag TEXT,
+        last_modified TEXT,
+        status INTEGER,
+        error TEXT,
+        fetched_at REAL,
+        checked_at REAL
+    )''',
+    "CREATE INDEX IF NOT EXISTS idx_image_blobs_last_used ON image_blobs (last_used)",
+    "CREATE INDEX IF NOT EXISTS idx_image_urls_sha256 ON image_urls (sha256)",
+)
+
+URL_UPSERT_SQL = '''INSERT INTO image_urls (url, sha256, etag, last_modified, status, error, fetched_at, checked_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(url) DO UPDATE SET sha256 = COALESCE(excluded.sha256, image_urls.sha256),
+        etag = COALESCE(excluded.etag, image_urls.etag),
+        last_modified = COALESCE(excluded.last_modified, image_urls.last_modified),
+        status = excluded.status, error = excluded.error,
+        fetched_at = COALESCE(excluded.fetched_at, image_urls.fetched_at), checked_at = excluded.checked_at'''
+
+
+def make_thumbnail(src, dest, size):
+    """Runs in a worker process; returns `dest` or None when the file isn't a readable image"""
+    from PIL import Image
+    try:
+        with Image.open(src) as image:
+            image.thumbnail(size)
+            image.convert("RGB").save(dest, "JPEG", quality=80)
+        return dest
+    except (OSError, ValueError):
+        return None
+
+
+def _extension(url, content_type):
+    ext = mimetypes.guess_extension((content_type or "").split(";")[0].strip()) or ""
+    if not ext:
+        ext = os.path.splitext(url.split("?")[0])[1][:6]
+    return ext or ".bin"
+
+
+class ImageStore:
+    def __init__(self, db_path, root="images", max_bytes=2 * 1024 ** 3):
+        self.db_path = db_path
+        self.root = root
+        self.max_bytes = max_bytes
+        conn = self._connect()
+        try:
+            with conn:
+                for sql in IMAGE_SCHEMA:
+                    conn.execute(sql)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return configure_connection(sqlite3.connect(self.db_path, timeout=30))
+
+    def blob_path(self, digest, ext):
+        return os.path.join(self.root, digest[:2], digest + ext)
+
+    def put(self, conn, data, url, content_type):
+        """Store `data` under its hash; returns (digest, path, new)"""
+        digest = hashlib.sha256(data).hexdigest()
+        now = time.time()
+        row = conn.execute("SELECT path FROM image_blobs WHERE sha256 = ?", (digest,)).fetchone()
+        if row and os.path.exists(row[0]):
+            conn.execute("UPDATE image_blobs SET last_used = ? WHERE sha256 = ?", (now, digest))
+            return digest, row[0], False
+        path = self.blob_path(digest, _extension(url, content_type))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        conn.execute(
+            '''INSERT OR REPLACE INTO image_blobs (sha256, path, size, content_type, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?)''',
+            (digest, path, len(data), content_type, now, now),
+        )
+        return digest, path, True
+
+    def validators(self, conn, urls, recheck_after):
+        """url -> (etag, last_modified, fresh) for URLs whose blob is still on disk"""
+        found = {}
+        now = time.time()
+        for url in urls:
+            row = conn.execute(
+                '''SELECT u.etag, u.last_modified, u.checked_at FROM image_urls u
+                    JOIN image_blobs b ON b.sha256 = u.sha256 WHERE u.url = ?''',
+                (url,),
+            ).fetchone()
+            if row:
+                found[url] = (row[0], row[1], now - (row[2] or 0) < recheck_after)
+        return found
+
+    def total_bytes(self, conn):
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM image_blobs").fetchone()[0]
+
+    def evict(self, conn):
+        """Drop least recently used blobs until the store fits in max_bytes; returns bytes freed"""
+        excess = self.total_bytes(conn) - self.max_bytes
+        freed = 0
+        if excess <= 0:
+            return 0
+        rows = conn.execute("SELECT sha256, path, thumb_path, size FROM image_blobs ORDER BY last_used").fetchall()
+        for digest, path, thumb_path, size in rows:
+            if freed >= excess:
+                break
+            for p in (path, thumb_path):
+                if p:
+                    try:
+                        os.remove(p)
+                    except OSError:
+                        pass
+            conn.execute("DELETE FROM image_blobs WHERE sha256 = ?", (digest,))
+            freed += size
+        return freed
+
+
+class ImagePipeline:
+    def __init__(self, store, concurrency=8, timeout=20, user_agent=None, proxy=None, thumb_size=(256, 256),
+                 processes=2, recheck_after=24 * 3600, on_result=None):
+        self.store = store
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.proxy = proxy
+        self.headers = {"Accept": "image/avif,image/webp,image/*,*/*;q=0.8"}
+        if user_agent:
+            self.headers["User-Agent"] = user_agent
+        self.thumb_size = thumb_size
+        self.processes = processes
+        self.recheck_after = recheck_after
+        # Called with (outcome, url, nbytes) per URL: downloaded / deduplicated / not_modified / fresh / failed
+        self.on_result = on_result
+        self._thumbs = None
+        # Event loop thread and session shared by every batch, started on first use
+        self._lock = threading.Lock()
+        self._loop = None
+        self._loop_thread = None
+        self._session = None
+
+    def _thumbnailer(self):
+        if self._thumbs is None and self.processes:
+            try:
+                import PIL  # noqa: F401
+            except ImportError:
+                self.processes = 0
+                return None
+            import multiprocessing
+            self._thumbs = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context("spawn"))
+        return self._thumbs
+
+    def _event_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(target=self._loop.run_forever, name="image-fetch", daemon=True)
+                self._loop_thread.start()
+            return self._loop
+
+    def close(self):
+        if self._thumbs is not None:
+            self._thumbs.shutdown()
+            self._thumbs = None
+        with self._lock:
+            loop, thread, self._loop, self._loop_thread = self._loop, self._loop_thread, None, None
+        if loop is not None:
+            if self._session is not None:
+                asyncio.run_coroutine_threadsafe(self._session.close(), loop).result(self.timeout)
+                self._session = None
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    def run(self, urls):
+        """Fetch one batch of URLs; returns {outcome: count}"""
+        urls = list(dict.fromkeys(u for u in urls if u and u.startswith("http")))
+        conn = self.store._connect()
+        try:
+            known = self.store.validators(conn, urls, self.recheck_after)
+            counts = {}
+            todo = []
+            for url in urls:
+                if url in known and known[url][2]:
+                    self._report(counts, "fresh", url, 0)
+                else:
+                    todo.append(url)
+            responses = []
+            if todo:
+                responses = asyncio.run_coroutine_threadsafe(self._fetch_all(todo, known), self._event_loop()).result()
+            thumbs = []
+            now = time.time()
+            with conn:
+                for url, status, body, headers, error in responses:
+                    if status == 304:
+                        conn.execute(URL_UPSERT_SQL, (url, None, None, None, 304, None, None, now))
+                        conn.execute("UPDATE image_blobs SET last_used = ? "
+                                     "WHERE sha256 = (SELECT sha256 FROM image_urls WHERE url = ?)", (now, url))
+                        self._report(counts, "not_modified", url, 0)
+                    elif status == 200 and body:
+                        content_type = headers.get("Content-Type")
+                        digest, path, new = self.store.put(conn, body, url, content_type)
+                        conn.execute(URL_UPSERT_SQL, (url, digest, headers.get("ETag"), headers.get("Last-Modified"),
+                                                      200, None, now, now))
+                        if new:
+                            thumbs.append((digest, path))
+                        self._report(counts, "downloaded" if new else "deduplicated", url, len(body))
+                    else:
+                        conn.execute(URL_UPSERT_SQL, (url, None, None, None, status, str(error or status)[:300],
+                                                      None, now))
+                        self._report(counts, "failed", url, 0)
+                self.store.evict(conn)
+            self._make_thumbnails(conn, thumbs)
+        finally:
+            conn.close()
+        return counts
+
+    def _report(self, counts, outcome, url, nbytes):
+        counts[outcome] = counts.get(outcome, 0) + 1
+        if self.on_result:
+            self.on_result(outcome, url, nbytes)
+
+    def _make_thumbnails(self, conn, blobs):
+        pool = self._thumbnailer()
+        if pool is None or not blobs:
+            return
+        futures = [(digest, pool.submit(make_thumbnail, path, os.path.splitext(path)[0] + ".thumb.jpg",
+                                        self.thumb_size)) for digest, path in blobs]
+        with conn:
+            for digest, future in futures:
+                try:
+                    thumb = future.result()
+                except Exception:
+                    thumb = None
+                if thumb:
+                    conn.execute("UPDATE image_blobs SET thumb_path = ? WHERE sha256 = ?", (thumb, digest))
+
+    async def _fetch_all(self, urls, known):
+        import aiohttp
+        proxy = self.proxy
+        if proxy and "://" not in proxy:
+            proxy = "http://" + proxy
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=30)
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout, headers=self.headers)
+        session = self._session
+
+        async def fetch(url):
+            headers = {}
+            etag, last_modified, _ = known.get(url, (None, None, False))
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+            try:
+                async with session.get(url, headers=headers, proxy=proxy) as resp:
+                    body = await resp.read() if resp.status == 200 else b""
+                    kept = {k: resp.headers.get(k) for k in ("Content-Type", "ETag", "Last-Modified")}
+                    return url, resp.status, body, kept, None
+            except Exception as e:
+                return url, None, b"", {}, e
+
+        return await asyncio.gather(*(fetch(u) for u in urls))
+
+
+class ImageStage(threading.Thread):
+    """Background consumer: batches queued image URLs and runs them through an ImagePipeline"""
+
+    def __init__(self, pipeline, batch_size=64, flush_interval=2.0):
+        super().__init__(name="image-stage", daemon=True)
+        self.pipeline = pipeline
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.idle = threading.Event()
+        self.idle.set()
+        self.totals = {}
+        self.errors = []
+
+    def put_many(self, urls):
+        urls = [u for u in urls if u]
+        if urls:
+            with self.lock:
+                self.pending += 1
+                self.idle.clear()
+            self.queue.put(urls)
+
+    def drain(self, timeout=None):
+        """Wait until everything queued so far has been processed"""
+        return self.idle.wait(timeout)
+
+    def run(self):
+        while True:
+            batch = list(self.queue.get())
+            items = 1
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.extend(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                    items += 1
+                except queue.Empty:
+                    break
+            try:
+                for outcome, n in self.pipeline.run(batch).items():
+                    self.totals[outcome] = self.totals.get(outcome, 0) + n
+            except Exception as e:
+                # e.g. aiohttp missing or the disk is full: keep the stage alive for later batches
+                self.errors.append(str(e))
+                del self.errors[:-5]
+            with self.lock:
+                self.pending -= items
+                if not self.pending:
+                    self.idle.set()
@@ -0,0 +1,213 @@
+"""
+Job scheduler for scrape requests.
+
+Each submitted job gets an id, its own status dict and result list, and waits in a
+priority queue (higher priority first, then submission order) until enough browser
+slots are free under the global `max_browsers` cap. The listing and product stages of a
+job run side by side with `workers` browsers each, so a job is charged two browsers per
+worker. Its worker count is clamped so a single job can never exceed the cap.
+
+Code running inside a job finds it through current_job(). Threads a job starts must
+be wrapped with bound() so they see the same job. Pause and cancel are cooperative:
+scraping loops call Job.checkpoint() between pages, which blocks while the job is
+paused and returns True once it has been cancelled.
+"""
+import heapq
+import itertools
+import threading
+import time
+import uuid
+
+from metrics import Metrics
+
+_local = threading.local()
+
+
+def current_job():
+    return getattr(_local, "job", None)
+
+
+def bound(fn, job=None):
+    """Wrap `fn` so it runs with `job` (default: the caller's current job) as current_job()"""
+    job = job or current_job()
+
+    def inner(*args, **kwargs):
+        previous = current_job()
+        _local.job = job
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.job = previous
+    return inner
+
+
+class Job:
+    def __init__(self, params, status, priority=0, browsers=1):
+        self.id = uuid.uuid4().hex[:12]
+        self.params = params
+        self.priority = priority
+        self.browsers = browsers
+        self.status = dict(status, job_id=self.id, status="Queued")
+        self.results = []
+        # Samples recorded while this job is current (main.METRICS scopes to it)
+        self.metrics = Metrics()
+        # Pages and products that ran out of retries
+        self.dead_letters = []
+        self.writer = None
+        # Products this job has queued (product_ids.SeenSet), set when its scrape starts
+        self.seen = None
+        # Called with each product as it is recorded (cli.py streams them out as JSON lines)
+        self.on_product = None
+        self.cancelled = threading.Event()
+        self.unpaused = threading.Event()
+        self.unpaused.set()
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+    def checkpoint(self):
+        """Block while paused; True if the job has been cancelled"""
+        while not self.unpaused.wait(0.5):
+            if self.cancelled.is_set():
+                break
+        return self.cancelled.is_set()
+
+    def describe(self):
+        return {
+            "job_id": self.id,
+            "priority": self.priority,
+            "browsers": self.browsers,
+            "params": self.params,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "results": len(self.results),
+            "dead_letters": len(self.dead_letters),
+            "status": dict(self.status),
+        }
+
+
+class JobScheduler:
+    def __init__(self, run_job, status_defaults, max_browsers=6, keep_finished=50, on_change=None):
+        self.run_job = run_job
+        self.status_defaults = status_defaults
+        self.max_browsers = max_browsers
+        self.keep_finished = keep_finished
+        self.on_change = on_change
+        self.cond = threading.Condition()
+        self.pending = []
+        self.jobs = {}
+        self.browsers_in_use = 0
+        self.last_started = None
+        self._seq = itertools.count()
+        self._dispatcher = None
+
+    def submit(self, params, priority=0):
+        workers = max(1, min(int(params.get("workers", 1)), self.max_browsers // 2))
+        browsers = min(2 * workers, self.max_browsers)
+        job = Job(dict(params, workers=workers), self.status_defaults, priority=priority, browsers=browsers)
+        with self.cond:
+            self.jobs[job.id] = job
+            heapq.heappush(self.pending, (-priority, next(self._seq), job))
+            self._evict()
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch_loop, name="job-dispatcher", daemon=True)
+                self._dispatcher.start()
+            self.cond.notify_all()
+        self._changed()
+        return job
+
+    def get(self, job_id):
+        with self.cond:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self.cond:
+            return list(self.jobs.values())
+
+    def latest(self):
+        """The most recently started job, else the oldest one still queued"""
+        with self.cond:
+            if self.last_started is not None:
+                return self.last_started
+            return min(self.pending, key=lambda item: item[1])[2] if self.pending else None
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+        job.cancelled.set()
+        job.unpaused.set()
+        with self.cond:
+            if job.started_at is None:
+                # Still queued: drop it here, the dispatcher never sees it
+                self.pending = [item for item in self.pending if item[2] is not job]
+                heapq.heapify(self.pending)
+                job.finished_at = time.time()
+                job.status.update(status="Cancelled", message="Cancelled before it started")
+            self.cond.notify_all()
+        self._changed()
+        return job
+
+    def pause(self, job_id):
+        job = self.get(job_id)
+        if job is not None and not job.finished and not job.cancelled.is_set():
+            job.unpaused.clear()
+            job.status.update(status="Paused")
+            self._changed()
+        return job
+
+    def resume(self, job_id):
+        job = self.get(job_id)
+        if job is not None and not job.unpaused.is_set():
+            job.unpaused.set()
+            job.status.update(status="Processing" if job.started_at else "Queued")
+            self._changed()
+        return job
+
+    def stats(self):
+        with self.cond:
+            return {
+                "queued": len(self.pending),
+                "running": sum(1 for j in self.jobs.values() if j.started_at and not j.finished),
+                "browsers_in_use": self.browsers_in_use,
+                "max_browsers": self.max_browsers,
+            }
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change()
+
+    def _evict(self):
+        finished = sorted((j for j in self.jobs.values() if j.finished), key=lambda j: j.finished_at)
+        for job in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job.id]
+
+    def _dispatch_loop(self):
+        while True:
+            with self.cond:
+                # Strict priority: the head job waits for room rather than being overtaken
+                while not self.pending or self.browsers_in_use + self.pending[0][2].browsers > self.max_browsers:
+                    self.cond.wait()
+                job = heapq.heappop(self.pending)[2]
+                self.browsers_in_use += job.browsers
+                job.started_at = time.time()
+                self.last_started = job
+            threading.Thread(target=self._run, args=(job,), name=f"job-{job.id}", daemon=True).start()
+
+    def _run(self, job):
+        try:
+            bound(self.run_job, job)(job)
+        except Exception as e:
+            job.status.update(status="Error", error=f"Error: {e}")
+        finally:
+            with self.cond:
+                job.finished_at = time.time()
+                self.browsers_in_use -= job.browsers
+                self._evict()
+                self.cond.notify_all()
+            self._changed()
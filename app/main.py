@@ -1,16 +1,33 @@
-import os
+import asyncio
+import atexit
+import sys
 import threading
 import time
 import random
 import sqlite3
-import csv
-from flask import Flask, render_template_string, request, jsonify, send_file
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from selenium.common.exceptions import TimeoutException
+from db_writer import BatchWriter, configure_connection
+from driver_pool import DriverPool, chromedriver_path
+from proxy_pool import ProxyPool
+from frontier import Frontier
+from status_events import StatusBroadcaster
+from metrics import Metrics
+from jobs import JobScheduler, bound, current_job
+from work_queue import WorkQueue
+from network_policy import TrafficMeter, resolve_policy
+from image_pipeline import ImagePipeline, ImageStage, ImageStore
+from rate_control import RateController
+from product_ids import ProductIndex, SeenSet
+from retry_queue import Backoff, RetryQueue
+from schema import migrate as migrate_schema, product_statements, stored_fields, as_list
+from http_fetch import HttpFetcher, looks_blocked
+from block_detection import classify, detect_driver, probe
+from extraction import (
+    XPATHS, complete_from_dom, extract_from_state, extract_descriptions,
+    parse_html, parse_page, select,
+)
 
 # --- Free Proxy List Providers (Suggesting some robust free sources for rotation) ---
 FREE_PROXY_ENDPOINTS = [
@@ -20,129 +37,403 @@ FREE_PROXY_ENDPOINTS = [
 ]
 
 
-app = Flask(__name__)
-SCRAPER_STATUS = {
-    "status": "Idle", 
+# Fields every job's status starts from; SCRAPER_STATUS holds them for work run outside a job
+STATUS_DEFAULTS = {
+    "status": "Idle",
     "current_category": '',
     "product_links_found": 0,
     "products_scraped": 0,
     "error": '',
     "captcha_detected": False,
     "message": '',
+    "db_errors": 0,
+    "products_skipped_fresh": 0,
+    "products_unchanged": 0,
+    "duplicate_fetches_saved": 0,
+    "retries": 0,
+    "dead_letters": 0,
+    "fast_path_pages": 0,
+    "browser_path_pages": 0,
+    "job_metrics": {},
 }
+SCRAPER_STATUS = dict(STATUS_DEFAULTS)
 SCRAPER_RESULTS = []
+SCRAPER_DEAD_LETTERS = []
 DB_PATH = "shein_scraper.db"
+# "state" reads the inline goods JSON (XPath snapshot as fallback), "snapshot" reads every
+# XPATHS field from one page_source, "live" queries each element over WebDriver
+EXTRACTION_MODE = "state"
+# Products scraped more recently than this are skipped on repeat runs (frontier table)
+FRESHNESS_TTL_HOURS = 24
+# "browser" renders every product page in Chrome; "http" fetches them with a pooled HTTP
+# client and only escalates to Chrome when data is missing or a block page comes back
+DEFAULT_FETCH_MODE = "browser"
+HTTP_CONCURRENCY = 8
+# A fast-path snapshot without these fields is retried in the browser
+REQUIRED_FIELDS = ("title", "price")
+# Number of independent browser workers used by scrape_products (one driver + proxy each)
+DEFAULT_WORKERS = 3
+# Browsers shared by all running jobs; a job holds one per worker in each of its listing and product stages
+MAX_BROWSERS = 6
+# What browsers may download (network_policy.POLICIES preset); /scrape can override it per job
+NETWORK_POLICY = "default"
+# Download product images into a local content-addressed store (image_pipeline.py); per job via /scrape
+DOWNLOAD_IMAGES = False
+IMAGE_DIR = "images"
+IMAGE_STORE_MAX_MB = 2048
+# A job visits each product (goods id) once, tracked in an exact set; set this to track them in a
+# Bloom filter sized for this many products instead (fixed memory, rare false duplicates)
+SEEN_BLOOM_CAPACITY = None
+# Page requests are paced per (proxy, host) by rate_control.RateController: each pair starts at
+# PACE_RATE pages/s and adapts between PACE_MIN_RATE and PACE_MAX_RATE; HOST_RATE caps the
+# combined pace against one host over every proxy and worker
+PACE_RATE = 0.5
+PACE_MIN_RATE = 0.05
+PACE_MAX_RATE = 2.0
+HOST_RATE = 4.0
+# Each listing page and product URL is retried on its own (retry_queue.RetryQueue): a failed page
+# retires its browser, the worker fails over to the next proxy, and the page comes back after
+# RETRY_BASE_DELAY * 2**(n-1) seconds (at most RETRY_MAX_DELAY). After RETRY_MAX_ATTEMPTS failures
+# it goes to the job's dead-letter list
+RETRY_MAX_ATTEMPTS = 4
+RETRY_BASE_DELAY = 2.0
+RETRY_MAX_DELAY = 60.0
+# Block pages in a row, over all of a stage's workers, before it stops and reports the CAPTCHA.
+# A stage gets one per proxy up to this cap, so without proxies the first block page stops it
+MAX_CONSECUTIVE_BLOCKS = 5
+# Stage timings and counters served at /metrics; with False every hook is a no-op. Samples are
+# also recorded into the running job's own Metrics, which its job_metrics summary is built from
+METRICS_ENABLED = True
+METRICS = Metrics(enabled=METRICS_ENABLED, scope=lambda: getattr(current_job(), "metrics", None))
+class By:
+    """The locator strategies used here (selenium.webdriver.common.by.By), without importing selenium.webdriver"""
+    XPATH = "xpath"
+    CLASS_NAME = "class name"
 
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS products (
-        product_url TEXT PRIMARY KEY,
-        title TEXT,
-        price TEXT,
-        color TEXT,
-        size TEXT,
-        description TEXT,
-        images TEXT
-    )''')
-    conn.commit()
+# wait_for_any timeouts are counted per XPATHS key
+XPATH_KEYS = {xpath: key for key, xpath in XPATHS.items()}
+STATUS_LOCK = threading.Lock()
+RESULTS_LOCK = threading.Lock()
+
+def job_status():
+    """Status dict of the job running on this thread, or SCRAPER_STATUS outside a job"""
+    job = current_job()
+    return job.status if job is not None else SCRAPER_STATUS
+
+def job_results():
+    job = current_job()
+    return job.results if job is not None else SCRAPER_RESULTS
+
+def job_dead_letters():
+    job = current_job()
+    return job.dead_letters if job is not None else SCRAPER_DEAD_LETTERS
+
+SCRAPER_SEEN = SeenSet()
+
+def job_seen():
+    """Product keys queued by the running job (product_ids.SeenSet); SCRAPER_SEEN outside a job"""
+    job = current_job()
+    return job.seen if job is not None and job.seen is not None else SCRAPER_SEEN
+
+def new_seen_set():
+    global SCRAPER_SEEN
+    seen = SeenSet(bloom_capacity=SEEN_BLOOM_CAPACITY)
+    job = current_job()
+    if job is not None:
+        job.seen = seen
+    else:
+        SCRAPER_SEEN = seen
+    return seen
+
+def status_snapshot(job=None):
+    """Status of `job`; by default the latest scheduled job's (what the dashboard shows)"""
+    job = job or JOBS.latest()
+    with STATUS_LOCK:
+        return dict(job.status if job is not None else SCRAPER_STATUS)
+
+# Pushes status changes to /status/stream subscribers (coalesced, with heartbeats)
+STATUS_EVENTS = StatusBroadcaster(status_snapshot)
+
+def set_status(**fields):
+    with STATUS_LOCK:
+        job_status().update(fields)
+    STATUS_EVENTS.notify()
+
+def bump_status(key, amount=1):
+    status = job_status()
+    with STATUS_LOCK:
+        status[key] += amount
+        value = status[key]
+    STATUS_EVENTS.notify()
+    return value
+
+def record_duplicates_saved(count):
+    bump_status('duplicate_fetches_saved', count)
+    METRICS.inc("duplicate_fetches_saved_total", count)
+
+def get_status(key):
+    return job_status()[key]
+
+def should_stop():
+    """True when the current job hit a CAPTCHA or was cancelled; blocks while it is paused"""
+    if get_status("captcha_detected"):
+        return True
+    job = current_job()
+    return job is not None and job.checkpoint()
+
+def init_db(db_path=None):
+    """
+    Open the database at `db_path` (default DB_PATH) and the stores kept in it. Importing
+    this module touches no files; entry points (web.py, worker_node.py, cli.py) call this
+    once, and scraper_job calls it if nobody has.
+    """
+    global DB_PATH, PROXY_POOL, FRONTIER, PRODUCT_INDEX, WORK_QUEUE
+    if db_path is not None:
+        DB_PATH = db_path
+    conn = configure_connection(sqlite3.connect(DB_PATH))
+    # Creates the tables on a fresh file and upgrades older shein_scraper.db files in place
+    migrate_schema(conn)
     conn.close()
+    PROXY_POOL = ProxyPool(DB_PATH)
+    FRONTIER = Frontier(DB_PATH, write=db_write, freshness_ttl=FRESHNESS_TTL_HOURS * 3600)
+    PRODUCT_INDEX = ProductIndex(DB_PATH)
+    WORK_QUEUE = WorkQueue(DB_PATH)
 
-init_db()
+# Shared by every worker thread and job in this process
+PACER = RateController(rate=PACE_RATE, min_rate=PACE_MIN_RATE, max_rate=PACE_MAX_RATE, host_rate=HOST_RATE)
 
 def random_human_delay(a=1.5, b=4.5):
-    time.sleep(random.uniform(a, b))
+    with METRICS.time("human_delay"):
+        time.sleep(random.uniform(a, b))
 
 def fetch_free_proxies():
     import requests
-    proxies = []
-    for url in FREE_PROXY_ENDPOINTS:
+
+    def fetch(url):
         try:
             resp = requests.get(url, timeout=5)
             if resp.ok:
-                proxies += [line.strip() for line in resp.text.splitlines() if line.strip()]
+                return [line.strip() for line in resp.text.splitlines() if line.strip()]
         except Exception:
             pass
+        return []
+
+    with ThreadPoolExecutor(max_workers=len(FREE_PROXY_ENDPOINTS)) as pool:
+        proxies = [p for batch in pool.map(fetch, FREE_PROXY_ENDPOINTS) for p in batch]
     random.shuffle(proxies)
     return proxies
 
+# Healthy proxies are cached in the DB between runs; see proxy_pool.ProxyPool (opened by init_db)
+PROXY_POOL = None
+# Re-validate the free lists only when fewer cached proxies than this are still healthy
+MIN_HEALTHY_PROXIES = 10
+
+def get_ranked_proxies():
+    if PROXY_POOL.healthy() < MIN_HEALTHY_PROXIES:
+        set_status(message="Validating proxies")
+        PROXY_POOL.refresh(fetch_free_proxies())
+    return PROXY_POOL.ranked()
+
 def get_db_connection():
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
-def get_selenium_driver(proxy=None, headless=True):
+def random_user_agent():
+    return (f"Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+            f"AppleWebKit/537.36 (KHTML, like Gecko) "
+            f"Chrome/{random.randint(110, 120)}.0.{random.randint(1000,5000)}.100 "
+            f"Safari/537.36")
+
+def job_option(name, default=None):
+    """A per-job /scrape option for the running job, else `default`"""
+    job = current_job()
+    value = job.params.get(name) if job is not None else None
+    return default if value is None else value
+
+def current_policy():
+    """The running job's network policy override, else NETWORK_POLICY"""
+    return resolve_policy(job_option("network"), default=NETWORK_POLICY)
+
+def get_selenium_driver(proxy=None, headless=True, policy=None):
+    # Selenium's webdriver package loads every browser binding; only pay for it when a browser starts
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    policy = resolve_policy(policy, default=NETWORK_POLICY)
     options = Options()
     if headless:
         options.add_argument("--headless=new")
     options.add_argument("--disable-blink-features=AutomationControlled")
     options.add_argument("--disable-gpu")
     options.add_argument("--disable-extensions")
-    options.add_argument(f"user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                        f"AppleWebKit/537.36 (KHTML, like Gecko) "
-                        f"Chrome/{random.randint(110, 120)}.0.{random.randint(1000,5000)}.100 "
-                        f"Safari/537.36")
+    options.add_argument(f"user-agent={random_user_agent()}")
     if proxy:
         options.add_argument(f'--proxy-server={proxy}')
-    driver = webdriver.Chrome(ChromeDriverManager().install(), options=options)
+    policy.configure(options)
+    # The chromedriver binary is resolved once per process, not per launch
+    with METRICS.time("driver_start"):
+        driver = webdriver.Chrome(service=Service(chromedriver_path()), options=options)
     driver.set_window_size(random.randint(1280, 1920), random.randint(800, 1080))
+    policy.apply(driver)
+    driver.network_policy = policy
+    driver.proxy_address = proxy
     return driver
 
-# --- UPDATED XPATHS ---
-# Using all XPaths and notes provided by user
-XPATHS = {
-    "product_link": "placeholder",  # These actual links should be collected from category/PLP page, not from product page
-    "pagination_next": "//span[@aria-label='Page Next']",
-    "pagination_numbers": "//div[contains(@class, 'sui-pagination__center')]//span[contains(@class, 'sui-pagination__inner')]",
-    "product_images": "//div[@class = 'product-intro']//img[@class = 'lazyload crop-image-container__img']",
-    "product_title": "//div[@class = 'product-intro']//h1[contains(@class, 'product-intro__head-name')]",
-    "product_price_1": "//div[@class = 'product-intro']//div[contains(@class, 'from original')]",
-    "product_price_2": "//div[@class = 'product-intro']//p[contains(@class, 'product-intro__ssr-priceDel')]",
-    "product_price_3": "//div[@class = 'product-intro']//div[contains(@class, 'from original')]/span",
-    "product_color": "//div[@class = 'goods-color__radio-container']//div[contains(@class, 'goods-color__radio_block')]",
-    "product_size": "//div[@class = 'product-intro__size']//p[contains(@class, 'product-intro__sizes-item-text--one')]",
-    "product_description_btn": "//div[@class = 'product-intro__description']//span[contains(@class, 'head-icon')]",
-    "product_description": "//div[@class = 'product-intro__description-table']//div[contains(@class, 'product-intro__description-table-item')]",
-}
+# Browsers stay warm across categories and jobs; see driver_pool.DriverPool for recycling rules
+DRIVER_POOL = DriverPool(
+    lambda proxy, policy: get_selenium_driver(proxy, policy=policy),
+    size=MAX_BROWSERS,
+    max_pages=100,
+    max_heap_mb=768,
+    user_agent_factory=random_user_agent,
+)
+atexit.register(DRIVER_POOL.close)
+
+# Bytes received / requests blocked per page, from browsers whose policy has `measure` on
+TRAFFIC = TrafficMeter()
+
+def load_page(driver, url):
+    """Open `url` once the pacer allows it; a failed load slows down the driver's proxy"""
+    proxy = getattr(driver, "proxy_address", None)
+    with METRICS.time("pace"):
+        PACER.acquire(proxy, url)
+    try:
+        with METRICS.time("page_load"):
+            driver.get(url)
+    except Exception as e:
+        report_page(driver, url, "timeout" if isinstance(e, TimeoutException) else "error")
+        raise
+    record_traffic(driver)
+
+def report_page(driver, url, outcome):
+    """Feed a page's outcome (ok, or a rate_control.DECREASE kind) back to the pacer"""
+    proxy = getattr(driver, "proxy_address", None)
+    if outcome == "ok":
+        PACER.success(proxy, url)
+    else:
+        PACER.failure(proxy, url, outcome)
+        METRICS.inc("pace_backoffs_total", kind=outcome)
+
+def record_traffic(driver):
+    policy = getattr(driver, "network_policy", None)
+    if policy is None or not policy.measure or not METRICS.enabled:
+        return
+    traffic = TRAFFIC.collect(driver)
+    if traffic is None:
+        return
+    METRICS.inc("network_bytes_total", traffic.bytes)
+    METRICS.inc("network_bytes_saved_estimate_total", traffic.saved_estimate)
+    for kind, count in traffic.blocked.items():
+        METRICS.inc("blocked_requests_total", count, type=kind)
+
+def detect_block(driver, content_key=None):
+    """Block-page check of the open page (see block_detection), counted by the signal that decided it"""
+    with METRICS.time("block_check"):
+        verdict = detect_driver(driver, (content_key,) if content_key else None)
+    METRICS.inc("block_checks_total", signal=verdict.signal)
+    return verdict
 
 def is_captcha_page(driver):
-    text = driver.page_source.lower()
-    suspects = ['captcha', 'bot detection', 'verify', '/captcha/', '/challenge/']
-    return any(word in text for word in suspects)
+    return bool(detect_block(driver).blocked)
+
+def wait_for_page(driver, content_key, timeout=15):
+    """
+    Poll the cheap block probe until the page shows XPATHS[content_key] or a block marker.
+    A page showing neither after `timeout` gets the full check, page_source included.
+    """
+    def settled(d):
+        signals = probe(d, (content_key,))
+        verdict = classify(signals["url"], signals["title"], signals["markers"], signals["content"])
+        return verdict if verdict.blocked is not None else False
+
+    from selenium.webdriver.support.ui import WebDriverWait
+    with METRICS.time("wait"):
+        try:
+            verdict = WebDriverWait(driver, timeout).until(settled)
+        except Exception:
+            METRICS.inc("wait_timeouts_total", key=content_key)
+            return detect_block(driver, content_key)
+    METRICS.inc("block_checks_total", signal=verdict.signal)
+    return verdict
 
 def try_bypass_human(driver):
     try:
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        random_human_delay(1, 3)
+        random_human_delay(0.3, 0.8)
         driver.execute_script("window.scrollTo(0, 0);")
-        random_human_delay(0.5, 2)
+        random_human_delay(0.2, 0.5)
     except Exception:
         pass
 
 def wait_for_any(driver, by, selector, timeout=15, visible=False, many=False):
     """Helper function to wait for elements with proper error handling"""
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
     wait = WebDriverWait(driver, timeout)
-    try:
-        if many:
-            if visible:
-                return wait.until(EC.visibility_of_any_elements_located((by, selector)))
-            return wait.until(EC.presence_of_all_elements_located((by, selector)))
-        else:
-            if visible:
-                return wait.until(EC.visibility_of_element_located((by, selector)))
-            return wait.until(EC.presence_of_element_located((by, selector)))
-    except Exception:
-        # Return empty list or None if timeout
-        return [] if many else None
+    with METRICS.time("wait"):
+        try:
+            if many:
+                if visible:
+                    return wait.until(EC.visibility_of_any_elements_located((by, selector)))
+                return wait.until(EC.presence_of_all_elements_located((by, selector)))
+            else:
+                if visible:
+                    return wait.until(EC.visibility_of_element_located((by, selector)))
+                return wait.until(EC.presence_of_element_located((by, selector)))
+        except Exception:
+            METRICS.inc("wait_timeouts_total", key=XPATH_KEYS.get(selector, "other"))
+            # Return empty list or None if timeout
+            return [] if many else None
 
 def parse_products_on_page(driver):
     # Wait for product links to load before attempting to extract them
     elems = wait_for_any(driver, By.XPATH, XPATHS["product_link"], timeout=15, many=True)
     # Note: The user says these are gathered from the listing/category page, not the product page
-    links = [elem.get_attribute("href") for elem in elems if elem]
-    return list(set(links))
+    links = set(elem.get_attribute("href") for elem in elems if elem)
+    links.discard(None)
+    # One canonical URL per goods id: tracking parameters and slug variants collapse here
+    canonical = PRODUCT_INDEX.canonicalize(links)
+    if len(canonical) < len(links):
+        record_duplicates_saved(len(links) - len(canonical))
+    return canonical
+
+def extract_product_data(driver, mode=None, ready=False):
+    """`ready` means the caller already waited for the page, so the snapshot modes don't wait again"""
+    mode = mode or EXTRACTION_MODE
+    with METRICS.time("extract"):
+        if mode in ("state", "snapshot"):
+            return extract_product_snapshot(driver, use_state=(mode == "state"), ready=ready)
+        return extract_product_live(driver)
 
-def extract_product_data(driver):
+def extract_product_snapshot(driver, use_state=True, ready=False):
+    """Wait once for page readiness, then evaluate every selector against one page_source"""
+    if not ready:
+        wait_for_any(driver, By.XPATH, XPATHS["product_title"], timeout=15)
+    page_source = driver.page_source
+    base_url = driver.current_url
+    # Same as extract_product_from_html, but the parsed tree is kept for the checks below
+    data = extract_from_state(page_source, base_url) if use_state else None
+    doc = None
+    if not (data and all(data.values())):
+        doc = parse_html(page_source)
+        data = complete_from_dom(data, doc, base_url)
+    # The description table may only be rendered once its section is expanded (an empty
+    # description always went through the DOM above, so doc is already parsed)
+    if not data["description"] and select(doc, "product_description_btn"):
+        try:
+            desc_btn = driver.find_element(By.XPATH, XPATHS["product_description_btn"])
+            if desc_btn.is_displayed():
+                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", desc_btn)
+                desc_btn.click()
+                desc_items = wait_for_any(driver, By.XPATH, XPATHS["product_description"], timeout=5, many=True)
+                if desc_items:
+                    data["description"] = extract_descriptions(parse_html(driver.page_source))
+        except Exception:
+            pass
+    return data
+
+def extract_product_live(driver):
     # -- Helper functions with explicit waits --
     def get(xpath, timeout=7, visible=False):
         elem = wait_for_any(driver, By.XPATH, xpath, timeout=timeout, visible=visible)
@@ -213,476 +504,649 @@ def extract_product_data(driver):
         "images": images,
     }
 
-def save_product_row(product_url, data):
+# Set by scraper_job for the duration of a run outside the scheduler (scheduled jobs keep
+# their own on Job.writer); save_product_row falls back to a direct write without either
+PRODUCT_WRITER = None
+
+def current_writer():
+    job = current_job()
+    return job.writer if job is not None else PRODUCT_WRITER
+
+def report_db_error(error, rows=1):
+    bump_status('db_errors', rows)
+    set_status(error=f"Database write failed for {rows} row(s): {error}")
+
+def db_write(sql, params):
+    """Queue a write on the job's writer thread, or run it directly outside a job"""
+    writer = current_writer()
+    if writer is not None and writer.is_alive():
+        writer.put(sql, params)
+        return
     conn = get_db_connection()
-    c = conn.cursor()
     try:
-        c.execute(
-            '''INSERT OR REPLACE INTO products
-            (product_url, title, price, color, size, description, images)
-            VALUES (?, ?, ?, ?, ?, ?, ?)''',
-            (
-                product_url, 
-                data['title'], 
-                data['price'], 
-                ','.join(data['color']) if isinstance(data['color'], list) else data['color'],
-                ','.join(data['size']) if isinstance(data['size'], list) else data['size'],
-                str(data['description']),  # Actually JSON list of dicts
-                ','.join(data['images']) if isinstance(data['images'], list) else data['images']
-            )
-        )
-        conn.commit()
-    except Exception:
-        pass
+        with conn:
+            conn.execute(sql, params)
+    except sqlite3.Error as e:
+        report_db_error(e)
     finally:
         conn.close()
 
-def scrape_category(category_url, driver):
-    product_links = set()
+def db_write_many(statements):
+    """Queue several writes in order, or run them in one transaction outside a job"""
+    writer = current_writer()
+    if writer is not None and writer.is_alive():
+        writer.put_many(statements)
+        return
+    conn = get_db_connection()
+    try:
+        with conn:
+            for sql, params in statements:
+                conn.execute(sql, params)
+    except sqlite3.Error as e:
+        report_db_error(e)
+    finally:
+        conn.close()
+
+READ_LOCAL = threading.local()
+
+def read_connection():
+    """This thread's long-lived connection for lookups made on every product (reopened if DB_PATH changes)"""
+    conn = getattr(READ_LOCAL, "conn", None)
+    if conn is None or READ_LOCAL.path != DB_PATH:
+        conn = READ_LOCAL.conn = configure_connection(sqlite3.connect(DB_PATH, timeout=30))
+        READ_LOCAL.path = DB_PATH
+    return conn
+
+def save_product_row(product_url, data):
+    # Product row plus its colors/sizes/images/attributes child rows, search entry and a
+    # product_history delta; nothing at all when the content hash matches the stored row (see schema.py)
+    with METRICS.time("save"):
+        try:
+            previous = stored_fields(read_connection(), product_url)
+        except sqlite3.Error:
+            previous = None
+        statements = product_statements(product_url, data, previous=previous)
+        if not statements:
+            bump_status('products_unchanged')
+            METRICS.inc("products_unchanged_total")
+            return
+        db_write_many(statements)
+
+# Opened by init_db: the crawl frontier (frontier.py), and goods id -> canonical product URL,
+# shared by every job and run (product_ids.py)
+FRONTIER = None
+PRODUCT_INDEX = None
+
+def record_db_flush(seconds, rows):
+    METRICS.observe("db_flush", seconds)
+    METRICS.inc("db_rows_written_total", rows)
+
+def start_product_writer():
+    global PRODUCT_WRITER
+    # Write errors are reported on the job that queued the rows, from the writer thread
+    writer = BatchWriter(DB_PATH, on_error=bound(report_db_error), on_flush=record_db_flush)
+    writer.start()
+    job = current_job()
+    if job is not None:
+        job.writer = writer
+    else:
+        PRODUCT_WRITER = writer
+    return writer
+
+def stop_product_writer(writer):
+    global PRODUCT_WRITER
+    job = current_job()
+    if job is not None and job.writer is writer:
+        job.writer = None
+    if PRODUCT_WRITER is writer:
+        PRODUCT_WRITER = None
+    return writer.close()
+
+def listing_page_url(category_url, page):
+    """Category URL with its `page` query parameter set, keeping every other parameter"""
+    parts = urlsplit(category_url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "page"]
+    if page > 1:
+        query.append(("page", str(page)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+def read_page_count(driver):
+    """Highest page number shown in the pagination bar (1 when there is none)"""
+    numbers = [1]
+    for elem in driver.find_elements(By.XPATH, XPATHS["pagination_numbers"]):
+        text = elem.text.strip()
+        if text.isdigit():
+            numbers.append(int(text))
+    return max(numbers)
+
+def load_listing_page(driver, url):
+    """Open one listing page and return its product links, or None if it is a CAPTCHA page; raises if it shows neither"""
+    load_page(driver, url)
+    # Returns as soon as product links or a block marker show up
+    verdict = wait_for_page(driver, "product_link", timeout=20)
+    try_bypass_human(driver)
+    if verdict.blocked:
+        # Scrolling occasionally clears a soft challenge; look again before giving up
+        verdict = detect_block(driver, "product_link")
+    if verdict.blocked:
+        report_page(driver, url, "blocked")
+        return None
+    if not verdict.content:
+        # An error page or a load that never finished: fail it so the page is retried
+        report_page(driver, url, "timeout")
+        raise TimeoutException(f"No product links on {url}")
+    report_page(driver, url, "ok")
+    return parse_products_on_page(driver)
+
+def follow_next_pages(driver, handle_links):
+    """Fallback for listings without page numbers: click through pagination_next"""
     page = 1
-    while True:
-        SCRAPER_STATUS['message'] = f"Scraping page {page} of category"
-        driver.get(category_url)
-        # Wait for product links to load before proceeding
-        wait_for_any(driver, By.XPATH, XPATHS["product_link"], timeout=20, many=True)
-        random_human_delay(2, 4)
-        try_bypass_human(driver)
-        if is_captcha_page(driver):
-            SCRAPER_STATUS.update({
-                "status": "Blocked",
-                "error": "CAPTCHA encountered - manual intervention required.",
-                "captcha_detected": True
-            })
-            return product_links
-        links = parse_products_on_page(driver)
-        for link in links:
-            product_links.add(link)
-        SCRAPER_STATUS['product_links_found'] = len(product_links)
+    while not should_stop():
         try:
             # Wait for next pagination button with explicit wait
             next_btn = wait_for_any(driver, By.XPATH, XPATHS["pagination_next"], timeout=10, visible=True)
-            if next_btn and next_btn.is_displayed():
-                # Scroll to pagination button before clicking
-                driver.execute_script("arguments[0].scrollIntoView({block: 'center', inline: 'center'});", next_btn)
-                random_human_delay(0.3, 0.7)
-                next_btn.click()
-            else:
-                break
+            if not (next_btn and next_btn.is_displayed()):
+                return
+            # Scroll to pagination button before clicking
+            driver.execute_script("arguments[0].scrollIntoView({block: 'center', inline: 'center'});", next_btn)
+            random_human_delay(0.3, 0.7)
+            url = driver.current_url
+            with METRICS.time("pace"):
+                PACER.acquire(getattr(driver, "proxy_address", None), url)
+            next_btn.click()
         except Exception:
-            break
+            return
         page += 1
-        random_human_delay()
+        set_status(message=f"Scraping page {page} of category")
+        verdict = wait_for_page(driver, "product_link", timeout=20)
+        if verdict.blocked:
+            report_page(driver, url, "blocked")
+            report_listing_captcha()
+            return
+        report_page(driver, url, "ok" if verdict.content else "timeout")
+        handle_links(parse_products_on_page(driver))
+
+def report_listing_captcha():
+    METRICS.inc("captcha_hits_total", stage="listing")
+    set_status(
+        status="Blocked",
+        error="CAPTCHA encountered - manual intervention required.",
+        captcha_detected=True,
+    )
+
+def retry_backoff():
+    return Backoff(base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY, max_attempts=RETRY_MAX_ATTEMPTS)
+
+def record_dead_letter(stage, url, attempts, error):
+    """A page that ran out of retries; a product also counts as one failed visit in the frontier"""
+    with RESULTS_LOCK:
+        job_dead_letters().append({
+            "stage": stage,
+            "url": url,
+            "attempts": attempts,
+            "error": str(error)[:500],
+            "failed_at": time.time(),
+        })
+    bump_status('dead_letters')
+    METRICS.inc("dead_letters_total", stage=stage)
+    if stage == "product":
+        FRONTIER.mark_failed(url, error)
+
+class WorkerBrowser:
+    """
+    One worker's browser. A failed page retires it and moves the worker to the next proxy,
+    so the rest of the work carries on with a fresh driver; the old one is released first,
+    so a worker never holds more than one browser. A `driver` passed in belongs
+    to the caller: it is used until its first failure and never released here.
+    """
+    def __init__(self, proxies, index, driver=None):
+        self.proxies = proxies or []
+        self.slot = index
+        self.driver = driver
+        self.owned = False
+        self.pages = 0
+
+    @property
+    def proxy(self):
+        if self.driver is not None:
+            return getattr(self.driver, "proxy_address", None)
+        return self.proxies[self.slot % len(self.proxies)] if self.proxies else None
+
+    def get(self):
+        if self.driver is None:
+            self.driver = DRIVER_POOL.acquire(self.proxy, current_policy())
+            self.owned = True
+            self.pages = 0
+        self.pages += 1
+        return self.driver
+
+    def fail(self, kind):
+        proxy = self.proxy
+        if proxy:
+            PROXY_POOL.report_failure(proxy)
+            METRICS.inc("proxy_results_total", result="failure")
+        self.release(broken=True)
+        self.slot += 1
+        METRICS.inc("failovers_total", kind=kind)
+
+    def release(self, broken=False):
+        if self.driver is not None and self.owned:
+            proxy = self.proxy
+            DRIVER_POOL.release(self.driver, pages=self.pages, broken=broken)
+            if proxy and not broken:
+                PROXY_POOL.report_success(proxy)
+                METRICS.inc("proxy_results_total", result="success")
+        self.driver = None
+        self.owned = False
+
+def run_units(units, handle, workers=1, driver=None, proxies=None, stage="product"):
+    """
+    Work through a RetryQueue on `workers` threads, each with its own WorkerBrowser.
+    Worker 0 starts on `driver` when given; the others rotate through `proxies`.
+    handle(browser, unit) returns False for a block page. A block page or an exception
+    fails the worker over to a new browser and hands just that unit back with backoff.
+    Returns the unit whose block page stopped the stage, else None.
+    """
+    block_limit = max(1, min(MAX_CONSECUTIVE_BLOCKS, len(proxies or ())))
+    halted = threading.Event()
+    stopped_at = []
+    streak = [0]
+    streak_lock = threading.Lock()
+
+    def stopping():
+        return halted.is_set() or should_stop()
+
+    def worker(index):
+        browser = WorkerBrowser(proxies, index, driver if index == 0 else None)
+        try:
+            while not stopping():
+                unit = units.get(stop=stopping)
+                if unit is None:
+                    return
+                try:
+                    error = None
+                    try:
+                        blocked = not handle(browser, unit)
+                    except Exception as e:
+                        blocked, error = False, e
+                    if not blocked and error is None:
+                        with streak_lock:
+                            streak[0] = 0
+                        continue
+                    kind = "blocked" if blocked else "error"
+                    browser.fail(kind)
+                    if blocked:
+                        METRICS.inc("captcha_hits_total", stage=stage)
+                        error = "CAPTCHA page"
+                        with streak_lock:
+                            streak[0] += 1
+                            if streak[0] >= block_limit and not halted.is_set():
+                                stopped_at.append(unit)
+                                halted.set()
+                        if halted.is_set():
+                            # Not retried: a product stays pending in the frontier for the next run
+                            return
+                    if units.retry(unit, error) is not None:
+                        bump_status('retries')
+                        METRICS.inc("retries_total", stage=stage, kind=kind)
+                finally:
+                    units.done()
+        finally:
+            browser.release()
+
+    if workers == 1:
+        worker(0)
+    else:
+        threads = [threading.Thread(target=bound(worker), args=(i,), daemon=True) for i in range(workers)]
+        for thr in threads:
+            thr.start()
+        for thr in threads:
+            thr.join()
+    return stopped_at[0] if stopped_at else None
+
+def scrape_category(category_url, driver=None, workers=1, proxies=None, on_links=None):
+    """
+    Collect a category's product links. Page 1 is loaded first to read the page count
+    from pagination_numbers; pages 2..N are then opened directly by URL across `workers`
+    browsers, each page retried on its own (see run_units). Worker 0 starts on `driver`
+    when given. `on_links` receives each page's new links as soon as it is parsed.
+    """
+    product_links = set()
+    links_lock = threading.Lock()
+    total = [None]
+
+    def handle_links(links):
+        # Persist discoveries page by page so a block or crash doesn't lose them
+        FRONTIER.add(category_url, links)
+        with links_lock:
+            new = [link for link in links if link not in product_links]
+            product_links.update(new)
+            set_status(product_links_found=len(product_links))
+        if len(new) < len(links):
+            # Listed again on a later page, usually under different tracking parameters
+            record_duplicates_saved(len(links) - len(new))
+        if on_links and new:
+            on_links(new)
+
+    def dead_page(page, attempts, error):
+        record_dead_letter("listing", listing_page_url(category_url, page), attempts, error)
+
+    def scrape_page(browser, page):
+        if page == 1:
+            set_status(message="Scraping page 1 of category")
+        else:
+            set_status(message=f"Scraping page {page} of {total[0]} in category")
+        wdriver = browser.get()
+        links = load_listing_page(wdriver, listing_page_url(category_url, page))
+        if links is None:
+            return False
+        handle_links(links)
+        if page == 1:
+            total[0] = read_page_count(wdriver)
+            if total[0] == 1:
+                follow_next_pages(wdriver, handle_links)
+            else:
+                # Page 1 is still in flight, so the queue stays open for these
+                pages.put_many(range(2, total[0] + 1))
+        return True
+
+    pages = RetryQueue([1], backoff=retry_backoff(), on_dead=dead_page)
+    if run_units(pages, scrape_page, workers, driver, proxies, stage="listing") is not None:
+        report_listing_captcha()
+    for page, attempts, error in pages.dead:
+        if page == 1:
+            raise RuntimeError(f"Category page 1 failed {attempts} times: {error}")
     return product_links
 
-def scrape_products(product_links, driver):
-    import json
-    SCRAPER_RESULTS.clear()
-    count = 0
-    for url in product_links:
-        driver.get(url)
-        # Wait for product title to appear as indicator that page has loaded
-        wait_for_any(driver, By.XPATH, XPATHS["product_title"], timeout=15)
-        random_human_delay(1, 3)
-        try_bypass_human(driver)
-        if is_captcha_page(driver):
-            SCRAPER_STATUS.update({
-                "status": "Blocked",
-                "error": f"CAPTCHA on product page {url[:40]}...",
-                "captcha_detected": True
-            })
+class LinkStream(RetryQueue):
+    """
+    Product URLs flowing from the listing stage to the product stage. Consumers block
+    in get() until a URL arrives or the producer calls close() and the queue drains.
+    Failed URLs come back through retry() and dead-letter into the job.
+    """
+    def __init__(self, urls=None):
+        super().__init__(urls, backoff=retry_backoff(),
+                         on_dead=lambda url, attempts, error: record_dead_letter("product", url, attempts, error))
+
+    def iter_urls(self, stop=None):
+        """Yield URLs as they arrive until the stream is finished or `stop()` is true"""
+        while True:
+            url = self.get(stop=stop)
+            if url is None:
+                return
+            # The HTTP stage hands failures to the browser stage, never back here
+            self.done()
+            yield url
+
+def scrape_product(url, driver):
+    """Visit a single product page; returns the extracted data, None if blocked, and raises if no product shows up"""
+    load_page(driver, url)
+    # Returns as soon as the product title or a block marker shows up
+    verdict = wait_for_page(driver, "product_title", timeout=15)
+    try_bypass_human(driver)
+    if verdict.blocked:
+        verdict = detect_block(driver, "product_title")
+    if verdict.blocked:
+        report_page(driver, url, "blocked")
+        return None
+    if not verdict.content:
+        # An error page or a load that never finished: fail it so the URL is retried
+        report_page(driver, url, "timeout")
+        raise TimeoutException(f"No product content on {url}")
+    report_page(driver, url, "ok")
+    data = extract_product_data(driver, ready=True)
+    data['product_url'] = url
+    return data
+
+IMAGE_STAGE = None
+IMAGE_STAGE_LOCK = threading.Lock()
+
+def record_image_result(outcome, url, nbytes):
+    METRICS.inc("images_total", outcome=outcome)
+    if nbytes:
+        METRICS.inc("image_bytes_downloaded_total", nbytes)
+
+def image_stage():
+    """The shared image download thread, started on first use"""
+    global IMAGE_STAGE
+    with IMAGE_STAGE_LOCK:
+        if IMAGE_STAGE is None:
+            store = ImageStore(DB_PATH, root=IMAGE_DIR, max_bytes=IMAGE_STORE_MAX_MB * 1024 * 1024)
+            pipeline = ImagePipeline(store, concurrency=HTTP_CONCURRENCY, user_agent=random_user_agent(),
+                                     on_result=record_image_result)
+            IMAGE_STAGE = ImageStage(pipeline)
+            IMAGE_STAGE.start()
+            atexit.register(pipeline.close)
+        return IMAGE_STAGE
+
+def record_product(url, data):
+    with RESULTS_LOCK:
+        job_results().append(data)
+    job = current_job()
+    if job is not None and job.on_product is not None:
+        job.on_product(data)
+    save_product_row(url, data)
+    if job_option("download_images", DOWNLOAD_IMAGES):
+        image_stage().put_many(as_list(data.get('images')))
+    FRONTIER.mark_done(url)
+    bump_status('products_scraped')
+
+def scrape_products(product_links, driver=None, workers=1, proxies=None):
+    """
+    Scrape product pages with a pool of `workers` browsers pulling from a shared URL queue.
+    Worker 0 reuses `driver` when given; every other worker starts its own driver,
+    rotating through `proxies`. A URL that fails is retried on its own (see run_units).
+    Products are added to the job's results, which scraper_job clears once per job.
+    """
+    stream = product_links if isinstance(product_links, LinkStream) else LinkStream(product_links)
+    if stream.closed.is_set():
+        workers = min(workers, len(stream))
+    workers = max(1, workers)
+
+    def scrape(browser, url):
+        data = scrape_product(url, browser.get())
+        if data is None:
+            return False
+        record_product(url, data)
+        return True
+
+    url = run_units(stream, scrape, workers, driver, proxies, stage="product")
+    if url is not None:
+        set_status(
+            status="Blocked",
+            error=f"CAPTCHA on product page {url[:40]}...",
+            captcha_detected=True,
+        )
+    return job_results()
+
+def extract_fetched_page(result):
+    """
+    (data, blocked) for a product page fetched over HTTP; data is None unless it has
+    REQUIRED_FIELDS. A complete inline state is taken as is, without parsing the page.
+    Otherwise the page is parsed once: the tree fills the missing fields and, if the
+    required ones are still empty, the block detector runs on the same tree.
+    """
+    data = extract_from_state(result.body, result.final_url)
+    if data and all(data.values()):
+        return data, False
+    doc = parse_page(result.body)
+    if doc is None:
+        return None, False
+    data = complete_from_dom(data, doc, result.final_url)
+    if all(data[k] for k in REQUIRED_FIELDS):
+        return data, False
+    return None, looks_blocked(result, doc)
+
+def scrape_products_http(product_links, driver=None, workers=1, proxies=None):
+    """
+    Fetch product pages over pooled HTTP and extract them from the raw HTML; pages that
+    look blocked or lack REQUIRED_FIELDS are handed to the browser workers afterwards.
+    """
+    proxy = proxies[0] if proxies else None
+    fetcher = HttpFetcher(
+        concurrency=HTTP_CONCURRENCY,
+        proxy=proxy,
+        user_agent=random_user_agent(),
+        pacer=PACER,
+    )
+    stream = product_links if isinstance(product_links, LinkStream) else LinkStream(product_links)
+    escalate = []
+    # One session for the whole stream; the fetcher reads from it on its own thread
+    for result in fetcher.iter_fetch(stream.iter_urls(stop=bound(should_stop))):
+        if should_stop():
             break
-        data = extract_product_data(driver)
-        data['product_url'] = url
-        # Save as JSON in DB for the "description" (list of key/vals)
-        data_save = data.copy()
-        data_save['description'] = json.dumps(data['description'])
-        SCRAPER_RESULTS.append(data)
-        save_product_row(url, data_save)
-        count += 1
-        SCRAPER_STATUS['products_scraped'] = count
-    return SCRAPER_RESULTS
-
-def scraper_job(category_urls, use_proxies=True):
-    SCRAPER_STATUS.update({
-        "status": "Processing",
-        "product_links_found": 0,
-        "products_scraped": 0,
-        "error": "",
-        "captcha_detected": False,
-        "message": "",
-    })
-    proxies = fetch_free_proxies() if use_proxies else []
+        data = None
+        if looks_blocked(result):
+            METRICS.inc("captcha_hits_total", stage="http")
+            PACER.failure(proxy, result.url, "blocked")
+        elif result.error is not None:
+            PACER.failure(proxy, result.url, "timeout" if isinstance(result.error, asyncio.TimeoutError) else "error")
+        elif result.ok:
+            with METRICS.time("extract_http"):
+                data, blocked = extract_fetched_page(result)
+            if blocked:
+                METRICS.inc("captcha_hits_total", stage="http")
+                PACER.failure(proxy, result.url, "blocked")
+            else:
+                PACER.success(proxy, result.url)
+        if data is None:
+            escalate.append(result.url)
+            continue
+        data['product_url'] = result.url
+        record_product(result.url, data)
+        bump_status('fast_path_pages')
+    if escalate:
+        before = get_status('products_scraped')
+        scrape_products(LinkStream(escalate), driver, workers=workers, proxies=proxies)
+        bump_status('browser_path_pages', get_status('products_scraped') - before)
+    return job_results()
+
+def scraper_job(category_urls, use_proxies=True, workers=DEFAULT_WORKERS, freshness_hours=FRESHNESS_TTL_HOURS,
+                fetch_mode=DEFAULT_FETCH_MODE):
+    reset = dict(STATUS_DEFAULTS, status="Processing")
+    reset.pop("current_category")
+    set_status(**reset)
+    # Every category's stages add to these, so the job's totals cover all of them
+    job_results().clear()
+    job_dead_letters().clear()
+    metrics_before = METRICS.snapshot()
+    started = time.monotonic()
+    if FRONTIER is None:
+        init_db()
+    new_seen_set()
+    writer = start_product_writer()
+    try:
+        run_categories(category_urls, use_proxies, workers, freshness_hours * 3600, fetch_mode)
+    finally:
+        # Make sure every queued row is committed before the job reports completion
+        stop_product_writer(writer)
+        if IMAGE_STAGE is not None and job_option("download_images", DOWNLOAD_IMAGES):
+            set_status(message="Downloading images")
+            IMAGE_STAGE.drain()
+        PROXY_POOL.save()
+        set_status(job_metrics=job_summary(metrics_before, time.monotonic() - started))
+    job = current_job()
+    if get_status('captcha_detected'):
+        set_status(status="Blocked", message=get_status('error'))
+    elif job is not None and job.cancelled.is_set():
+        set_status(status="Cancelled", message="Cancelled - unfinished links stay in the frontier")
+    elif get_status('dead_letters'):
+        set_status(status="Completed",
+                   message=f"Scraping Finished - {get_status('dead_letters')} page(s) failed every retry")
+    else:
+        set_status(status="Completed", message="Scraping Finished")
+
+def job_summary(metrics_before, elapsed):
+    """Per-stage time breakdown and throughput for the job that just finished"""
+    job = current_job()
+    # Outside a job there is only the global Metrics, so report what it gained during the run
+    summary = job.metrics.summary_since() if job is not None else METRICS.summary_since(metrics_before)
+    summary["elapsed_seconds"] = round(elapsed, 2)
+    summary["network_policy"] = current_policy().describe()
+    summary["products_per_minute"] = round(get_status("products_scraped") * 60 / elapsed, 2) if elapsed else 0
+    return summary
+
+# /scrape options read back through job_option() rather than passed to scraper_job
+JOB_OPTIONS = ("network", "download_images")
+
+def run_scheduled_job(job):
+    params = {k: v for k, v in job.params.items() if k not in JOB_OPTIONS}
+    scraper_job(params.pop("category_urls"), **params)
+
+# Distributed mode: /dispatch publishes category tasks here for worker_node.py processes (opened by init_db)
+WORK_QUEUE = None
+
+# Queues /scrape requests and runs them under the MAX_BROWSERS budget (see jobs.py)
+JOBS = JobScheduler(run_scheduled_job, STATUS_DEFAULTS, max_browsers=MAX_BROWSERS, on_change=STATUS_EVENTS.notify)
+
+def run_categories(category_urls, use_proxies, workers, freshness_ttl, fetch_mode=DEFAULT_FETCH_MODE):
+    product_stage = scrape_products_http if fetch_mode == "http" else scrape_products
+    # Best-scored proxies first
+    proxies = get_ranked_proxies() if use_proxies else []
+    candidates = proxies[:] if proxies else [None]
+    # Launch the first category's browsers up front (the proxies the listing workers and the
+    # product workers will ask for) so startup isn't paid inside the category loop
+    DRIVER_POOL.prewarm([candidates[i % len(candidates)] for i in range(workers)] * 2, current_policy())
     for category_url in category_urls:
-        SCRAPER_STATUS['current_category'] = category_url
-        driver = None
-        for proxy in (proxies[:] if proxies else [None]):
-            try:
-                SCRAPER_STATUS['message'] = f"Using proxy: {proxy or 'None'}"
-                driver = get_selenium_driver(proxy)
-                product_links = scrape_category(category_url, driver)
-                if SCRAPER_STATUS["captcha_detected"]:
-                    break
-                scrape_products(product_links, driver)
-                driver.quit()
-                break
-            except Exception as e:
-                SCRAPER_STATUS['status'] = 'Error'
-                SCRAPER_STATUS['error'] = f"Error: {str(e)}"
-                if driver:
-                    driver.quit()
-                continue
-        if SCRAPER_STATUS["captcha_detected"]:
+        set_status(current_category=category_url)
+        # Failed pages are retried and failed over one by one inside the stages; only a
+        # category whose first page can't be loaded at all ends up here
+        try:
+            scrape_category_streaming(category_url, product_stage, workers, proxies, freshness_ttl)
+        except Exception as e:
+            set_status(status='Error', error=f"Error: {str(e)}")
+        if should_stop():
             break
-    SCRAPER_STATUS['status'] = "Completed" if not SCRAPER_STATUS['captcha_detected'] else "Blocked"
-    SCRAPER_STATUS['message'] = "Scraping Finished" if not SCRAPER_STATUS['captcha_detected'] else SCRAPER_STATUS['error']
-
-# --- Flask Routes (unchanged) ---
-
-MINIMAL_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <title>Shein Scraper Dashboard</title>
-    <meta name="viewport" content="width=device-width, initial-scale=1">
-    <!-- Modernizable CSS for dashboard UI -->
-    <style>
-        :root {
-            --primary: #5145cd;
-            --accent: #28c76f;
-            --danger: #ea5455;
-            --header-bg: #282a36;
-            --card-bg: #fff;
-            --text-main: #222;
-            --gray-bg: #f7f7fb;
-        }
-        body {
-            background: var(--gray-bg);
-            font-family: 'Segoe UI', Arial, sans-serif;
-            margin: 0;
-            color: var(--text-main);
-        }
-        .header {
-            background: var(--primary);
-            color: #fff;
-            padding: 2rem 2rem 1rem 2rem;
-        }
-        .header h1 { margin: 0 0 0.1em 0; font-size: 2.1em; }
-        .stat-cards {
-            display: flex;
-            gap: 2em;
-            margin: 1.2em 0;
-        }
-        .card {
-            background: var(--card-bg);
-            box-shadow: 0 2px 10px #0001;
-            border-radius: 10px;
-            flex: 1;
-            padding: 1em;
-            display: flex;
-            flex-direction: column;
-            align-items: flex-start;
-        }
-        .card-main {
-            font-size: 2em;
-            margin-bottom: 0.3em;
-        }
-        .card-label {
-            color: #666;
-            letter-spacing: 0.1em;
-            font-size: 0.96em;
-        }
-        .main-container {
-            max-width: 1100px;
-            margin: auto;
-            background: var(--card-bg);
-            box-shadow: 0 8px 38px #5145cd10;
-            border-radius: 18px;
-            padding: 2rem 2.5rem 3rem 2.5rem;
-            margin-top: -2.5rem;
-        }
-        .input-section label {
-            font-weight: 600;
-            font-size: 1.03em;
-        }
-        textarea {
-            width: 100%;
-            min-height: 80px;
-            resize: vertical;
-            font-size: 1.05em;
-            border-radius: 5px;
-            border: 1.5px solid #dedede;
-            padding: 0.7em 1em;
-            font-family: inherit;
-            background: #fafaff;
-        }
-        .actions {
-            margin: 1em 0 0 0;
-            display: flex;
-            gap: 0.9em;
-        }
-        button, .export-btn {
-            background: var(--primary);
-            color: #fff;
-            border: none;
-            border-radius: 6px;
-            padding: 0.7em 1.8em;
-            font-size: 1.03em;
-            cursor: pointer;
-            font-weight: 500;
-            transition: background 0.2s;
-            text-decoration: none;
-            display: inline-block;
-        }
-        button:hover, .export-btn:hover {background: var(--accent);}
-        .status-wrap {
-            margin: 2em 0 0 0;
-        }
-        .status-label {
-            font-weight: 700;
-            font-size: 1.07em;
-            margin-right: 0.5em;
-        }
-        .status-indicator {
-            display: inline-block;
-            width: 11px; height: 11px;
-            border-radius: 50%;
-            margin: 0 0.4em 0 0;
-            background: var(--gray-bg);
-            vertical-align: middle;
-        }
-        .is-idle {background: #c1c1c1;}
-        .is-processing {background: var(--primary);}
-        .is-bypass {background: #eab308;}
-        .is-blocked {background: var(--danger);}
-        .is-completed {background: var(--accent);}
-        .is-error {background: var(--danger);}
-        .data-grid-wrap {
-            margin: 3em 0 1em 0;
-        }
-        table {
-            width: 100%;
-            border-collapse: collapse;
-            background: #fff;
-            border-radius: 8px;
-            box-shadow: 0 1px 6px #2221;
-        }
-        th, td {
-            border: 1px solid #eaeaea;
-            padding: 0.9em 0.7em;
-            text-align: left;
-            font-size: 0.99em;
-        }
-        th {
-            background: #fafafa;
-            color: #333;
-        }
-        tbody tr:nth-child(odd) {background: #f8f7fc;}
-        .img-list a {
-            margin-right: 4px;
-            background: #eee;
-            padding: 2px 6px;
-            border-radius: 3px;
-            font-size: 0.87em;
-        }
-        @media (max-width: 900px) {
-            .stat-cards { flex-direction: column; gap: 0.8em; }
-            .main-container { padding: 1.3rem; }
-        }
-        @media (max-width: 600px) {
-            .header, .main-container { padding-left: 0.6em; padding-right: 0.6em; }
-        }
-        .progress-bar-wrap { margin: 0.7em 0; height: 13px; background: #e8ecfa; border-radius: 5px; overflow: hidden;}
-        .progress-bar { height: 100%; background: var(--primary);}
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>Shein Product Scraper Dashboard</h1>
-        <div class="stat-cards" id="dashboard-cards">
-            <!-- Cards updated via JS -->
-            <div class="card">
-                <span class="card-main" id="scraped-products-count">0</span>
-                <div class="card-label">Products Scraped</div>
-            </div>
-            <div class="card">
-                <span class="card-main" id="product-links-count">0</span>
-                <div class="card-label">Links Found</div>
-            </div>
-            <div class="card">
-                <span class="card-main" id="current-category">-</span>
-                <div class="card-label">Current Category</div>
-            </div>
-            <div class="card">
-                <span class="card-main status-indicator is-idle" id="status-indicator"></span>
-                <div class="card-label" id="scraper-status-text">Status</div>
-            </div>
-        </div>
-    </div>
-    <div class="main-container">
-        <div class="input-section">
-            <label for="cat-urls">Input Shein Category URLs:</label><br>
-            <textarea id="cat-urls" rows="3" placeholder="Paste one Shein category URL per line"></textarea>
-            <div class="actions">
-                <button id="scrape-btn">Start Scraping</button>
-                <a class="export-btn" href="/export" target="_blank">Export CSV</a>
-                <button id="refresh-btn" type="button">Refresh Table</button>
-            </div>
-        </div>
-        <div class="status-wrap">
-            <span class="status-label">Progress:</span>
-            <span id="progress-prod">0</span>/<span id="progress-total">0</span>
-            <div class="progress-bar-wrap">
-                <div class="progress-bar" id="progress-bar" style="width:0%;"></div>
-            </div>
-            <span class="status-label">Last Message:</span>
-            <span id="scraper-message">Idle</span>
-        </div>
-        <div class="data-grid-wrap">
-            <h2 style="margin-bottom:0.5em;">Scraped Products</h2>
-            <div id="data-view"></div>
-        </div>
-    </div>
-    <footer style="margin:3em 0 1em 0; text-align:center; font-size:0.95em; color:#888;">
-        &copy; 2024 Carregar (Pty) Ltd &ndash; Shein Advanced Scraper Dashboard
-    </footer>
-    <script>
-        // Update stat cards and UI from status
-        function updateDashboard(status) {
-            document.getElementById('scraped-products-count').textContent = status.products_scraped;
-            document.getElementById('product-links-count').textContent = status.product_links_found;
-            document.getElementById('current-category').textContent = status.current_category || "-";
-            document.getElementById('progress-prod').textContent = status.products_scraped;
-            document.getElementById('progress-total').textContent = status.product_links_found;
-
-            // update status indicator and text
-            var el = document.getElementById('status-indicator');
-            el.className = 'card-main status-indicator';
-            var statusMap = {
-                "Idle": "is-idle",
-                "Processing": "is-processing",
-                "Attempting Bypass": "is-bypass",
-                "Blocked": "is-blocked",
-                "Completed": "is-completed",
-                "Error": "is-error"
-            };
-            var state = status.status;
-            if (statusMap[state]) el.classList.add(statusMap[state]);
-            document.getElementById('scraper-status-text').textContent = state;
-
-            // update progress bar
-            let perc = (status.product_links_found > 0)
-                ? Math.round(100.0 * status.products_scraped/status.product_links_found)
-                : 0;
-            document.getElementById('progress-bar').style.width = perc + "%";
-
-            document.getElementById('scraper-message').textContent = status.message || "";
-        }
-
-        function fetchStatus() {
-            fetch('/status').then(r=>r.json()).then(d=>{
-                updateDashboard(d);
-                if(d.status == "Processing" || d.status == "Attempting Bypass") setTimeout(fetchStatus, 3000);
-            });
-        }
-
-        function startScraping(){
-            let urls = document.getElementById('cat-urls').value.split('\n');
-            fetch('/scrape', {
-                method: 'POST',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({category_urls: urls})
-            }).then(r=>r.json()).then(d=>{
-                fetchStatus();
-                setTimeout(loadTable, 3000);
-            });
-        }
-
-        function loadTable() {
-            fetch('/data').then(r=>r.json()).then(rows=>{
-                let html = '<table><thead><tr><th>Title</th><th>Price</th><th>Colors</th><th>Sizes</th><th>Description</th><th>Images</th><th>Link</th></tr></thead><tbody>';
-                for(let row of rows){
-                    html += '<tr>'
-                        + `<td>${row.title}</td>`
-                        + `<td>${row.price}</td>`
-                        + `<td>${Array.isArray(row.color) ? row.color.join(", ") : row.color}</td>`
-                        + `<td>${Array.isArray(row.size) ? row.size.join(", ") : row.size}</td>`
-                        + `<td style="max-width:250px">${Array.isArray(row.description) ? row.description.map(x => x.key + ": " + x.value).join("<br>") : row.description}</td>`
-                        + `<td class="img-list">${(row.images || '').split(',').map(u=>"<a href='"+u+"' target='_blank'>img</a>").join(' ')}</td>`
-                        + `<td><a href="${row.product_url}" target="_blank">Link</a></td>`
-                        + '</tr>';
-                }
-                html += "</tbody></table>";
-                document.getElementById('data-view').innerHTML = html;
-            });
-        }
-
-        document.getElementById('scrape-btn').onclick = startScraping;
-        document.getElementById('refresh-btn').onclick = loadTable;
-        window.onload = function() {
-            fetchStatus();
-            loadTable();
-        };
-    </script>
-</body>
-</html>
-"""
-
-@app.route('/')
-def index():
-    return render_template_string(MINIMAL_TEMPLATE)
-
-@app.route('/status')
-def status():
-    return jsonify(SCRAPER_STATUS)
-
-@app.route('/scrape', methods=['POST'])
-def scrape():
-    category_urls = request.json.get('category_urls', [])
-    thr = threading.Thread(target=scraper_job, args=(category_urls,))
-    thr.daemon = True
-    thr.start()
-    return jsonify({"ok": True, "msg": "Scraping launched"})
-
-@app.route('/data')
-def data_view():
-    conn = get_db_connection()
-    rows = conn.execute("SELECT * FROM products").fetchall()
-    conn.close()
-    import json
-    records = []
-    for row in rows:
-        rec = dict(row)
+
+def scrape_category_streaming(category_url, product_stage, workers, proxies, freshness_ttl):
+    """
+    Run the listing stage in a background thread and feed each page's links straight into
+    the product stage. Unfinished URLs from earlier runs are queued first; links scraped
+    within the freshness TTL are skipped (frontier table).
+    """
+    stream = LinkStream()
+    seen = job_seen()
+
+    def enqueue(links, check_fresh=True):
+        # A product already queued by this job, from any category, is not fetched again
+        before = seen.duplicates
+        links = seen.claim(links)
+        if seen.duplicates > before:
+            record_duplicates_saved(seen.duplicates - before)
+        if check_fresh:
+            fresh = FRONTIER.not_due(links, freshness_ttl)
+            if fresh:
+                bump_status('products_skipped_fresh', len(fresh))
+                links = [link for link in links if link not in fresh]
+        stream.put_many(links)
+
+    leftovers = FRONTIER.leftovers(category_url, freshness_ttl)
+    recorded = set(leftovers)
+    canonical = PRODUCT_INDEX.canonicalize(leftovers)
+    enqueue([url for url in canonical if url in recorded], check_fresh=False)
+    # Rows saved under a non-canonical variant by older runs: due only if the canonical URL is
+    enqueue([url for url in canonical if url not in recorded])
+    listing_errors = []
+
+    def run_listing():
         try:
-            # Display decoded list for description
-            rec["description"] = json.loads(rec["description"])
-        except Exception:
-            pass
-        records.append(rec)
-    return jsonify(records)
+            scrape_category(category_url, workers=workers, proxies=proxies, on_links=enqueue)
+        except Exception as e:
+            listing_errors.append(e)
+        finally:
+            stream.close()
 
-@app.route('/export')
-def export_data():
-    conn = get_db_connection()
-    rows = conn.execute("SELECT * FROM products").fetchall()
-    conn.close()
-    fp = "shein_scraped_data.csv"
-    import json
-    with open(fp, "w", newline="", encoding="utf8") as f:
-        w = csv.writer(f)
-        w.writerow(['title', 'price', 'color', 'size', 'description', 'images', 'product_url'])
-        for row in rows:
-            # For description, flatten JSON into key:value; for color/size/images, use as string
-            try:
-                description = json.loads(row["description"])
-                description_str = "; ".join([f"{d['key']}: {d['value']}" for d in description])
-            except Exception:
-                description_str = row["description"]
-            w.writerow([
-                row["title"], row["price"], row["color"], row["size"],
-                description_str, row["images"], row["product_url"]
-            ])
-    return send_file(fp, as_attachment=True)
+    listing = threading.Thread(target=bound(run_listing), daemon=True)
+    listing.start()
+    try:
+        product_stage(stream, None, workers=workers, proxies=proxies)
+    finally:
+        listing.join()
+    if listing_errors:
+        raise listing_errors[0]
 
 if __name__ == "__main__":
+    # The dashboard lives in web.py; let its `import main` find this module rather than load a second copy
+    sys.modules["main"] = sys.modules[__name__]
+    from web import app
     app.run(port=8080, debug=True)
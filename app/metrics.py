@@ -0,0 +1,166 @@
+"""
+In-process scraper instrumentation.
+
+Stage timings go into fixed-bucket histograms and events into labelled counters;
+render() writes both in the Prometheus text format for the /metrics route. A Metrics
+built with `scope` also records every sample into the Metrics that scope() returns
+(the running job's own), so summary_since() over that one covers just its job while
+jobs run side by side. With `enabled` off, time()
+hands back one shared no-op context manager and inc() returns straight away, so
+the hooks can stay in the hot paths.
+"""
+import bisect
+import threading
+import time
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("histograms", "start")
+
+    def __init__(self, histograms):
+        self.histograms = histograms
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        for hist in self.histograms:
+            hist.observe(seconds)
+        return False
+
+
+class Histogram:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(BUCKETS, seconds)
+        with self.lock:
+            self.counts[index] += 1
+            self.total += seconds
+            self.count += 1
+
+
+def _labels(labels):
+    return ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                    for k, v in sorted(labels))
+
+
+class Metrics:
+    def __init__(self, enabled=True, prefix="scraper", scope=None):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.scope = scope
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    def _histogram(self, stage):
+        hist = self.histograms.get(stage)
+        if hist is None:
+            with self.lock:
+                hist = self.histograms.setdefault(stage, Histogram())
+        return hist
+
+    def time(self, stage):
+        """Context manager recording the block's wall time under `stage`"""
+        if not self.enabled:
+            return NULL_TIMER
+        scoped = self.scope() if self.scope is not None else None
+        if scoped is None:
+            return _Timer((self._histogram(stage),))
+        return _Timer((self._histogram(stage), scoped._histogram(stage)))
+
+    def observe(self, stage, seconds):
+        if not self.enabled:
+            return
+        self._histogram(stage).observe(seconds)
+        scoped = self.scope() if self.scope is not None else None
+        if scoped is not None:
+            scoped.observe(stage, seconds)
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+        scoped = self.scope() if self.scope is not None else None
+        if scoped is not None:
+            scoped.inc(name, amount, **labels)
+
+    def snapshot(self):
+        with self.lock:
+            stages = {s: (h.count, h.total) for s, h in self.histograms.items()}
+            counters = dict(self.counters)
+        return {"stages": stages, "counters": counters}
+
+    def summary_since(self, before=None):
+        """Per-stage count / total / mean seconds and counter deltas since an earlier snapshot() (or since the start)"""
+        before = before or {"stages": {}, "counters": {}}
+        now = self.snapshot()
+        stages = {}
+        for stage, (count, total) in now["stages"].items():
+            prev_count, prev_total = before["stages"].get(stage, (0, 0.0))
+            n = count - prev_count
+            if n:
+                spent = total - prev_total
+                stages[stage] = {"count": n, "seconds": round(spent, 3), "mean": round(spent / n, 4)}
+        counters = {}
+        for (name, labels), value in now["counters"].items():
+            delta = value - before["counters"].get((name, labels), 0)
+            if delta:
+                label = ",".join(f"{k}={v}" for k, v in labels)
+                counters[f"{name}{{{label}}}" if label else name] = delta
+        return {"stages": stages, "counters": counters}
+
+    def render(self, gauges=None):
+        """Prometheus text exposition of every histogram, counter and the given gauges"""
+        lines = []
+        name = f"{self.prefix}_stage_seconds"
+        lines.append(f"# HELP {name} Wall time spent per scraper stage")
+        lines.append(f"# TYPE {name} histogram")
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+        for stage, hist in histograms:
+            with hist.lock:
+                counts, total, count = list(hist.counts), hist.total, hist.count
+            running = 0
+            for bound, n in zip(BUCKETS + (float("inf"),), counts):
+                running += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {running}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+        declared = set()
+        for (counter, labels), value in counters:
+            full = f"{self.prefix}_{counter}"
+            if full not in declared:
+                declared.add(full)
+                lines.append(f"# TYPE {full} counter")
+            label = _labels(labels)
+            lines.append(f"{full}{{{label}}} {value}" if label else f"{full} {value}")
+        for gauge, value in sorted((gauges or {}).items()):
+            full = f"{self.prefix}_{gauge}"
+            lines.append(f"# TYPE {full} gauge")
+            lines.append(f"{full} {value}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,171 @@
+"""
+What a scraping browser is allowed to download.
+
+Pages are read for their markup only, and image URLs come from `src` attributes, so
+images, media, web fonts and third-party trackers are dead weight, especially over
+slow free proxies. A NetworkPolicy blocks them in two ways. At launch it sets Chrome's
+image content setting and the page-load strategy ("eager" returns from driver.get at
+DOMContentLoaded). Through CDP, Network.setBlockedURLs drops every request matching
+the policy's URL patterns.
+
+With `measure` on, the browser keeps a performance log. TrafficMeter reads it after
+each page to total the bytes received and the requests that were blocked, and
+estimates the bytes those requests would have cost. The estimate uses the average
+size seen for that resource type, or TYPICAL_BYTES before any has been seen. Images
+stopped by the content setting never reach the log, so the estimate is a lower bound.
+"""
+import json
+import threading
+
+IMAGE_PATTERNS = ("*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*")
+MEDIA_PATTERNS = ("*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*", "*.mov*")
+FONT_PATTERNS = ("*.woff*", "*.ttf*", "*.otf*", "*.eot*")
+TRACKER_PATTERNS = (
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googleadservices.com*",
+    "*facebook.net*", "*connect.facebook.com*", "*analytics.tiktok.com*", "*bat.bing.com*",
+    "*clarity.ms*", "*hotjar.com*", "*criteo.*", "*adnxs.com*", "*taboola.com*", "*sc-static.net*",
+    "*pinterest.com/ct*", "*ct.pinterest.com*", "*scorecardresearch.com*",
+)
+# Rough transfer size of a blocked request, used until real ones of that type have been seen
+TYPICAL_BYTES = {"Image": 40_000, "Media": 400_000, "Font": 30_000, "Script": 25_000, "Other": 10_000}
+
+
+class NetworkPolicy:
+    FIELDS = ("images", "media", "fonts", "trackers", "page_load", "measure")
+
+    def __init__(self, images=True, media=True, fonts=True, trackers=True, page_load="eager", measure=True,
+                 extra_patterns=()):
+        if page_load not in ("normal", "eager", "none"):
+            raise ValueError(f"Unknown page_load strategy: {page_load}")
+        self.images = bool(images)
+        self.media = bool(media)
+        self.fonts = bool(fonts)
+        self.trackers = bool(trackers)
+        self.page_load = page_load
+        self.measure = bool(measure)
+        self.extra_patterns = tuple(extra_patterns)
+
+    @property
+    def key(self):
+        return (self.images, self.media, self.fonts, self.trackers, self.page_load, self.measure,
+                self.extra_patterns)
+
+    def __eq__(self, other):
+        return isinstance(other, NetworkPolicy) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"NetworkPolicy({', '.join(f'{f}={getattr(self, f)!r}' for f in self.FIELDS)})"
+
+    def describe(self):
+        return {f: getattr(self, f) for f in self.FIELDS}
+
+    def blocked_patterns(self):
+        patterns = list(self.extra_patterns)
+        for enabled, group in ((self.images, IMAGE_PATTERNS), (self.media, MEDIA_PATTERNS),
+                               (self.fonts, FONT_PATTERNS), (self.trackers, TRACKER_PATTERNS)):
+            if enabled:
+                patterns.extend(group)
+        return patterns
+
+    def configure(self, options):
+        """Launch-time part: page-load strategy, image content setting, performance log"""
+        options.page_load_strategy = self.page_load
+        if self.images:
+            options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        if self.measure:
+            options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+    def apply(self, driver):
+        """Per-session part: install the CDP URL block list"""
+        patterns = self.blocked_patterns()
+        if patterns:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+
+
+POLICIES = {
+    "off": NetworkPolicy(images=False, media=False, fonts=False, trackers=False, page_load="normal", measure=False),
+    "measure": NetworkPolicy(images=False, media=False, fonts=False, trackers=False, page_load="normal"),
+    "default": NetworkPolicy(),
+    # Keep product images loading (e.g. when screenshots are wanted) but drop everything else
+    "images": NetworkPolicy(images=False),
+}
+
+
+def resolve_policy(spec=None, default="default"):
+    """A NetworkPolicy from a preset name, a dict of overrides (optionally with "base"), or a policy"""
+    if isinstance(spec, NetworkPolicy):
+        return spec
+    if spec is None or isinstance(spec, str):
+        name = spec or default
+        if name not in POLICIES:
+            raise ValueError(f"Unknown network policy: {name}")
+        return POLICIES[name]
+    if not isinstance(spec, dict):
+        raise ValueError("network must be a preset name or an object")
+    overrides = dict(spec)
+    base = resolve_policy(overrides.pop("base", None), default)
+    unknown = set(overrides) - set(NetworkPolicy.FIELDS) - {"extra_patterns"}
+    if unknown:
+        raise ValueError(f"Unknown network option(s): {', '.join(sorted(unknown))}")
+    fields = dict(base.describe(), extra_patterns=base.extra_patterns)
+    fields.update(overrides)
+    return NetworkPolicy(**fields)
+
+
+class PageTraffic:
+    def __init__(self):
+        self.bytes = 0
+        self.requests = 0
+        self.blocked = {}
+        self.saved_estimate = 0
+
+
+class TrafficMeter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # resource type -> (bytes, responses) over every page measured, for the saved-bytes estimate
+        self.seen = {}
+
+    def average_bytes(self, resource_type):
+        with self.lock:
+            total, count = self.seen.get(resource_type, (0, 0))
+        if count:
+            return total // count
+        return TYPICAL_BYTES.get(resource_type, TYPICAL_BYTES["Other"])
+
+    def collect(self, driver):
+        """Drain the driver's performance log; None if it wasn't launched with one"""
+        try:
+            entries = driver.get_log("performance")
+        except Exception:
+            return None
+        traffic = PageTraffic()
+        types = {}
+        finished = []
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, TypeError, ValueError):
+                continue
+            method, params = message.get("method"), message.get("params", {})
+            if method == "Network.requestWillBeSent":
+                types[params.get("requestId")] = params.get("type", "Other")
+            elif method == "Network.loadingFinished":
+                size = int(params.get("encodedDataLength", 0))
+                traffic.bytes += size
+                traffic.requests += 1
+                finished.append((types.get(params.get("requestId"), "Other"), size))
+            elif method == "Network.loadingFailed" and (
+                    params.get("blockedReason") or "BLOCKED" in params.get("errorText", "")):
+                kind = params.get("type") or types.get(params.get("requestId"), "Other")
+                traffic.blocked[kind] = traffic.blocked.get(kind, 0) + 1
+        with self.lock:
+            for kind, size in finished:
+                total, count = self.seen.get(kind, (0, 0))
+                self.seen[kind] = (total + size, count + 1)
+        traffic.saved_estimate = sum(n * self.average_bytes(kind) for kind, n in traffic.blocked.items())
+        return traffic
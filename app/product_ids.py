@@ -0,0 +1,190 @@
+"""
+Canonical product identity.
+
+Shein links one product under many URLs. Listings add tracking parameters
+(src_module, src_identifier, scici, utm_*, ...), and overlapping categories use
+different slugs. Every variant carries the same goods id (...-p-<goods id>.html).
+Hosts are kept apart, because each regional site has its own prices.
+
+product_key() reduces a URL to "goods:<host>:<id>", or to canonical_url() when there
+is no goods id. ProductIndex persists (host, goods id) -> the first canonical URL seen
+for it, so later variants map onto the same frontier and products row across
+categories and runs. SeenSet is one job's record of the keys it has already queued. It is an exact
+set, or a Bloom filter for crawls too large to hold every key. A Bloom false positive
+only skips a product for that job, and its frontier row stays pending for the next
+run.
+"""
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from db_writer import configure_connection
+
+GOODS_ID_RE = re.compile(r"-p-(\d+)(?:-cat-\d+)?\.html$", re.I)
+TRACKING_PARAMS = {
+    "scici", "main_attr", "mallcode", "imgratio", "pageid", "share_from", "url_from", "onelink",
+    "ici", "srctype", "userpath", "fbclid", "gclid", "skucode",
+}
+TRACKING_PREFIXES = ("utm_", "src_", "_")
+
+PRODUCT_IDS_SCHEMA = '''CREATE TABLE IF NOT EXISTS product_ids (
+    host TEXT NOT NULL,
+    goods_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    first_seen REAL,
+    PRIMARY KEY (host, goods_id)
+)'''
+
+_CHUNK = 900
+
+
+def goods_id(url):
+    """Shein goods id of a product URL, or None"""
+    parts = urlsplit(url or '')
+    match = GOODS_ID_RE.search(parts.path)
+    if match:
+        return match.group(1)
+    for key, value in parse_qsl(parts.query):
+        if key.lower() == "goods_id" and value.isdigit():
+            return value
+    return None
+
+
+def canonical_url(url):
+    """`url` without fragment or tracking parameters; product pages lose their whole query"""
+    parts = urlsplit(url.strip())
+    if GOODS_ID_RE.search(parts.path):
+        query = ''
+    else:
+        query = urlencode(sorted(
+            (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+            if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+        ))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ''))
+
+
+def product_id(url):
+    """(host[:port], goods id) of a product URL, or None"""
+    gid = goods_id(url)
+    return (urlsplit(url).netloc.lower(), gid) if gid else None
+
+
+def product_key(url):
+    pid = product_id(url)
+    return f"goods:{pid[0]}:{pid[1]}" if pid else canonical_url(url)
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=1e-4):
+        self.bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.array = bytearray((self.bits + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf8"), digest_size=16).digest()
+        a, b = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(a + i * b) % self.bits for i in range(self.hashes)]
+
+    def add(self, key):
+        """Add `key`; returns True if it was (probably) present already"""
+        present = True
+        for pos in self._positions(key):
+            byte, bit = divmod(pos, 8)
+            if not self.array[byte] & (1 << bit):
+                present = False
+                self.array[byte] |= 1 << bit
+        return present
+
+
+class SeenSet:
+    """Product keys a job has queued; claim() lets each product through once"""
+
+    def __init__(self, bloom_capacity=None, error_rate=1e-4):
+        self.lock = threading.Lock()
+        self.bloom = BloomFilter(bloom_capacity, error_rate) if bloom_capacity else None
+        self.keys = set()
+        self.duplicates = 0
+
+    def _add(self, key):
+        if self.bloom is not None:
+            return self.bloom.add(key)
+        if key in self.keys:
+            return True
+        self.keys.add(key)
+        return False
+
+    def claim(self, urls):
+        """The URLs whose product hasn't been claimed before, in order"""
+        fresh = []
+        with self.lock:
+            for url in urls:
+                if self._add(product_key(url)):
+                    self.duplicates += 1
+                else:
+                    fresh.append(url)
+        return fresh
+
+
+class ProductIndex:
+    """Persisted (host, goods id) -> canonical URL, so every variant of a product resolves to one URL"""
+
+    def __init__(self, db_path, max_cache=200_000):
+        self.db_path = db_path
+        self.max_cache = max_cache
+        self.lock = threading.Lock()
+        self.cache = {}
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(PRODUCT_IDS_SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return configure_connection(sqlite3.connect(self.db_path, timeout=30))
+
+    def canonicalize(self, urls):
+        """Canonical URLs for `urls`, one per product, in first-seen order"""
+        canonical = [canonical_url(u) for u in urls if u]
+        ids = {url: product_id(url) for url in canonical}
+        with self.lock:
+            if len(self.cache) > self.max_cache:
+                self.cache.clear()
+            missing = list(dict.fromkeys(g for g in ids.values() if g and g not in self.cache))
+            if missing:
+                self._resolve(missing, {g: u for u, g in reversed(list(ids.items())) if g})
+            resolved = [self.cache.get(ids[url], url) if ids[url] else url for url in canonical]
+        return list(dict.fromkeys(resolved))
+
+    def _resolve(self, missing, first_url):
+        """Load known ids from the table and record the rest under the URL they were first seen with"""
+        conn = self._connect()
+        try:
+            self._load(conn, missing)
+            new = [pid for pid in missing if pid not in self.cache]
+            if new:
+                now = time.time()
+                with conn:
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO product_ids (host, goods_id, url, first_seen) VALUES (?, ?, ?, ?)",
+                        [(host, gid, first_url[(host, gid)], now) for host, gid in new],
+                    )
+                # Another process may have recorded some of them first; its URL wins
+                self._load(conn, new)
+        finally:
+            conn.close()
+
+    def _load(self, conn, ids):
+        for host in {h for h, _ in ids}:
+            gids = [g for h, g in ids if h == host]
+            for i in range(0, len(gids), _CHUNK):
+                chunk = gids[i:i + _CHUNK]
+                marks = ",".join("?" * len(chunk))
+                for gid, url in conn.execute(
+                        f"SELECT goods_id, url FROM product_ids WHERE host = ? AND goods_id IN ({marks})",
+                        (host, *chunk)):
+                    self.cache[(host, gid)] = url
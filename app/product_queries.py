@@ -0,0 +1,149 @@
+"""
+Query building for the /data API: keyset pagination, filtering, sorting and field
+projection over the products table. Every filter maps onto an indexed column, a
+child table or the products_fts index (see schema.py). Kept free of Flask so it
+can be reused by the export and CLI paths.
+"""
+import base64
+import json
+
+# Columns a client may ask for with ?fields=
+PRODUCT_FIELDS = (
+    "product_url", "title", "price", "color", "size", "description", "images",
+    "price_current", "price_original", "currency", "category_url", "scraped_at",
+)
+# ?sort= key -> SQL expression
+SORT_EXPRESSIONS = {
+    "title": "p.title",
+    "price": "p.price_current",
+    "category": "p.category_url",
+    "scraped_at": "p.scraped_at",
+    "product_url": "p.product_url",
+}
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def fts_query(text):
+    """Free text -> FTS5 query matching every word as a prefix, with FTS syntax neutralised"""
+    terms = [t.replace('"', '""') for t in text.split()]
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def encode_cursor(sort_value, product_url):
+    raw = json.dumps([sort_value, product_url], separators=(",", ":")).encode("utf8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        value, url = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    return value, url
+
+
+class ProductQuery:
+    """Parsed /data parameters; raises ValueError on anything it can't honour"""
+
+    def __init__(self, args):
+        self.sort = args.get("sort", "product_url")
+        if self.sort not in SORT_EXPRESSIONS:
+            raise ValueError(f"Unknown sort field: {self.sort}")
+        self.descending = args.get("order", "asc").lower() == "desc"
+        self.limit = min(max(int(args.get("limit", DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        self.cursor = decode_cursor(args["cursor"]) if args.get("cursor") else None
+        fields = args.get("fields")
+        if fields:
+            self.fields = [f.strip() for f in fields.split(",") if f.strip()]
+            unknown = [f for f in self.fields if f not in PRODUCT_FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+        else:
+            self.fields = list(PRODUCT_FIELDS)
+        self.q = args.get("q", "").strip()
+        self.category = args.get("category", "").strip()
+        self.color = args.get("color", "").strip()
+        self.size = args.get("size", "").strip()
+        self.min_price = float(args["min_price"]) if args.get("min_price") else None
+        self.max_price = float(args["max_price"]) if args.get("max_price") else None
+
+    def where(self):
+        clauses, params = [], []
+        if self.q:
+            # Full-text search over title and description attributes
+            clauses.append("p.rowid IN (SELECT rowid FROM products_fts WHERE products_fts MATCH ?)")
+            params.append(fts_query(self.q))
+        if self.category:
+            clauses.append("p.category_url = ?")
+            params.append(self.category)
+        if self.color:
+            clauses.append("EXISTS (SELECT 1 FROM product_colors c WHERE c.product_url = p.product_url AND c.color = ?)")
+            params.append(self.color)
+        if self.size:
+            clauses.append("EXISTS (SELECT 1 FROM product_sizes z WHERE z.product_url = p.product_url AND z.size = ?)")
+            params.append(self.size)
+        if self.min_price is not None:
+            clauses.append("p.price_current >= ?")
+            params.append(self.min_price)
+        if self.max_price is not None:
+            clauses.append("p.price_current <= ?")
+            params.append(self.max_price)
+        return clauses, params
+
+    def sql(self, paged=True):
+        """SELECT for this query; the cursor columns are always returned as _cursor_url and _sort_key"""
+        sort_expr = SORT_EXPRESSIONS[self.sort]
+        clauses, params = self.where()
+        if self.cursor is not None:
+            clause, cursor_params = self.after_cursor(sort_expr)
+            clauses.append(clause)
+            params += cursor_params
+        direction = "DESC" if self.descending else "ASC"
+        columns = ", ".join(f"p.{f}" for f in self.fields)
+        sql = f"SELECT {columns}, p.product_url AS _cursor_url, {sort_expr} AS _sort_key FROM products p"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        # Raw columns so the (sort column, product_url) index supplies the order
+        if self.sort == "product_url":
+            sql += f" ORDER BY p.product_url {direction}"
+        else:
+            sql += f" ORDER BY {sort_expr} {direction}, p.product_url {direction}"
+        if paged:
+            # One extra row tells us whether there is a next page
+            sql += " LIMIT ?"
+            params.append(self.limit + 1)
+        return sql, params
+
+    def after_cursor(self, sort_expr):
+        """
+        Rows past the cursor in ORDER BY order. SQLite sorts NULL before every value, so
+        NULL sort values come first ascending and last descending; the row-value comparison
+        keeps pagination stable when sort values repeat.
+        """
+        value, url = self.cursor
+        if self.sort == "product_url":
+            return f"p.product_url {'<' if self.descending else '>'} ?", [url]
+        if value is None:
+            if self.descending:
+                return f"({sort_expr} IS NULL AND p.product_url < ?)", [url]
+            return f"(({sort_expr} IS NULL AND p.product_url > ?) OR {sort_expr} IS NOT NULL)", [url]
+        if self.descending:
+            return f"(({sort_expr}, p.product_url) < (?, ?) OR {sort_expr} IS NULL)", [value, url]
+        return f"({sort_expr}, p.product_url) > (?, ?)", [value, url]
+
+
+def next_cursor(row):
+    return encode_cursor(row["_sort_key"], row["_cursor_url"])
+
+
+def row_to_record(row, fields):
+    rec = {f: row[f] for f in fields}
+    if "description" in rec:
+        try:
+            # Display decoded list for description
+            rec["description"] = json.loads(rec["description"])
+        except Exception:
+            pass
+    return rec
@@ -0,0 +1,179 @@
+"""
+Latency-scored proxy pool.
+
+Candidates are checked concurrently with asyncio (bounded by a semaphore) by
+opening an HTTP CONNECT tunnel to the target host through each proxy. Proxies
+that answer are scored by success rate and latency, cached in SQLite with a TTL
+so the next run starts from known-good proxies, and evicted after repeated
+failures reported by the scraper.
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+
+
+def split_proxy(proxy):
+    address = proxy.split("://", 1)[-1].rstrip("/")
+    host, _, port = address.rpartition(":")
+    return host, int(port)
+
+
+async def check_proxy(proxy, target=("za.shein.com", 443), timeout=6.0):
+    """Return the seconds taken to open a CONNECT tunnel through `proxy`, or None if it failed"""
+    start = time.perf_counter()
+    writer = None
+    try:
+        host, port = split_proxy(proxy)
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        target_host, target_port = target
+        writer.write(
+            f"CONNECT {target_host}:{target_port} HTTP/1.1\r\n"
+            f"Host: {target_host}:{target_port}\r\n\r\n".encode()
+        )
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout - (time.perf_counter() - start))
+        parts = status_line.decode("latin1").split()
+        if len(parts) >= 2 and parts[1] == "200":
+            return time.perf_counter() - start
+        return None
+    except (OSError, ValueError, asyncio.TimeoutError):
+        return None
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+class ProxyStats:
+    def __init__(self, proxy, latency=None, successes=0, failures=0, checked_at=0.0):
+        self.proxy = proxy
+        self.latency = latency
+        self.successes = successes
+        self.failures = failures
+        self.consecutive_failures = 0
+        self.checked_at = checked_at
+
+    @property
+    def score(self):
+        # Laplace-smoothed success rate per second of latency
+        rate = (self.successes + 1) / (self.successes + self.failures + 2)
+        return rate / max(self.latency or 10.0, 0.05)
+
+
+class ProxyPool:
+    def __init__(self, db_path, target=("za.shein.com", 443), ttl=1800, concurrency=64,
+                 timeout=6.0, max_failures=2):
+        self.db_path = db_path
+        self.target = target
+        self.ttl = ttl
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_failures = max_failures
+        self.lock = threading.Lock()
+        self.proxies = {}
+        self._init_table()
+        self.load()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def _init_table(self):
+        conn = self._connect()
+        with conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS proxies (
+                proxy TEXT PRIMARY KEY,
+                latency REAL,
+                successes INTEGER DEFAULT 0,
+                failures INTEGER DEFAULT 0,
+                checked_at REAL
+            )''')
+        conn.close()
+
+    def load(self):
+        """Pull proxies checked within the TTL from the cache table"""
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT proxy, latency, successes, failures, checked_at FROM proxies WHERE checked_at >= ?",
+            (time.time() - self.ttl,),
+        ).fetchall()
+        conn.close()
+        with self.lock:
+            for row in rows:
+                self.proxies[row[0]] = ProxyStats(*row)
+        return len(rows)
+
+    def save(self):
+        with self.lock:
+            rows = [(s.proxy, s.latency, s.successes, s.failures, s.checked_at) for s in self.proxies.values()]
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM proxies WHERE checked_at < ?", (time.time() - self.ttl,))
+            conn.executemany("INSERT OR REPLACE INTO proxies VALUES (?, ?, ?, ?, ?)", rows)
+        conn.close()
+
+    def healthy(self):
+        with self.lock:
+            return len(self.proxies)
+
+    def refresh(self, candidates):
+        """Check every unseen candidate concurrently, keep the ones that answered, return how many"""
+        with self.lock:
+            fresh = [p for p in dict.fromkeys(candidates) if p not in self.proxies]
+        if not fresh:
+            return 0
+        results = asyncio.run(self._check_all(fresh))
+        now = time.time()
+        alive = 0
+        with self.lock:
+            for proxy, latency in results:
+                if latency is None:
+                    continue
+                alive += 1
+                self.proxies[proxy] = ProxyStats(proxy, latency, successes=1, checked_at=now)
+        self.save()
+        return alive
+
+    async def _check_all(self, candidates):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(proxy):
+            async with semaphore:
+                return proxy, await check_proxy(proxy, self.target, self.timeout)
+
+        return await asyncio.gather(*(run(p) for p in candidates))
+
+    def ranked(self, exclude=()):
+        with self.lock:
+            stats = [s for s in self.proxies.values() if s.proxy not in exclude]
+        return [s.proxy for s in sorted(stats, key=lambda s: s.score, reverse=True)]
+
+    def best(self, exclude=()):
+        ranked = self.ranked(exclude)
+        return ranked[0] if ranked else None
+
+    def report_success(self, proxy, latency=None):
+        with self.lock:
+            stats = self.proxies.get(proxy)
+            if stats is None:
+                return
+            stats.successes += 1
+            stats.consecutive_failures = 0
+            stats.checked_at = time.time()
+            if latency is not None:
+                # Exponential moving average keeps the score tracking recent behaviour
+                stats.latency = latency if stats.latency is None else 0.7 * stats.latency + 0.3 * latency
+
+    def report_failure(self, proxy):
+        with self.lock:
+            stats = self.proxies.get(proxy)
+            if stats is None:
+                return
+            stats.failures += 1
+            stats.consecutive_failures += 1
+            if stats.consecutive_failures < self.max_failures:
+                return
+            del self.proxies[proxy]
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM proxies WHERE proxy = ?", (proxy,))
+        conn.close()
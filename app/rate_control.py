@@ -0,0 +1,149 @@
+"""
+Adaptive request pacing per (proxy, host).
+
+Every page request first reserves a token from the bucket of the proxy it goes
+through and the host it targets. The reservation returns how long to wait before
+sending. Buckets refill at their current rate, and a bucket in debt makes the next
+caller wait, so the one controller can be shared by every worker thread and by the
+async HTTP path (which awaits the wait instead of sleeping).
+
+Rates adapt AIMD-style. Each success adds `increase` requests/s, up to `max_rate`.
+Each failure multiplies the rate by the factor in DECREASE, down to `min_rate`. A
+block page also empties the bucket for `block_cooldown` seconds and records the rate
+it came at. Near that ceiling the increase slows to a tenth, so a pair settles just
+under the target's limit instead of probing into it again and again. On top of the
+adaptive per-proxy buckets, each host has a fixed bucket at `host_rate` that caps
+the combined pace over all proxies. That host limit is what the configuration
+promises the target, and adaptation never exceeds it.
+"""
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Multiplicative decrease per kind of failure
+DECREASE = {"timeout": 0.8, "error": 0.7, "blocked": 0.5}
+
+
+class Bucket:
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+        self.requests = 0
+        self.successes = 0
+        self.failures = {}
+        self.waited = 0.0
+        # Rate at which the last block page came back
+        self.ceiling = None
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now):
+        """Take one token (possibly going into debt); returns the seconds until it is covered"""
+        self.refill(now)
+        self.tokens -= 1
+        self.requests += 1
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def describe(self):
+        return {
+            "rate": round(self.rate, 3),
+            "tokens": round(self.tokens, 2),
+            "requests": self.requests,
+            "successes": self.successes,
+            "failures": dict(self.failures),
+            "waited_seconds": round(self.waited, 1),
+            "ceiling": round(self.ceiling, 3) if self.ceiling else None,
+        }
+
+
+def host_of(url):
+    return (urlsplit(url).hostname or "") if url else ""
+
+
+class RateController:
+    def __init__(self, rate=0.5, min_rate=0.05, max_rate=2.0, burst=1.0, increase=0.05, host_rate=4.0,
+                 host_burst=4.0, block_cooldown=10.0, jitter=0.25, clock=time.monotonic, sleep=time.sleep):
+        if not 0 < min_rate <= rate <= max_rate:
+            raise ValueError("Rates must satisfy 0 < min_rate <= rate <= max_rate")
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        # None disables the per-host cap
+        self.host_rate = host_rate
+        self.host_burst = host_burst
+        self.block_cooldown = block_cooldown
+        # Waits are stretched by up to this fraction so workers sharing a bucket don't fire in lockstep
+        self.jitter = jitter
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.hosts = {}
+
+    def _bucket(self, proxy, host, now):
+        key = (proxy or "direct", host)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = Bucket(self.rate, self.burst, now)
+        return bucket
+
+    def reserve(self, proxy, url):
+        """Reserve a request slot; returns the seconds to wait before sending it"""
+        host = host_of(url)
+        with self.lock:
+            now = self.clock()
+            bucket = self._bucket(proxy, host, now)
+            wait = bucket.take(now)
+            if self.host_rate:
+                limit = self.hosts.get(host)
+                if limit is None:
+                    limit = self.hosts[host] = Bucket(self.host_rate, self.host_burst, now)
+                wait = max(wait, limit.take(now))
+            if wait and self.jitter:
+                wait *= 1 + random.uniform(0, self.jitter)
+            bucket.waited += wait
+        return wait
+
+    def acquire(self, proxy, url):
+        """Block until a request to `url` through `proxy` may be sent; returns the seconds waited"""
+        wait = self.reserve(proxy, url)
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+    def success(self, proxy, url):
+        with self.lock:
+            bucket = self._bucket(proxy, host_of(url), self.clock())
+            bucket.successes += 1
+            step = self.increase
+            if bucket.ceiling and bucket.rate >= 0.9 * bucket.ceiling:
+                step /= 10
+            bucket.rate = min(self.max_rate, bucket.rate + step)
+
+    def failure(self, proxy, url, kind="error"):
+        """Slow down after a timeout, an error or a block page (`kind` is a DECREASE key)"""
+        with self.lock:
+            now = self.clock()
+            bucket = self._bucket(proxy, host_of(url), now)
+            bucket.failures[kind] = bucket.failures.get(kind, 0) + 1
+            if kind == "blocked":
+                bucket.ceiling = bucket.rate
+            bucket.rate = max(self.min_rate, bucket.rate * DECREASE.get(kind, DECREASE["error"]))
+            if kind == "blocked" and self.block_cooldown:
+                bucket.refill(now)
+                bucket.tokens = min(bucket.tokens, -self.block_cooldown * bucket.rate)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "buckets": [dict(proxy=proxy, host=host, **bucket.describe())
+                            for (proxy, host), bucket in sorted(self.buckets.items())],
+                "hosts": {host: bucket.describe() for host, bucket in sorted(self.hosts.items())},
+            }
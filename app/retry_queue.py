@@ -0,0 +1,119 @@
+"""
+Retryable units of work.
+
+A RetryQueue hands units (listing page numbers, product URLs) to worker threads. A
+unit that fails goes back through retry(). It becomes available again after a capped
+exponential backoff, and in the meantime the workers carry on with other units. After
+`max_attempts` failures it goes to the dead-letter list instead. Only failed units are
+fetched again, so the cost of a failure is one unit, not a whole category.
+
+Workers call done() once for every unit they get(). get() keeps waiting while a unit is
+still in flight, since it may yet come back for a retry. It returns None only once the
+queue is closed, nothing is waiting out a backoff and nothing is in flight.
+"""
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import deque
+
+
+class Backoff:
+    """Delay before attempt n+1 of a unit: base * 2**(n-1), capped at `cap`, stretched by up to `jitter`"""
+
+    def __init__(self, base=2.0, cap=60.0, max_attempts=4, jitter=0.25):
+        self.base = base
+        self.cap = cap
+        self.max_attempts = max_attempts
+        self.jitter = jitter
+
+    def delay(self, attempt):
+        delay = min(self.cap, self.base * 2 ** (attempt - 1))
+        return delay * (1 + random.uniform(0, self.jitter)) if self.jitter else delay
+
+
+class RetryQueue:
+    def __init__(self, units=None, backoff=None, on_dead=None, clock=time.monotonic):
+        """`on_dead(unit, attempts, error)` is called for each unit that runs out of attempts"""
+        self.backoff = backoff or Backoff()
+        self.on_dead = on_dead
+        self.clock = clock
+        self.cond = threading.Condition()
+        self.ready = deque()
+        # (due, seq, unit) of units waiting out a backoff
+        self.delayed = []
+        self.attempts = {}
+        self.dead = []
+        self.in_flight = 0
+        self.closed = threading.Event()
+        self._seq = itertools.count()
+        if units is not None:
+            self.put_many(units)
+            self.close()
+
+    def __len__(self):
+        """Units not yet finished: ready, backing off or in flight"""
+        with self.cond:
+            return len(self.ready) + len(self.delayed) + self.in_flight
+
+    def put_many(self, units):
+        with self.cond:
+            self.ready.extend(units)
+            self.cond.notify_all()
+
+    def close(self):
+        """No more units will be put (retries of units in flight still may be)"""
+        with self.cond:
+            self.closed.set()
+            self.cond.notify_all()
+
+    def _promote(self, now):
+        while self.delayed and self.delayed[0][0] <= now:
+            self.ready.append(heapq.heappop(self.delayed)[2])
+
+    def _finished(self):
+        return self.closed.is_set() and not self.ready and not self.delayed and not self.in_flight
+
+    def get(self, stop=None, poll=0.2):
+        """Next unit (call done() for it afterwards), or None once finished or `stop()` is true"""
+        with self.cond:
+            while True:
+                self._promote(self.clock())
+                if self.ready:
+                    self.in_flight += 1
+                    return self.ready.popleft()
+                if self._finished() or (stop is not None and stop()):
+                    return None
+                wait = poll
+                if self.delayed:
+                    wait = min(wait, max(0.0, self.delayed[0][0] - self.clock()))
+                self.cond.wait(wait)
+
+    def done(self, count=1):
+        with self.cond:
+            self.in_flight -= count
+            self.cond.notify_all()
+
+    def retry(self, unit, error=None):
+        """
+        Put a failed unit back after its backoff; returns the delay in seconds, or None
+        if the unit has used up its attempts and went to the dead-letter list.
+        Call it before done() for the same unit.
+        """
+        with self.cond:
+            attempts = self.attempts.get(unit, 0) + 1
+            self.attempts[unit] = attempts
+            if attempts >= self.backoff.max_attempts:
+                self.dead.append((unit, attempts, error))
+                dead = True
+            else:
+                delay = self.backoff.delay(attempts)
+                heapq.heappush(self.delayed, (self.clock() + delay, next(self._seq), unit))
+                self.cond.notify_all()
+                dead = False
+        if dead:
+            if self.on_dead is not None:
+                self.on_dead(unit, attempts, error)
+            return None
+        return delay
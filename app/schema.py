@@ -0,0 +1,349 @@
+"""
+Product schema and migrations.
+
+`products` keeps the original display columns (price text, comma-joined colors,
+sizes and images, description JSON) so existing exports keep their shape, and adds
+numeric current/original price, currency, category and scrape time. Colors,
+sizes, images and description attributes are also stored one row each in child
+tables, and title + description text are indexed in the products_fts FTS5 table,
+so filtering and search run in SQL. An FTS row shares its rowid with the product row,
+so it is replaced through a rowid lookup rather than a scan of the index.
+
+Every product row carries a content hash. A re-scrape that produces the same hash
+writes nothing. One that changes appends a compact delta to product_history: only the
+price and available sizes (the stock signal) when those changed, plus the names of
+the other fields that did.
+
+migrate() upgrades any older shein_scraper.db in place; PRAGMA user_version
+records the schema version.
+"""
+import ast
+import hashlib
+import json
+import re
+import time
+
+from frontier import FRONTIER_SCHEMA, FRONTIER_INDEX
+
+SCHEMA_VERSION = 5
+
+PRODUCTS_TABLE = '''CREATE TABLE IF NOT EXISTS products (
+    product_url TEXT PRIMARY KEY,
+    title TEXT,
+    price TEXT,
+    color TEXT,
+    size TEXT,
+    description TEXT,
+    images TEXT
+)'''
+# Columns added in version 2, in ALTER TABLE form
+PRODUCT_COLUMNS_V2 = [
+    ("price_current", "REAL"),
+    ("price_original", "REAL"),
+    ("currency", "TEXT"),
+    ("category_url", "TEXT"),
+    ("scraped_at", "REAL"),
+]
+# Columns added in version 3
+PRODUCT_COLUMNS_V3 = [
+    ("content_hash", "TEXT"),
+]
+CHILD_TABLES = [
+    '''CREATE TABLE IF NOT EXISTS product_colors (
+        product_url TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        color TEXT NOT NULL,
+        PRIMARY KEY (product_url, position)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS product_sizes (
+        product_url TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        size TEXT NOT NULL,
+        PRIMARY KEY (product_url, position)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS product_images (
+        product_url TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        url TEXT NOT NULL,
+        PRIMARY KEY (product_url, position)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS product_attributes (
+        product_url TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        key TEXT,
+        value TEXT,
+        PRIMARY KEY (product_url, position)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS product_history (
+        id INTEGER PRIMARY KEY,
+        product_url TEXT NOT NULL,
+        category_url TEXT,
+        changed_at REAL NOT NULL,
+        kind TEXT NOT NULL,      -- new / price / stock / content
+        changed TEXT,            -- comma-joined names of the fields that changed
+        price_current REAL,      -- price columns only when the price changed
+        price_original REAL,
+        currency TEXT,
+        sizes TEXT               -- only when the available sizes changed
+    )''',
+    # rowid = products.rowid
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5 (
+        title,
+        description
+    )''',
+]
+# Every /data sort key ends in product_url, the keyset tie-breaker, so a sorted page is read
+# straight off an index instead of being sorted in a temp B-tree
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_products_price_url ON products (price_current, product_url)",
+    "CREATE INDEX IF NOT EXISTS idx_products_category_price ON products (category_url, price_current, product_url)",
+    "CREATE INDEX IF NOT EXISTS idx_products_category_url ON products (category_url, product_url)",
+    "CREATE INDEX IF NOT EXISTS idx_products_title_url ON products (title, product_url)",
+    "CREATE INDEX IF NOT EXISTS idx_products_scraped_at_url ON products (scraped_at, product_url)",
+    "CREATE INDEX IF NOT EXISTS idx_product_colors_color ON product_colors (color)",
+    "CREATE INDEX IF NOT EXISTS idx_product_sizes_size ON product_sizes (size)",
+    "CREATE INDEX IF NOT EXISTS idx_product_attributes_key ON product_attributes (key, value)",
+    "CREATE INDEX IF NOT EXISTS idx_product_history_category ON product_history (category_url, changed_at)",
+    "CREATE INDEX IF NOT EXISTS idx_product_history_product ON product_history (product_url, changed_at)",
+]
+# Sort indexes from before version 5, superseded by the ones above
+OLD_INDEXES = ("idx_products_price", "idx_products_category", "idx_products_title", "idx_products_scraped_at")
+
+CURRENCY_SYMBOLS = {"R": "ZAR", "$": "USD", "US$": "USD", "€": "EUR", "£": "GBP", "A$": "AUD", "C$": "CAD"}
+_AMOUNT = re.compile(r"(?P<symbol>[^\d\s;,.]*)\s*(?P<amount>\d[\d\s,]*(?:\.\d+)?)")
+
+
+def parse_price(price):
+    """
+    "R199.00; R249.00" -> (199.0, 249.0, "ZAR"). The first amount is the current price, the
+    highest one the original; either is None when the text has no number.
+    """
+    amounts, currency = [], None
+    for match in _AMOUNT.finditer(str(price or "")):
+        try:
+            amounts.append(float(re.sub(r"[\s,]", "", match.group("amount"))))
+        except ValueError:
+            continue
+        symbol = match.group("symbol").strip()
+        if symbol and currency is None:
+            currency = CURRENCY_SYMBOLS.get(symbol, symbol.upper())
+    if not amounts:
+        return None, None, currency
+    return amounts[0], max(amounts), currency
+
+
+def as_list(value):
+    if isinstance(value, list):
+        return [v for v in value if v]
+    return [v for v in str(value or "").split(",") if v]
+
+
+def as_descriptions(value):
+    """Description as a list of {"key", "value"} dicts, whether given as a list, JSON or repr text"""
+    if isinstance(value, list):
+        return value
+    for parse in (json.loads, ast.literal_eval):
+        try:
+            parsed = parse(value)
+        except Exception:
+            continue
+        if isinstance(parsed, list):
+            return [d for d in parsed if isinstance(d, dict)]
+    return []
+
+
+def description_text(descriptions):
+    return "; ".join(f"{d.get('key', '')} {d.get('value', '')}".strip() for d in descriptions)
+
+
+def product_fields(data):
+    """The comparable content of a scraped product, normalised the way it is stored"""
+    return {
+        "title": data.get('title') or '',
+        "price": str(data.get('price') or '').strip(),
+        "colors": as_list(data.get('color')),
+        "sizes": as_list(data.get('size')),
+        "description": as_descriptions(data.get('description')),
+        "images": as_list(data.get('images')),
+    }
+
+
+def content_hash(fields):
+    return hashlib.sha1(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode("utf8")).hexdigest()
+
+
+# Child table and value column of each list field, read back one value per row
+STORED_LISTS = {"colors": ("product_colors", "color"), "sizes": ("product_sizes", "size"),
+                "images": ("product_images", "url")}
+
+
+def stored_fields(conn, product_url):
+    """
+    product_fields() of the stored row plus its content_hash, or None for an unseen
+    product. Lists come from the child tables, since a value may itself contain a comma.
+    """
+    row = conn.execute(
+        "SELECT title, price, description, content_hash FROM products WHERE product_url = ?",
+        (product_url,),
+    ).fetchone()
+    if row is None:
+        return None
+    title, price, description, digest = row
+    lists = {
+        field: [value for (value,) in conn.execute(
+            f"SELECT {column} FROM {table} WHERE product_url = ? ORDER BY position", (product_url,))]
+        for field, (table, column) in STORED_LISTS.items()
+    }
+    fields = product_fields({"title": title, "price": price, "color": lists["colors"], "size": lists["sizes"],
+                             "description": description, "images": lists["images"]})
+    fields["content_hash"] = digest or content_hash(fields)
+    return fields
+
+
+PRODUCT_UPSERT_SQL = '''INSERT OR REPLACE INTO products
+    (product_url, title, price, color, size, description, images,
+     price_current, price_original, currency, category_url, scraped_at, content_hash)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+            COALESCE(?, (SELECT category_url FROM frontier WHERE url = ?)), ?, ?)'''
+HISTORY_INSERT_SQL = '''INSERT INTO product_history
+    (product_url, category_url, changed_at, kind, changed, price_current, price_original, currency, sizes)
+    VALUES (?, COALESCE(?, (SELECT category_url FROM frontier WHERE url = ?)), ?, ?, ?, ?, ?, ?, ?)'''
+CHILD_DELETE_SQL = [
+    "DELETE FROM product_colors WHERE product_url = ?",
+    "DELETE FROM product_sizes WHERE product_url = ?",
+    "DELETE FROM product_images WHERE product_url = ?",
+    "DELETE FROM product_attributes WHERE product_url = ?",
+]
+# INSERT OR REPLACE gives the product a new rowid, so the old FTS row goes before the upsert
+FTS_DELETE_SQL = "DELETE FROM products_fts WHERE rowid = (SELECT rowid FROM products WHERE product_url = ?)"
+COLOR_INSERT_SQL = "INSERT INTO product_colors (product_url, position, color) VALUES (?, ?, ?)"
+SIZE_INSERT_SQL = "INSERT INTO product_sizes (product_url, position, size) VALUES (?, ?, ?)"
+IMAGE_INSERT_SQL = "INSERT INTO product_images (product_url, position, url) VALUES (?, ?, ?)"
+ATTRIBUTE_INSERT_SQL = "INSERT INTO product_attributes (product_url, position, key, value) VALUES (?, ?, ?, ?)"
+FTS_INSERT_SQL = '''INSERT INTO products_fts (rowid, title, description)
+    VALUES ((SELECT rowid FROM products WHERE product_url = ?), ?, ?)'''
+
+
+def history_statement(product_url, fields, previous, changed_at, category_url=None):
+    """The product_history row for a product that is new or differs from `previous`"""
+    changed = [k for k in fields if previous is None or fields[k] != previous.get(k)]
+    price_changed = previous is None or "price" in changed
+    sizes_changed = previous is None or "sizes" in changed
+    if previous is None:
+        kind = "new"
+    else:
+        kind = "price" if price_changed else "stock" if sizes_changed else "content"
+    current, original, currency = parse_price(fields["price"]) if price_changed else (None, None, None)
+    return (HISTORY_INSERT_SQL, (
+        product_url, category_url, product_url, changed_at, kind, ",".join(changed),
+        current, original, currency,
+        ",".join(fields["sizes"]) if sizes_changed else None,
+    ))
+
+
+def product_statements(product_url, data, category_url=None, scraped_at=None, previous=None, history=True):
+    """
+    (sql, params) pairs that write one product, its child rows and its history entry.
+    `previous` is stored_fields() for the product (None if new); when the content hash
+    matches it, nothing needs writing and the list is empty.
+    """
+    fields = product_fields(data)
+    digest = content_hash(fields)
+    if previous is not None and previous.get("content_hash") == digest:
+        return []
+    scraped_at = scraped_at if scraped_at is not None else time.time()
+    colors, sizes, images = fields["colors"], fields["sizes"], fields["images"]
+    descriptions = fields["description"]
+    current, original, currency = parse_price(data['price'])
+    statements = [(FTS_DELETE_SQL, (product_url,)), (PRODUCT_UPSERT_SQL, (
+        product_url,
+        data['title'],
+        data['price'],
+        ','.join(colors),
+        ','.join(sizes),
+        json.dumps(descriptions),
+        ','.join(images),
+        current, original, currency,
+        category_url, product_url,
+        scraped_at,
+        digest,
+    ))]
+    statements += [(sql, (product_url,)) for sql in CHILD_DELETE_SQL]
+    statements += [(COLOR_INSERT_SQL, (product_url, i, c)) for i, c in enumerate(colors)]
+    statements += [(SIZE_INSERT_SQL, (product_url, i, s)) for i, s in enumerate(sizes)]
+    statements += [(IMAGE_INSERT_SQL, (product_url, i, u)) for i, u in enumerate(images)]
+    statements += [
+        (ATTRIBUTE_INSERT_SQL, (product_url, i, d.get('key', ''), d.get('value', '')))
+        for i, d in enumerate(descriptions)
+    ]
+    statements.append((FTS_INSERT_SQL, (product_url, data['title'] or '', description_text(descriptions))))
+    if history:
+        statements.append(history_statement(product_url, fields, previous, scraped_at, category_url))
+    return statements
+
+
+def migrate(conn):
+    """Bring the database up to SCHEMA_VERSION; safe to run on every start"""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    with conn:
+        conn.execute(PRODUCTS_TABLE)
+        # Before version 4 the FTS index was keyed by a product_url column
+        rebuild_fts = "product_url" in {row[1] for row in conn.execute("PRAGMA table_info(products_fts)")}
+        if rebuild_fts:
+            conn.execute("DROP TABLE products_fts")
+        # Product writes look categories up in the frontier, so it has to exist first
+        conn.execute(FRONTIER_SCHEMA)
+        conn.execute(FRONTIER_INDEX)
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(products)")}
+        for name, kind in PRODUCT_COLUMNS_V2 + PRODUCT_COLUMNS_V3:
+            if name not in existing:
+                conn.execute(f"ALTER TABLE products ADD COLUMN {name} {kind}")
+        for ddl in CHILD_TABLES:
+            conn.execute(ddl)
+        if version < 5:
+            for name in OLD_INDEXES:
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+        for ddl in INDEXES:
+            conn.execute(ddl)
+    if rebuild_fts:
+        backfill_fts(conn)
+    if version < 2:
+        backfill_v2(conn)
+    if version < 3:
+        backfill_v3(conn)
+    if version < SCHEMA_VERSION:
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def backfill_v2(conn):
+    """Derive numeric prices, child rows and FTS entries for rows written before version 2"""
+    rows = conn.execute(
+        "SELECT p.product_url, p.title, p.price, p.color, p.size, p.description, p.images, f.last_scraped "
+        "FROM products p LEFT JOIN frontier f ON f.url = p.product_url"
+    ).fetchall()
+    now = time.time()
+    with conn:
+        for product_url, title, price, color, size, description, images, last_scraped in rows:
+            data = {"title": title, "price": price, "color": color, "size": size,
+                    "description": description, "images": images}
+            for sql, params in product_statements(product_url, data, scraped_at=last_scraped or now, history=False):
+                conn.execute(sql, params)
+
+
+def backfill_fts(conn):
+    """Re-index every product under its rowid"""
+    rows = conn.execute("SELECT rowid, title, description FROM products").fetchall()
+    with conn:
+        conn.executemany(
+            "INSERT INTO products_fts (rowid, title, description) VALUES (?, ?, ?)",
+            ((rowid, title or '', description_text(as_descriptions(description))) for rowid, title, description in rows),
+        )
+
+
+def backfill_v3(conn):
+    """Hash existing rows so their next unchanged re-scrape is skipped"""
+    urls = [row[0] for row in conn.execute("SELECT product_url FROM products WHERE content_hash IS NULL")]
+    with conn:
+        for url in urls:
+            fields = stored_fields(conn, url)
+            conn.execute("UPDATE products SET content_hash = ? WHERE product_url = ?", (fields["content_hash"], url))
@@ -0,0 +1,78 @@
+"""
+Server-Sent Events channel for scraper status.
+
+Status writers call notify(), which only flags a change. A single publisher
+thread wakes up, waits `min_interval` so a burst of updates collapses into one,
+snapshots the status and bumps a version number if anything actually changed.
+Each subscriber blocks on a condition until the version moves and then sends
+the latest snapshot, so a slow client just skips intermediate states instead of
+queueing them. Idle streams get a comment line every `heartbeat` seconds to keep
+proxies and browsers from timing them out.
+"""
+import json
+import threading
+import time
+
+
+class StatusBroadcaster:
+    def __init__(self, snapshot_fn, min_interval=0.25, heartbeat=15.0):
+        self.snapshot_fn = snapshot_fn
+        self.min_interval = min_interval
+        self.heartbeat = heartbeat
+        self.cond = threading.Condition()
+        self.dirty = threading.Event()
+        self.version = 0
+        self.payload = None
+        self.subscribers = 0
+        self._publisher = None
+        self._start_lock = threading.Lock()
+
+    def notify(self):
+        self.dirty.set()
+        if self._publisher is None:
+            self._start()
+
+    def _start(self):
+        with self._start_lock:
+            if self._publisher is None:
+                self._publisher = threading.Thread(target=self._publish_loop, name="status-events", daemon=True)
+                self._publisher.start()
+
+    def _publish_loop(self):
+        while True:
+            self.dirty.wait()
+            # Coalesce whatever else changes during the window into this one event
+            time.sleep(self.min_interval)
+            self.dirty.clear()
+            self.publish()
+
+    def publish(self):
+        payload = json.dumps(self.snapshot_fn(), sort_keys=True)
+        with self.cond:
+            if payload == self.payload:
+                return
+            self.payload = payload
+            self.version += 1
+            self.cond.notify_all()
+
+    def stream(self):
+        """Generator of SSE frames for one client, starting with the current status"""
+        if self.payload is None:
+            self.publish()
+        self._start()
+        with self.cond:
+            self.subscribers += 1
+        try:
+            seen = None
+            while True:
+                with self.cond:
+                    changed = self.cond.wait_for(lambda: self.version != seen, timeout=self.heartbeat)
+                    version, payload = self.version, self.payload
+                if not changed:
+                    yield ": heartbeat\n\n"
+                    continue
+                seen = version
+                yield f"id: {version}\nevent: status\ndata: {payload}\n\n"
+        finally:
+            with self.cond:
+                self.subscribers -= 1
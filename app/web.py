@@ -0,0 +1,691 @@
+"""
+Flask dashboard and JSON API over the scraper in main.py.
+
+    python app/web.py
+
+main.py holds the scraping engine and imports no web framework, so the CLI (cli.py)
+and worker nodes run without Flask. This module adds the routes on top and opens the
+database as it is imported.
+"""
+import hashlib
+import itertools
+import json
+import math
+import os
+import sqlite3
+
+from flask import Flask, Response, render_template_string, request, jsonify, send_file
+
+import main
+from main import (
+    DEFAULT_FETCH_MODE, DEFAULT_WORKERS, DRIVER_POOL, FRESHNESS_TTL_HOURS, JOBS, METRICS, NETWORK_POLICY, PACER,
+    RESULTS_LOCK, STATUS_EVENTS, get_db_connection, status_snapshot,
+)
+from export import FORMATS as EXPORT_FORMATS, export_stream, parse_since
+from network_policy import resolve_policy
+from product_queries import ProductQuery, row_to_record, next_cursor
+
+app = Flask(__name__)
+main.init_db()
+
+MINIMAL_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>Shein Scraper Dashboard</title>
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <!-- Modernizable CSS for dashboard UI -->
+    <style>
+        :root {
+            --primary: #5145cd;
+            --accent: #28c76f;
+            --danger: #ea5455;
+            --header-bg: #282a36;
+            --card-bg: #fff;
+            --text-main: #222;
+            --gray-bg: #f7f7fb;
+        }
+        body {
+            background: var(--gray-bg);
+            font-family: 'Segoe UI', Arial, sans-serif;
+            margin: 0;
+            color: var(--text-main);
+        }
+        .header {
+            background: var(--primary);
+            color: #fff;
+            padding: 2rem 2rem 1rem 2rem;
+        }
+        .header h1 { margin: 0 0 0.1em 0; font-size: 2.1em; }
+        .stat-cards {
+            display: flex;
+            gap: 2em;
+            margin: 1.2em 0;
+        }
+        .card {
+            background: var(--card-bg);
+            box-shadow: 0 2px 10px #0001;
+            border-radius: 10px;
+            flex: 1;
+            padding: 1em;
+            display: flex;
+            flex-direction: column;
+            align-items: flex-start;
+        }
+        .card-main {
+            font-size: 2em;
+            margin-bottom: 0.3em;
+        }
+        .card-label {
+            color: #666;
+            letter-spacing: 0.1em;
+            font-size: 0.96em;
+        }
+        .main-container {
+            max-width: 1100px;
+            margin: auto;
+            background: var(--card-bg);
+            box-shadow: 0 8px 38px #5145cd10;
+            border-radius: 18px;
+            padding: 2rem 2.5rem 3rem 2.5rem;
+            margin-top: -2.5rem;
+        }
+        .input-section label {
+            font-weight: 600;
+            font-size: 1.03em;
+        }
+        textarea {
+            width: 100%;
+            min-height: 80px;
+            resize: vertical;
+            font-size: 1.05em;
+            border-radius: 5px;
+            border: 1.5px solid #dedede;
+            padding: 0.7em 1em;
+            font-family: inherit;
+            background: #fafaff;
+        }
+        .actions {
+            margin: 1em 0 0 0;
+            display: flex;
+            gap: 0.9em;
+        }
+        button, .export-btn {
+            background: var(--primary);
+            color: #fff;
+            border: none;
+            border-radius: 6px;
+            padding: 0.7em 1.8em;
+            font-size: 1.03em;
+            cursor: pointer;
+            font-weight: 500;
+            transition: background 0.2s;
+            text-decoration: none;
+            display: inline-block;
+        }
+        button:hover, .export-btn:hover {background: var(--accent);}
+        .status-wrap {
+            margin: 2em 0 0 0;
+        }
+        .status-label {
+            font-weight: 700;
+            font-size: 1.07em;
+            margin-right: 0.5em;
+        }
+        .status-indicator {
+            display: inline-block;
+            width: 11px; height: 11px;
+            border-radius: 50%;
+            margin: 0 0.4em 0 0;
+            background: var(--gray-bg);
+            vertical-align: middle;
+        }
+        .is-idle {background: #c1c1c1;}
+        .is-processing {background: var(--primary);}
+        .is-bypass {background: #eab308;}
+        .is-blocked {background: var(--danger);}
+        .is-completed {background: var(--accent);}
+        .is-error {background: var(--danger);}
+        .data-grid-wrap {
+            margin: 3em 0 1em 0;
+        }
+        table {
+            width: 100%;
+            border-collapse: collapse;
+            background: #fff;
+            border-radius: 8px;
+            box-shadow: 0 1px 6px #2221;
+        }
+        th, td {
+            border: 1px solid #eaeaea;
+            padding: 0.9em 0.7em;
+            text-align: left;
+            font-size: 0.99em;
+        }
+        th {
+            background: #fafafa;
+            color: #333;
+        }
+        tbody tr:nth-child(odd) {background: #f8f7fc;}
+        .img-list a {
+            margin-right: 4px;
+            background: #eee;
+            padding: 2px 6px;
+            border-radius: 3px;
+            font-size: 0.87em;
+        }
+        @media (max-width: 900px) {
+            .stat-cards { flex-direction: column; gap: 0.8em; }
+            .main-container { padding: 1.3rem; }
+        }
+        @media (max-width: 600px) {
+            .header, .main-container { padding-left: 0.6em; padding-right: 0.6em; }
+        }
+        .progress-bar-wrap { margin: 0.7em 0; height: 13px; background: #e8ecfa; border-radius: 5px; overflow: hidden;}
+        .progress-bar { height: 100%; background: var(--primary);}
+        #filter-q, #sort-by { font-size: 1em; padding: 0.5em 0.8em; border-radius: 5px; border: 1.5px solid #dedede; }
+        #filter-q { flex: 1; }
+        #data-more { padding: 1em; text-align: center; color: #888; }
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>Shein Product Scraper Dashboard</h1>
+        <div class="stat-cards" id="dashboard-cards">
+            <!-- Cards updated via JS -->
+            <div class="card">
+                <span class="card-main" id="scraped-products-count">0</span>
+                <div class="card-label">Products Scraped</div>
+            </div>
+            <div class="card">
+                <span class="card-main" id="product-links-count">0</span>
+                <div class="card-label">Links Found</div>
+            </div>
+            <div class="card">
+                <span class="card-main" id="current-category">-</span>
+                <div class="card-label">Current Category</div>
+            </div>
+            <div class="card">
+                <span class="card-main status-indicator is-idle" id="status-indicator"></span>
+                <div class="card-label" id="scraper-status-text">Status</div>
+            </div>
+        </div>
+    </div>
+    <div class="main-container">
+        <div class="input-section">
+            <label for="cat-urls">Input Shein Category URLs:</label><br>
+            <textarea id="cat-urls" rows="3" placeholder="Paste one Shein category URL per line"></textarea>
+            <div class="actions">
+                <button id="scrape-btn">Start Scraping</button>
+                <a class="export-btn" href="/export" target="_blank">Export CSV</a>
+                <a class="export-btn" href="/export?format=jsonl&gzip=1" target="_blank">Export JSONL (gz)</a>
+                <button id="refresh-btn" type="button">Refresh Table</button>
+            </div>
+            <div class="actions">
+                <input id="filter-q" type="search" placeholder="Filter by title">
+                <select id="sort-by">
+                    <option value="product_url">Sort: default</option>
+                    <option value="title">Sort: title</option>
+                    <option value="price">Sort: price</option>
+                    <option value="category">Sort: category</option>
+                </select>
+            </div>
+        </div>
+        <div class="status-wrap">
+            <span class="status-label">Progress:</span>
+            <span id="progress-prod">0</span>/<span id="progress-total">0</span>
+            <div class="progress-bar-wrap">
+                <div class="progress-bar" id="progress-bar" style="width:0%;"></div>
+            </div>
+            <span class="status-label">Last Message:</span>
+            <span id="scraper-message">Idle</span>
+        </div>
+        <div class="data-grid-wrap">
+            <h2 style="margin-bottom:0.5em;">Scraped Products</h2>
+            <div id="data-view"></div>
+        </div>
+    </div>
+    <footer style="margin:3em 0 1em 0; text-align:center; font-size:0.95em; color:#888;">
+        &copy; 2024 Carregar (Pty) Ltd &ndash; Shein Advanced Scraper Dashboard
+    </footer>
+    <script>
+        // Update stat cards and UI from status
+        function updateDashboard(status) {
+            document.getElementById('scraped-products-count').textContent = status.products_scraped;
+            document.getElementById('product-links-count').textContent = status.product_links_found;
+            document.getElementById('current-category').textContent = status.current_category || "-";
+            document.getElementById('progress-prod').textContent = status.products_scraped;
+            document.getElementById('progress-total').textContent = status.product_links_found;
+
+            // update status indicator and text
+            var el = document.getElementById('status-indicator');
+            el.className = 'card-main status-indicator';
+            var statusMap = {
+                "Idle": "is-idle",
+                "Processing": "is-processing",
+                "Attempting Bypass": "is-bypass",
+                "Blocked": "is-blocked",
+                "Completed": "is-completed",
+                "Error": "is-error"
+            };
+            var state = status.status;
+            if (statusMap[state]) el.classList.add(statusMap[state]);
+            document.getElementById('scraper-status-text').textContent = state;
+
+            // update progress bar
+            let perc = (status.product_links_found > 0)
+                ? Math.round(100.0 * status.products_scraped/status.product_links_found)
+                : 0;
+            document.getElementById('progress-bar').style.width = perc + "%";
+
+            document.getElementById('scraper-message').textContent = status.message || "";
+        }
+
+        // Status is pushed over Server-Sent Events; polling is only a fallback
+        let statusSource = null;
+
+        function fetchStatus() {
+            fetch('/status').then(r=>r.json()).then(d=>{
+                updateDashboard(d);
+                if(!statusSource && (d.status == "Processing" || d.status == "Attempting Bypass")) setTimeout(fetchStatus, 3000);
+            });
+        }
+
+        function watchStatus() {
+            if (!window.EventSource) return fetchStatus();
+            statusSource = new EventSource('/status/stream');
+            statusSource.addEventListener('status', e => updateDashboard(JSON.parse(e.data)));
+            statusSource.onerror = () => {
+                // EventSource reconnects by itself; poll while the stream is down
+                if (statusSource.readyState === EventSource.CLOSED) {
+                    statusSource = null;
+                    fetchStatus();
+                }
+            };
+        }
+
+        function startScraping(){
+            let urls = document.getElementById('cat-urls').value.split('\n');
+            fetch('/scrape', {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({category_urls: urls})
+            }).then(r=>r.json()).then(d=>{
+                fetchStatus();
+                setTimeout(loadTable, 3000);
+            });
+        }
+
+        // Rows are fetched a page at a time and appended as the end of the table scrolls into view
+        const PAGE_SIZE = 50;
+        let nextCursor = null;
+        let tableLoading = false;
+
+        function esc(v) {
+            return String(v == null ? '' : v).replace(/[&<>"']/g, c => ({'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;',"'":'&#39;'}[c]));
+        }
+
+        function renderRows(rows) {
+            let html = '';
+            for(let row of rows){
+                html += '<tr>'
+                    + `<td>${esc(row.title)}</td>`
+                    + `<td>${esc(row.price)}</td>`
+                    + `<td>${esc(Array.isArray(row.color) ? row.color.join(", ") : row.color)}</td>`
+                    + `<td>${esc(Array.isArray(row.size) ? row.size.join(", ") : row.size)}</td>`
+                    + `<td style="max-width:250px">${Array.isArray(row.description) ? row.description.map(x => esc(x.key) + ": " + esc(x.value)).join("<br>") : esc(row.description)}</td>`
+                    + `<td class="img-list">${(row.images || '').split(',').filter(u => u).map(u=>"<a href='"+esc(u)+"' target='_blank'>img</a>").join(' ')}</td>`
+                    + `<td><a href="${esc(row.product_url)}" target="_blank">Link</a></td>`
+                    + '</tr>';
+            }
+            document.getElementById('data-rows').insertAdjacentHTML('beforeend', html);
+        }
+
+        function loadTable(reset) {
+            if (reset === undefined) reset = true;
+            if (tableLoading || (!reset && !nextCursor)) return;
+            if (reset) {
+                nextCursor = null;
+                document.getElementById('data-view').innerHTML =
+                    '<table><thead><tr><th>Title</th><th>Price</th><th>Colors</th><th>Sizes</th><th>Description</th><th>Images</th><th>Link</th></tr></thead>'
+                    + '<tbody id="data-rows"></tbody></table><div id="data-more"></div>';
+                tableObserver.observe(document.getElementById('data-more'));
+            }
+            let params = new URLSearchParams({limit: PAGE_SIZE, sort: document.getElementById('sort-by').value});
+            let q = document.getElementById('filter-q').value.trim();
+            if (q) params.set('q', q);
+            if (nextCursor) params.set('cursor', nextCursor);
+            tableLoading = true;
+            fetch('/data?' + params).then(r => {
+                nextCursor = r.headers.get('X-Next-Cursor');
+                return r.json();
+            }).then(rows => {
+                renderRows(rows);
+                document.getElementById('data-more').textContent = nextCursor ? 'Loading more...' : '';
+            }).finally(() => { tableLoading = false; });
+        }
+
+        const tableObserver = new IntersectionObserver(entries => {
+            if (entries.some(e => e.isIntersecting)) loadTable(false);
+        });
+
+        document.getElementById('scrape-btn').onclick = startScraping;
+        document.getElementById('refresh-btn').onclick = () => loadTable(true);
+        document.getElementById('sort-by').onchange = () => loadTable(true);
+        let filterTimer = null;
+        document.getElementById('filter-q').oninput = () => {
+            clearTimeout(filterTimer);
+            filterTimer = setTimeout(() => loadTable(true), 300);
+        };
+        window.onload = function() {
+            watchStatus();
+            loadTable();
+        };
+    </script>
+</body>
+</html>
+"""
+
+@app.route('/')
+def index():
+    return render_template_string(MINIMAL_TEMPLATE)
+
+@app.route('/status')
+def status():
+    return jsonify(status_snapshot())
+
+@app.route('/status/stream')
+def status_stream():
+    return Response(STATUS_EVENTS.stream(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+@app.route('/metrics')
+def metrics():
+    snapshot = status_snapshot()
+    pool = DRIVER_POOL.stats()
+    gauges = {
+        "products_scraped": snapshot["products_scraped"],
+        "product_links_found": snapshot["product_links_found"],
+        "db_errors": snapshot["db_errors"],
+        "job_running": int(snapshot["status"] == "Processing"),
+        "healthy_proxies": main.PROXY_POOL.healthy(),
+    }
+    gauges.update({f"driver_pool_{k}": v for k, v in pool.items() if isinstance(v, (int, float))})
+    return Response(METRICS.render(gauges), mimetype="text/plain; version=0.0.4")
+
+@app.route('/pacing')
+def pacing():
+    """Current rate, tokens and outcome counts of every (proxy, host) pacing bucket"""
+    return jsonify(PACER.snapshot())
+
+def json_body():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        raise ValueError("Expected a JSON object")
+    return body
+
+def json_number(body, key, default, kind=int, minimum=None):
+    """body[key] as an int or float (`kind`); ValueError naming the field when it is not one"""
+    value = body.get(key, default)
+    try:
+        if isinstance(value, bool):
+            raise TypeError(value)
+        number = kind(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"{key} must be {'an integer' if kind is int else 'a number'}, got {value!r}")
+    if kind is float and not math.isfinite(number):
+        raise ValueError(f"{key} must be finite, got {value!r}")
+    if minimum is not None and number < minimum:
+        raise ValueError(f"{key} must be at least {minimum}, got {value!r}")
+    return number
+
+FLAG_VALUES = {"true": True, "1": True, "yes": True, "on": True, "false": False, "0": False, "no": False, "off": False}
+
+def json_flag(body, key):
+    """body[key] as a bool, None when absent; accepts JSON booleans, 0/1 and true/false-style strings"""
+    value = body.get(key)
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in FLAG_VALUES:
+        return FLAG_VALUES[value.strip().lower()]
+    raise ValueError(f"{key} must be true or false, got {value!r}")
+
+def json_urls(body):
+    urls = body.get('category_urls', [])
+    if not isinstance(urls, list) or not all(isinstance(u, str) for u in urls):
+        raise ValueError("category_urls must be a list of URLs")
+    return [u.strip() for u in urls if u.strip()]
+
+@app.route('/scrape', methods=['POST'])
+def scrape():
+    try:
+        body = json_body()
+        category_urls = json_urls(body)
+        workers = json_number(body, 'workers', DEFAULT_WORKERS, minimum=1)
+        freshness_hours = json_number(body, 'freshness_hours', FRESHNESS_TTL_HOURS, float, minimum=0)
+        priority = json_number(body, 'priority', 0)
+        download_images = json_flag(body, 'download_images')
+    except ValueError as e:
+        return jsonify({"ok": False, "msg": str(e)}), 400
+    fetch_mode = body.get('fetch_mode', DEFAULT_FETCH_MODE)
+    if fetch_mode not in ("browser", "http"):
+        return jsonify({"ok": False, "msg": f"Unknown fetch_mode: {fetch_mode}"}), 400
+    network = body.get('network')
+    try:
+        resolve_policy(network, default=NETWORK_POLICY)
+    except (TypeError, ValueError) as e:
+        return jsonify({"ok": False, "msg": str(e)}), 400
+    job = JOBS.submit({
+        "category_urls": category_urls,
+        "workers": workers,
+        "freshness_hours": freshness_hours,
+        "fetch_mode": fetch_mode,
+        "network": network,
+        "download_images": download_images,
+    }, priority=priority)
+    return jsonify({"ok": True, "msg": "Scraping queued", "job_id": job.id})
+
+@app.route('/dispatch', methods=['POST'])
+def dispatch():
+    """Publish categories to the shared task queue for worker nodes instead of scraping here"""
+    try:
+        body = json_body()
+        category_urls = json_urls(body)
+        priority = json_number(body, 'priority', 0)
+    except ValueError as e:
+        return jsonify({"ok": False, "msg": str(e)}), 400
+    if not category_urls:
+        return jsonify({"ok": False, "msg": "No category_urls given"}), 400
+    added = main.WORK_QUEUE.publish("category", category_urls, priority=priority)
+    return jsonify({"ok": True, "msg": f"Queued {added} category task(s)", "queued": added})
+
+@app.route('/queue')
+def queue_status():
+    reclaimed = main.WORK_QUEUE.reclaim()
+    return jsonify({"tasks": main.WORK_QUEUE.counts(), "workers": main.WORK_QUEUE.workers(), "reclaimed": reclaimed})
+
+@app.route('/images/<digest>')
+def image_blob(digest):
+    """A downloaded product image by SHA-256 (?thumb=1 for the thumbnail)"""
+    if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+        return jsonify({"ok": False, "msg": "Bad image id"}), 400
+    conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT path, thumb_path, content_type FROM image_blobs WHERE sha256 = ?",
+                           (digest,)).fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    finally:
+        conn.close()
+    thumb = request.args.get('thumb') == '1'
+    path = row and (row['thumb_path'] if thumb else row['path'])
+    if not path or not os.path.exists(path):
+        return jsonify({"ok": False, "msg": "Image not found"}), 404
+    response = send_file(os.path.abspath(path), mimetype="image/jpeg" if thumb else row['content_type'])
+    # Content-addressed, so the bytes behind a digest never change
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+@app.route('/jobs')
+def jobs_list():
+    return jsonify({"jobs": [job.describe() for job in JOBS.list()], **JOBS.stats()})
+
+@app.route('/jobs/<job_id>')
+def job_detail(job_id):
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({"ok": False, "msg": "Unknown job"}), 404
+    return jsonify(job.describe())
+
+@app.route('/jobs/<job_id>/results')
+def job_results_view(job_id):
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({"ok": False, "msg": "Unknown job"}), 404
+    try:
+        offset = max(0, json_number(request.args, 'offset', 0))
+        limit = max(1, min(json_number(request.args, 'limit', 100), 1000))
+    except ValueError as e:
+        return jsonify({"ok": False, "msg": str(e)}), 400
+    with RESULTS_LOCK:
+        page = job.results[offset:offset + limit]
+        total = len(job.results)
+    return jsonify({"job_id": job.id, "total": total, "offset": offset, "results": page})
+
+@app.route('/jobs/<job_id>/dead-letters')
+def job_dead_letters_view(job_id):
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({"ok": False, "msg": "Unknown job"}), 404
+    with RESULTS_LOCK:
+        entries = list(job.dead_letters)
+    return jsonify({"job_id": job.id, "total": len(entries), "dead_letters": entries})
+
+@app.route('/jobs/<job_id>/<action>', methods=['POST'])
+def job_action(job_id, action):
+    actions = {"cancel": JOBS.cancel, "pause": JOBS.pause, "resume": JOBS.resume}
+    if action not in actions:
+        return jsonify({"ok": False, "msg": f"Unknown action: {action}"}), 400
+    job = actions[action](job_id)
+    if job is None:
+        return jsonify({"ok": False, "msg": "Unknown job"}), 404
+    return jsonify({"ok": True, "job_id": job.id, "status": job.status["status"]})
+
+@app.route('/data')
+def data_view():
+    """
+    Products page by page: ?limit=&cursor= (keyset, next cursor in the X-Next-Cursor header),
+    ?q= (full-text) &category=&color=&size=&min_price=&max_price= filters,
+    ?sort=title|price|category|scraped_at&order=asc|desc,
+    ?fields= projection and ?format=ndjson to stream every matching row.
+    """
+    try:
+        query = ProductQuery(request.args)
+    except ValueError as e:
+        return jsonify({"ok": False, "msg": str(e)}), 400
+    conn = get_db_connection()
+    # REPLACE gives a row a new rowid, so count + max rowid changes whenever products change
+    version = tuple(conn.execute("SELECT COUNT(*), COALESCE(MAX(rowid), 0) FROM products").fetchone())
+    etag = hashlib.sha1(f"{version}|{request.query_string.decode()}".encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        conn.close()
+        resp = Response(status=304)
+        resp.set_etag(etag)
+        return resp
+
+    if request.args.get("format") == "ndjson":
+        limited = "limit" in request.args
+        sql, params = query.sql(paged=limited)
+
+        def generate():
+            try:
+                rows = conn.execute(sql, params)
+                if limited:
+                    rows = itertools.islice(rows, query.limit)
+                for row in rows:
+                    yield json.dumps(row_to_record(row, query.fields)) + "\n"
+            finally:
+                conn.close()
+
+        resp = Response(generate(), mimetype="application/x-ndjson")
+    else:
+        sql, params = query.sql()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        page = rows[:query.limit]
+        resp = jsonify([row_to_record(row, query.fields) for row in page])
+        if len(rows) > query.limit:
+            resp.headers["X-Next-Cursor"] = next_cursor(page[-1])
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+@app.route('/changes')
+def product_changes():
+    """
+    Recorded product changes, newest first: ?category=<category url>, ?since=<epoch seconds
+    or ISO 8601>, ?product=<product url>, ?kind=new|price|stock|content, ?limit (default 100).
+    """
+    clauses, params = [], []
+    try:
+        if request.args.get('since'):
+            clauses.append("h.changed_at >= ?")
+            params.append(parse_since(request.args['since']))
+        limit = max(1, min(json_number(request.args, 'limit', 100), 1000))
+    except ValueError as e:
+        return jsonify({"ok": False, "msg": str(e)}), 400
+    for arg, column in (('category', 'h.category_url'), ('product', 'h.product_url'), ('kind', 'h.kind')):
+        if request.args.get(arg):
+            clauses.append(f"{column} = ?")
+            params.append(request.args[arg])
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            f'''SELECT h.product_url, p.title, h.category_url, h.changed_at, h.kind, h.changed,
+                    h.price_current, h.price_original, h.currency, h.sizes
+                FROM product_history h LEFT JOIN products p ON p.product_url = h.product_url
+                {where} ORDER BY h.changed_at DESC, h.id DESC LIMIT ?''',
+            (*params, limit),
+        ).fetchall()
+    finally:
+        conn.close()
+    changes = []
+    for row in rows:
+        change = {k: row[k] for k in row.keys() if row[k] is not None}
+        change["changed"] = row["changed"].split(",") if row["changed"] else []
+        if row["sizes"] is not None:
+            change["sizes"] = row["sizes"].split(",") if row["sizes"] else []
+        changes.append(change)
+    return jsonify(changes)
+
+@app.route('/export')
+def export_data():
+    """
+    Stream the products table as ?format=csv|jsonl|parquet|arrow (default csv), gzipped with
+    ?gzip=1; ?since=<epoch seconds or ISO 8601> limits it to products scraped since then.
+    """
+    fmt = request.args.get('format', 'csv')
+    gzip = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    try:
+        since = parse_since(request.args['since']) if request.args.get('since') else None
+        chunks = export_stream(main.DB_PATH, fmt, since=since, gzip=gzip)
+    except ValueError as e:
+        return jsonify({"ok": False, "msg": str(e)}), 400
+    except ImportError:
+        return jsonify({"ok": False, "msg": f"{fmt} export needs pyarrow installed"}), 501
+    mimetype, ext = EXPORT_FORMATS[fmt]
+    filename = f"shein_scraped_data.{ext}" + (".gz" if gzip else "")
+    return Response(chunks, mimetype="application/gzip" if gzip else mimetype, headers={
+        "Content-Disposition": f"attachment; filename={filename}",
+    })
+
+if __name__ == "__main__":
+    app.run(port=8080, debug=True)
@@ -0,0 +1,225 @@
+"""
+Durable task queue shared by the coordinator and worker nodes.
+
+Tasks live in the `tasks` table of a SQLite file that every node opens on the same
+host (WAL mode, so readers never block the single writer; WAL doesn't work over a
+network filesystem). The coordinator publishes `category` tasks. Workers lease
+tasks, and a category worker publishes the `product` tasks it discovers. A lease lasts `lease_seconds` and is extended by heartbeats. If a node
+dies, its leases expire and the tasks go back to `queued` the next time anyone leases
+or calls reclaim(), so the crawl never stalls on a dead node. A task that keeps
+failing is parked as `failed` after `max_attempts` tries.
+"""
+import json
+import os
+import socket
+import sqlite3
+import time
+
+from db_writer import configure_connection
+
+TASKS_SCHEMA = '''CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,                  -- 'category' or 'product'
+    url TEXT NOT NULL,
+    payload TEXT,                        -- JSON, e.g. the product's category_url
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'queued',  -- queued / leased / done / failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    lease_expires REAL,
+    result TEXT,
+    last_error TEXT,
+    created_at REAL,
+    updated_at REAL,
+    UNIQUE (kind, url)
+)'''
+TASKS_INDEX = "CREATE INDEX IF NOT EXISTS idx_tasks_state_priority ON tasks (state, priority DESC, id)"
+WORKERS_SCHEMA = '''CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    host TEXT,
+    pid INTEGER,
+    started_at REAL,
+    last_heartbeat REAL,
+    tasks_done INTEGER NOT NULL DEFAULT 0,
+    tasks_failed INTEGER NOT NULL DEFAULT 0
+)'''
+
+# Re-publishing a finished task queues it again; queued or leased ones are left alone
+PUBLISH_SQL = '''INSERT INTO tasks (kind, url, payload, priority, state, attempts, created_at, updated_at)
+    VALUES (?, ?, ?, ?, 'queued', 0, ?, ?)
+    ON CONFLICT(kind, url) DO UPDATE SET state = 'queued', attempts = 0, worker_id = NULL,
+        lease_expires = NULL, payload = excluded.payload, priority = excluded.priority,
+        updated_at = excluded.updated_at
+    WHERE tasks.state IN ('done', 'failed')'''
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class Task:
+    def __init__(self, row):
+        self.id, self.kind, self.url, payload, self.attempts = row
+        self.payload = json.loads(payload) if payload else {}
+
+
+class WorkQueue:
+    def __init__(self, db_path, lease_seconds=120, max_attempts=3):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        conn = self._connect()
+        try:
+            conn.execute(TASKS_SCHEMA)
+            conn.execute(TASKS_INDEX)
+            conn.execute(WORKERS_SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # Autocommit; lease() opens its own BEGIN IMMEDIATE so two nodes can't take the same task
+        conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=30)
+        return configure_connection(conn)
+
+    def publish(self, kind, urls, payload=None, priority=0):
+        now = time.time()
+        body = json.dumps(payload) if payload else None
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            before = conn.total_changes
+            conn.executemany(PUBLISH_SQL, [(kind, url, body, priority, now, now) for url in urls])
+            added = conn.total_changes - before
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return added
+
+    def lease(self, worker_id, kinds=("category", "product"), limit=1):
+        """Claim up to `limit` queued tasks (highest priority, oldest first) for `worker_id`"""
+        now = time.time()
+        marks = ",".join("?" * len(kinds))
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._reclaim(conn, now)
+            rows = conn.execute(
+                f'''SELECT id, kind, url, payload, attempts FROM tasks
+                    WHERE state = 'queued' AND kind IN ({marks})
+                    ORDER BY priority DESC, id LIMIT ?''',
+                (*kinds, limit),
+            ).fetchall()
+            conn.executemany(
+                '''UPDATE tasks SET state = 'leased', worker_id = ?, lease_expires = ?,
+                    attempts = attempts + 1, updated_at = ? WHERE id = ?''',
+                [(worker_id, now + self.lease_seconds, now, row[0]) for row in rows],
+            )
+            self._touch_worker(conn, worker_id, now)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return [Task(row) for row in rows]
+
+    def heartbeat(self, worker_id, task_ids=()):
+        """Extend this worker's leases on `task_ids`; returns the ids it still holds"""
+        now = time.time()
+        task_ids = list(task_ids)
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._touch_worker(conn, worker_id, now)
+            held = []
+            for task_id in task_ids:
+                cur = conn.execute(
+                    '''UPDATE tasks SET lease_expires = ?, updated_at = ?
+                        WHERE id = ? AND worker_id = ? AND state = 'leased' ''',
+                    (now + self.lease_seconds, now, task_id, worker_id),
+                )
+                if cur.rowcount:
+                    held.append(task_id)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return held
+
+    def complete(self, task_id, worker_id, result=None):
+        """Mark a task done; False if the lease was lost (expired and handed to someone else)"""
+        return self._finish(task_id, worker_id, '''UPDATE tasks SET state = 'done', result = ?,
+            last_error = NULL, lease_expires = NULL, updated_at = ?
+            WHERE id = ? AND worker_id = ? AND state = 'leased' ''',
+            (json.dumps(result) if result is not None else None, time.time(), task_id, worker_id), "tasks_done")
+
+    def fail(self, task_id, worker_id, error=''):
+        """Give a task back for another attempt, or park it as failed once out of attempts"""
+        return self._finish(task_id, worker_id, '''UPDATE tasks SET
+            state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+            worker_id = NULL, lease_expires = NULL, last_error = ?, updated_at = ?
+            WHERE id = ? AND worker_id = ? AND state = 'leased' ''',
+            (self.max_attempts, str(error)[:500], time.time(), task_id, worker_id), "tasks_failed")
+
+    def reclaim(self):
+        """Requeue tasks whose lease has expired; returns how many"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            count = self._reclaim(conn, time.time())
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return count
+
+    def counts(self):
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT kind, state, COUNT(*) FROM tasks GROUP BY kind, state").fetchall()
+        finally:
+            conn.close()
+        counts = {}
+        for kind, state, n in rows:
+            counts.setdefault(kind, {})[state] = n
+        return counts
+
+    def workers(self, active_within=None):
+        """Registered worker nodes, newest heartbeat first; `alive` means a heartbeat within one lease"""
+        window = self.lease_seconds if active_within is None else active_within
+        now = time.time()
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                '''SELECT w.worker_id, w.host, w.pid, w.started_at, w.last_heartbeat, w.tasks_done,
+                        w.tasks_failed, (SELECT COUNT(*) FROM tasks t WHERE t.worker_id = w.worker_id
+                                         AND t.state = 'leased')
+                    FROM workers w ORDER BY w.last_heartbeat DESC''',
+            ).fetchall()
+        finally:
+            conn.close()
+        keys = ("worker_id", "host", "pid", "started_at", "last_heartbeat", "tasks_done", "tasks_failed", "leased")
+        return [dict(zip(keys, row), alive=now - row[4] < window) for row in rows]
+
+    def _finish(self, task_id, worker_id, sql, params, counter):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            ok = conn.execute(sql, params).rowcount > 0
+            if ok:
+                conn.execute(f"UPDATE workers SET {counter} = {counter} + 1 WHERE worker_id = ?", (worker_id,))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return ok
+
+    def _reclaim(self, conn, now):
+        cur = conn.execute(
+            '''UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                worker_id = NULL, lease_expires = NULL, last_error = 'lease expired', updated_at = ?
+                WHERE state = 'leased' AND lease_expires < ?''',
+            (self.max_attempts, now, now),
+        )
+        return cur.rowcount
+
+    def _touch_worker(self, conn, worker_id, now):
+        conn.execute(
+            '''INSERT INTO workers (worker_id, host, pid, started_at, last_heartbeat) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(worker_id) DO UPDATE SET last_heartbeat = excluded.last_heartbeat''',
+            (worker_id, socket.gethostname(), os.getpid(), now, now),
+        )
@@ -0,0 +1,187 @@
+"""
+Worker node for distributed mode.
+
+The Flask app (coordinator) publishes category tasks via POST /dispatch into the
+`tasks` table of shein_scraper.db (see work_queue.py). Each node leases tasks from
+that file and scrapes them with the regular scraping code, one browser per thread.
+Category tasks publish the product links they find as product tasks. Product rows
+land in the same database. A heartbeat thread keeps the node's leases alive, so a
+node that dies simply lets them expire and another node picks the tasks up.
+
+If a heartbeat finds that a lease was lost (it expired while the node was stalled
+and the task went to another node), the task's job is cancelled and whatever it
+produced is dropped: no product row, no published links, no completion. Leases are
+also confirmed right before a product is written.
+
+Every node must run on the same host as the coordinator, against the same local
+database file. SQLite's WAL mode relies on shared memory and file locks that network
+filesystems (NFS, SMB) don't provide, so a database shared over the network can be
+corrupted. Scale out with more nodes or --threads on that host.
+
+    cd /path/to/app/dir && python worker_node.py --threads 2
+"""
+import argparse
+import threading
+import time
+
+import main
+from jobs import Job, bound
+from work_queue import WorkQueue, default_worker_id
+
+
+class WorkerNode:
+    def __init__(self, queue, worker_id=None, threads=1, kinds=("category", "product"), proxies=None,
+                 idle_sleep=2.0, exit_when_idle=False, captcha_backoff=30.0):
+        self.queue = queue
+        self.worker_id = worker_id or default_worker_id()
+        self.threads = threads
+        self.kinds = tuple(kinds)
+        self.proxies = proxies or []
+        self.idle_sleep = idle_sleep
+        self.exit_when_idle = exit_when_idle
+        self.captcha_backoff = captcha_backoff
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        # Task id -> the Job scraping it, for every task this node holds a lease on
+        self.held = {}
+        self.leases_lost = 0
+
+    def run(self):
+        beat = threading.Thread(target=self._heartbeat_loop, name="heartbeat", daemon=True)
+        beat.start()
+        loops = [threading.Thread(target=self._loop, args=(i,), daemon=True) for i in range(self.threads)]
+        for thr in loops:
+            thr.start()
+        try:
+            for thr in loops:
+                while thr.is_alive():
+                    thr.join(0.5)
+        except KeyboardInterrupt:
+            self.stop.set()
+            for thr in loops:
+                thr.join()
+        self.stop.set()
+
+    def _heartbeat_loop(self):
+        while not self.stop.wait(self.queue.lease_seconds / 3):
+            with self.lock:
+                held = dict(self.held)
+            kept = set(self.queue.heartbeat(self.worker_id, list(held)))
+            for task_id, job in held.items():
+                if task_id not in kept:
+                    self._lose(job)
+
+    def _lose(self, job):
+        """The task now belongs to another node: stop scraping it"""
+        job.status.update(error="Lease lost")
+        job.cancelled.set()
+        job.unpaused.set()
+
+    def _still_held(self, task, job):
+        """Confirm (and extend) the lease right before writing anything for the task"""
+        if not job.cancelled.is_set() and task.id not in self.queue.heartbeat(self.worker_id, [task.id]):
+            self._lose(job)
+        return not job.cancelled.is_set()
+
+    def _loop(self, index):
+        proxy = self.proxies[index % len(self.proxies)] if self.proxies else None
+        driver = None
+        try:
+            while not self.stop.is_set():
+                tasks = self.queue.lease(self.worker_id, self.kinds)
+                if not tasks:
+                    if self.exit_when_idle and self._drained():
+                        return
+                    self.stop.wait(self.idle_sleep)
+                    continue
+                task = tasks[0]
+                job = Job({"task_id": task.id, "kind": task.kind, "url": task.url}, main.STATUS_DEFAULTS)
+                with self.lock:
+                    self.held[task.id] = job
+                try:
+                    if driver is None:
+                        driver = main.DRIVER_POOL.acquire(proxy, main.current_policy())
+                    result = self.handle(task, driver, job)
+                except Exception as e:
+                    if not job.cancelled.is_set():
+                        self.queue.fail(task.id, self.worker_id, e)
+                        if proxy:
+                            main.PROXY_POOL.report_failure(proxy)
+                        if driver is not None:
+                            main.DRIVER_POOL.release(driver, broken=True)
+                            driver = None
+                        continue
+                    result = None
+                finally:
+                    with self.lock:
+                        self.held.pop(task.id, None)
+                lost = job.cancelled.is_set()
+                if not lost and result is None:
+                    # Blocked: hand the task back and come back later with a fresh browser
+                    self.queue.fail(task.id, self.worker_id, "CAPTCHA")
+                    main.DRIVER_POOL.release(driver, broken=True)
+                    driver = None
+                    self.stop.wait(self.captcha_backoff)
+                elif not lost:
+                    lost = not self.queue.complete(task.id, self.worker_id, result)
+                if lost:
+                    # The task belongs to another node now, and its run is the one that counts
+                    with self.lock:
+                        self.leases_lost += 1
+        finally:
+            if driver is not None:
+                main.DRIVER_POOL.release(driver)
+
+    def _drained(self):
+        """Nothing queued or leased anywhere (a leased category task may still publish products)"""
+        return not any(states.get("queued") or states.get("leased") for states in self.queue.counts().values())
+
+    def handle(self, task, driver, job):
+        """Scrape one task in `job`'s context; None means the page was blocked"""
+        if task.kind == "category":
+            return bound(self._scrape_category, job)(job, task, driver)
+        return bound(self._scrape_product, job)(job, task, driver)
+
+    def _scrape_category(self, job, task, driver):
+        def publish(links):
+            if not self._still_held(task, job):
+                return
+            fresh = main.FRONTIER.not_due(links)
+            self.queue.publish("product", [link for link in links if link not in fresh],
+                               payload={"category_url": task.url})
+
+        links = main.scrape_category(task.url, driver, workers=1, on_links=publish)
+        if job.status["captcha_detected"]:
+            return None
+        return {"links": len(links)}
+
+    def _scrape_product(self, job, task, driver):
+        data = main.scrape_product(task.url, driver)
+        if data is None or not self._still_held(task, job):
+            return None
+        main.record_product(task.url, data)
+        return {"title": data.get("title", "")}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=1, help="Browsers (and concurrent tasks) on this node")
+    parser.add_argument("--kinds", nargs="+", choices=("category", "product"), default=["category", "product"])
+    parser.add_argument("--worker-id", default=None)
+    parser.add_argument("--lease", type=float, default=120.0, help="Lease length in seconds")
+    parser.add_argument("--use-proxies", action="store_true")
+    parser.add_argument("--exit-when-idle", action="store_true", help="Stop once the queue is empty")
+    args = parser.parse_args()
+    main.init_db()
+    node = WorkerNode(
+        WorkQueue(main.DB_PATH, lease_seconds=args.lease),
+        worker_id=args.worker_id,
+        threads=args.threads,
+        kinds=args.kinds,
+        proxies=main.get_ranked_proxies() if args.use_proxies else None,
+        exit_when_idle=args.exit_when_idle,
+    )
+    print(f"Worker {node.worker_id} polling {main.DB_PATH} with {args.threads} thread(s)")
+    started = time.time()
+    node.run()
+    print(f"Worker {node.worker_id} stopped after {time.time() - started:.0f}s ({node.leases_lost} lease(s) lost)")
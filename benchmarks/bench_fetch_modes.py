@@ -0,0 +1,63 @@
+"""
+Compare the HTTP fast path with the browser path for product pages on the local
+fixture site. Every Nth page is served without a price so the escalation to
+Chrome is exercised; pass --browser to include the all-browser baseline (needs Chrome).
+
+    python benchmarks/bench_fetch_modes.py --products 200 --latency 0.05
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+# main.py keeps shein_scraper.db in the working directory; benchmark runs use a scratch one
+os.chdir(tempfile.mkdtemp(prefix="shein-bench-"))
+
+import main  # noqa: E402
+from fixture_site import FixtureSite  # noqa: E402
+from rate_control import RateController  # noqa: E402
+
+
+def timed(label, fn, links):
+    main.job_results().clear()
+    main.set_status(products_scraped=0, fast_path_pages=0, browser_path_pages=0)
+    start = time.perf_counter()
+    fn(links)
+    elapsed = time.perf_counter() - start
+    scraped = main.SCRAPER_STATUS["products_scraped"]
+    print(f"{label:<8} {scraped:>6} {elapsed:>9.2f} {scraped / elapsed if elapsed else 0:>10.2f} "
+          f"{main.SCRAPER_STATUS['fast_path_pages']:>6} {main.SCRAPER_STATUS['browser_path_pages']:>8}")
+
+
+def run(products, latency, missing_every, workers, browser):
+    site = FixtureSite(pages=1, per_page=products, latency=latency, missing_every=missing_every).start()
+    main.random_human_delay = lambda a=1.5, b=4.5: None
+    main.PACER = RateController(rate=1000.0, max_rate=1000.0, host_rate=None)
+    try:
+        links = site.product_urls()
+        print(f"{'mode':<8} {'pages':>6} {'seconds':>9} {'pages/sec':>10} {'fast':>6} {'browser':>8}")
+        escalated = []
+        if not browser:
+            # Without Chrome only the fast path is timed; escalated URLs are just counted
+            main.scrape_products = lambda stream, *a, **k: escalated.extend(stream.iter_urls())
+        timed("http", lambda l: main.scrape_products_http(l, workers=workers), links)
+        if browser:
+            timed("browser", lambda l: main.scrape_products(l, workers=workers), links)
+        else:
+            print(f"{len(escalated)} page(s) would have been escalated to the browser")
+    finally:
+        site.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--missing-every", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=main.DEFAULT_WORKERS)
+    parser.add_argument("--browser", action="store_true")
+    args = parser.parse_args()
+    main.init_db()
+    run(args.products, args.latency, args.missing_every, args.workers, args.browser)
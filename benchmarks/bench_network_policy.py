@@ -0,0 +1,56 @@
+"""
+Compare network policies on the local fixture site: seconds per product page, bytes
+the fixture server sent, and what the browser's own traffic meter reports (bytes
+received, blocked requests, estimated bytes saved). Needs Chrome, like the scraper.
+
+    python benchmarks/bench_network_policy.py --policies off default --products 30 --image-kb 80
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import main  # noqa: E402
+from fixture_site import FixtureSite  # noqa: E402
+from network_policy import POLICIES, resolve_policy  # noqa: E402
+
+
+def run(policies, products, latency, image_kb):
+    site = FixtureSite(pages=1, per_page=products, latency=latency, image_bytes=image_kb * 1024).start()
+    # Measure every policy, including ones that normally run without the performance log
+    chosen = [(name, resolve_policy({"base": name, "measure": True})) for name in policies]
+    print(f"{'policy':<10} {'s/page':>7} {'served KB':>10} {'recv KB':>8} {'blocked':>8} {'saved KB':>9}")
+    try:
+        for name, policy in chosen:
+            driver = main.get_selenium_driver(policy=policy)
+            try:
+                served = site.bytes_served
+                received = blocked = saved = 0
+                start = time.perf_counter()
+                for url in site.product_urls():
+                    driver.get(url)
+                    main.extract_product_data(driver)
+                    traffic = main.TRAFFIC.collect(driver)
+                    if traffic:
+                        received += traffic.bytes
+                        blocked += sum(traffic.blocked.values())
+                        saved += traffic.saved_estimate
+                elapsed = (time.perf_counter() - start) / products
+            finally:
+                driver.quit()
+            print(f"{name:<10} {elapsed:>7.3f} {(site.bytes_served - served) / 1024:>10.0f} "
+                  f"{received / 1024:>8.0f} {blocked:>8} {saved / 1024:>9.0f}")
+    finally:
+        site.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--policies", nargs="+", choices=sorted(POLICIES), default=["off", "default"])
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="Server-side delay per request (s)")
+    parser.add_argument("--image-kb", type=int, default=60, help="Size of each fixture product image")
+    args = parser.parse_args()
+    run(args.policies, args.products, args.latency, args.image_kb)
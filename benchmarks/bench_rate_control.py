@@ -0,0 +1,137 @@
+"""
+Simulate request pacing against the rate-limited fixture site, without a browser.
+
+Worker threads fetch every product page over plain HTTP, each pretending to go
+through one of `--proxies` proxies (the fixture throttles per proxy). Blocked pages
+are put back in the queue, so a pace the site keeps refusing never finishes; such a
+run stops after --max-seconds and reports the pages it got. Strategies:
+
+    fixed     a random sleep after every page, the scraper's old pacing (--fixed-delay)
+    adaptive  one shared rate_control.RateController, as the scraper uses it
+
+Each run reports the wall time to fetch every page, the block pages received, and the
+peak request count against the host in any one second. That peak shows the
+controller's host limit holding. Use --host-rate to set that limit.
+
+    python benchmarks/bench_rate_control.py --products 120 --workers 6 --proxies 3 --limit 2
+"""
+import argparse
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from fixture_site import FixtureSite  # noqa: E402
+from rate_control import RateController  # noqa: E402
+
+
+def fetch(url, proxy):
+    req = urllib.request.Request(url, headers={"X-Fixture-Client": proxy})
+    try:
+        with urllib.request.urlopen(req, timeout=20) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def run(strategy, site, workers, proxies, fixed_delay, host_rate, max_seconds):
+    todo = queue.Queue()
+    for url in site.product_urls():
+        todo.put(url)
+    total = todo.qsize()
+    pacer = RateController(host_rate=host_rate) if strategy == "adaptive" else None
+    sent = deque()
+    lock = threading.Lock()
+    counts = {"ok": 0, "blocked": 0}
+    deadline = time.monotonic() + max_seconds
+
+    def worker(index):
+        proxy = f"proxy-{index % proxies}"
+        while True:
+            with lock:
+                if counts["ok"] >= total or time.monotonic() > deadline:
+                    return
+            try:
+                url = todo.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if pacer is not None:
+                pacer.acquire(proxy, url)
+            with lock:
+                sent.append(time.monotonic())
+            status = fetch(url, proxy)
+            with lock:
+                counts["ok" if status == 200 else "blocked"] += 1
+            if status == 200:
+                if pacer is not None:
+                    pacer.success(proxy, url)
+            else:
+                todo.put(url)
+                if pacer is not None:
+                    pacer.failure(proxy, url, "blocked")
+            if pacer is None:
+                time.sleep(random.uniform(*fixed_delay))
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(workers)]
+    for thr in threads:
+        thr.start()
+    for thr in threads:
+        thr.join()
+    elapsed = time.monotonic() - start
+    peak, times = 0, list(sent)
+    left = 0
+    for right, t in enumerate(times):
+        while times[left] <= t - 1.0:
+            left += 1
+        peak = max(peak, right - left + 1)
+    rates = [b["rate"] for b in pacer.snapshot()["buckets"]] if pacer else []
+    return {
+        "seconds": elapsed,
+        "pages": counts["ok"],
+        "pages_per_sec": counts["ok"] / elapsed,
+        "blocked": counts["blocked"],
+        "peak_per_sec": peak,
+        "final_rates": rates,
+    }
+
+
+def main(args):
+    site = FixtureSite(pages=1, per_page=args.products, latency=(0.02, 0.08),
+                       rate_limit=(args.limit, 1.0)).start()
+    print(f"{args.products} pages, {args.workers} workers over {args.proxies} proxies, "
+          f"site allows {args.limit} req/s per proxy")
+    print(f"{'strategy':<10} {'seconds':>8} {'pages':>6} {'pages/s':>8} {'blocked':>8} {'peak/s':>7}  final rates")
+    try:
+        for strategy in args.strategies:
+            result = run(strategy, site, args.workers, args.proxies, args.fixed_delay, args.host_rate,
+                         args.max_seconds)
+            rates = " ".join(f"{r:.2f}" for r in result["final_rates"])
+            print(f"{strategy:<10} {result['seconds']:>8.1f} {result['pages']:>6} {result['pages_per_sec']:>8.2f} "
+                  f"{result['blocked']:>8} {result['peak_per_sec']:>7}  {rates}")
+            if strategy == "adaptive" and result["peak_per_sec"] > args.host_rate + 4:
+                print(f"  host limit exceeded: {result['peak_per_sec']} requests in one second")
+            # Let the fixture's throttling window clear between strategies
+            time.sleep(1.5)
+    finally:
+        site.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strategies", nargs="+", choices=("fixed", "adaptive"), default=["fixed", "adaptive"])
+    parser.add_argument("--products", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=6)
+    parser.add_argument("--proxies", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=2, help="Requests per second the site allows per proxy")
+    parser.add_argument("--fixed-delay", type=float, nargs=2, default=(1.0, 3.0), metavar=("LOW", "HIGH"))
+    parser.add_argument("--host-rate", type=float, default=4.0, help="The controller's cap on the whole host")
+    parser.add_argument("--max-seconds", type=float, default=90.0, help="Give up on a strategy after this long")
+    main(parser.parse_args())
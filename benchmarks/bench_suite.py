@@ -0,0 +1,266 @@
+"""
+End-to-end benchmark suite against the local fixture site. Needs Chrome, like the scraper.
+
+Three scenarios run against the same site:
+  extract   extract_product_data on product pages already loaded in a browser
+  category  scrape_category over every listing page
+  job       scraper_job, listing and product stages together
+
+Each reports pages/sec, p50/p95 per-page latency, peak RSS and the DB write rate. Every
+run is appended to benchmarks/results/history.jsonl tagged with the git revision and
+compared with the previous run of the same scenario and settings, so a slowdown shows up
+as a REGRESSION line.
+
+    python benchmarks/bench_suite.py --pages 5 --per-page 20 --latency 0.02 0.08
+    python benchmarks/bench_suite.py --scenarios job --captcha-every 40 --recorded
+    python benchmarks/bench_suite.py --history
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_PATH = os.path.join(BENCH_DIR, "results", "history.jsonl")
+# A change worse than this against the previous run is reported as a regression
+REGRESSION_THRESHOLD = 0.10
+SCENARIOS = ("extract", "category", "job")
+
+sys.path.insert(0, os.path.join(REPO_DIR, "app"))
+sys.path.insert(0, BENCH_DIR)
+# main.py keeps shein_scraper.db in the working directory; benchmark runs use a scratch one
+os.chdir(tempfile.mkdtemp(prefix="shein-bench-"))
+
+import main  # noqa: E402
+from fixture_site import FixtureSite, recorded_product_pages  # noqa: E402
+from rate_control import RateController  # noqa: E402
+
+
+class PageTimer:
+    """Stands in for a main.* function and records one latency sample per call"""
+
+    def __init__(self, name):
+        self.name = name
+        self.original = getattr(main, name)
+        self.samples = []
+        setattr(main, name, self)
+
+    def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self.original(*args, **kwargs)
+        finally:
+            self.samples.append(time.perf_counter() - start)
+
+    def restore(self):
+        setattr(main, self.name, self.original)
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def peak_rss_mb():
+    """High-water resident memory of this process plus exited children (browsers), in MB"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(kb / 1024, 1)
+
+
+def git_revision():
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_DIR,
+                               capture_output=True, text=True).stdout.strip()
+        return rev + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def measure(scenario, run, timers):
+    """Run one scenario and turn its page samples and metric deltas into a result row"""
+    before = main.METRICS.snapshot()
+    start = time.perf_counter()
+    extra = run() or {}
+    elapsed = time.perf_counter() - start
+    for timer in timers:
+        timer.restore()
+    samples = [s for timer in timers for s in timer.samples]
+    counters = main.METRICS.summary_since(before)["counters"]
+    rows = counters.get("db_rows_written_total", 0)
+    return {
+        "scenario": scenario,
+        "pages": len(samples),
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(len(samples) / elapsed, 3) if elapsed else 0.0,
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 1),
+        "peak_rss_mb": peak_rss_mb(),
+        "db_rows_per_sec": round(rows / elapsed, 1) if elapsed else 0.0,
+        "captcha_hits": sum(v for k, v in counters.items() if k.startswith("captcha_hits_total")),
+        **extra,
+    }
+
+
+def run_extract(site, limit):
+    timer = PageTimer("extract_product_data")
+    driver = main.DRIVER_POOL.acquire(None)
+
+    def run():
+        extracted = 0
+        try:
+            for url in site.product_urls()[:limit]:
+                driver.get(url)
+                if main.extract_product_data(driver).get("title"):
+                    extracted += 1
+        finally:
+            main.DRIVER_POOL.release(driver, pages=limit)
+        return {"with_title": extracted}
+
+    return measure("extract", run, [timer])
+
+
+def run_category(site, workers):
+    timer = PageTimer("load_listing_page")
+    driver = main.DRIVER_POOL.acquire(None)
+
+    def run():
+        writer = main.start_product_writer()
+        try:
+            links = main.scrape_category(site.category_url(), driver, workers=workers)
+        finally:
+            main.stop_product_writer(writer)
+            main.DRIVER_POOL.release(driver, pages=1)
+        return {"links": len(links)}
+
+    return measure("category", run, [timer])
+
+
+def run_job(site, workers, fetch_mode):
+    timers = [PageTimer("load_listing_page"), PageTimer("scrape_product")]
+
+    def run():
+        main.scraper_job([site.category_url()], use_proxies=False, workers=workers, freshness_hours=0,
+                         fetch_mode=fetch_mode)
+        snapshot = main.status_snapshot()
+        return {"status": snapshot["status"], "products": snapshot["products_scraped"]}
+
+    return measure("job", run, timers)
+
+
+def load_history():
+    if not os.path.exists(RESULTS_PATH):
+        return []
+    with open(RESULTS_PATH, encoding="utf8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(result, history):
+    """Print the change against the previous run with the same scenario and settings"""
+    previous = [r for r in history if r["scenario"] == result["scenario"] and r["settings"] == result["settings"]]
+    if not previous:
+        return
+    prev = previous[-1]
+    changes = []
+    for key, higher_is_better in (("pages_per_sec", True), ("p50_ms", False), ("p95_ms", False),
+                                  ("db_rows_per_sec", True)):
+        old, new = prev.get(key) or 0, result.get(key) or 0
+        if not old:
+            continue
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        flag = " REGRESSION" if worse > REGRESSION_THRESHOLD else ""
+        changes.append(f"{key} {change:+.0%}{flag}")
+    print(f"  vs {prev['revision']}: " + ", ".join(changes))
+
+
+def print_history(history):
+    print(f"{'revision':<14} {'scenario':<9} {'pages':>6} {'pages/sec':>10} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'rss MB':>8} {'rows/s':>8}")
+    for r in history:
+        print(f"{r['revision']:<14} {r['scenario']:<9} {r['pages']:>6} {r['pages_per_sec']:>10.2f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['peak_rss_mb'] or 0:>8.1f} {r['db_rows_per_sec']:>8.1f}")
+
+
+def run(args):
+    settings = {
+        "pages": args.pages, "per_page": args.per_page, "latency": args.latency,
+        "missing_every": args.missing_every, "captcha_every": args.captcha_every,
+        "recorded": args.recorded, "workers": args.workers, "fetch_mode": args.fetch_mode,
+        "delay_scale": args.delay_scale, "pace": args.pace,
+    }
+    latency = tuple(args.latency) if len(args.latency) == 2 else args.latency[0]
+    site = FixtureSite(pages=args.pages, per_page=args.per_page, latency=latency,
+                       missing_every=args.missing_every, captcha_every=args.captcha_every,
+                       product_pages=recorded_product_pages() if args.recorded else None).start()
+    original_delay = main.random_human_delay
+    main.random_human_delay = lambda a=1.5, b=4.5: original_delay(a * args.delay_scale, b * args.delay_scale)
+    original_pacer = main.PACER
+    if args.pace == "off":
+        main.PACER = RateController(rate=1000.0, max_rate=1000.0, host_rate=None)
+    history = load_history()
+    revision = git_revision()
+    results = []
+    try:
+        for scenario in args.scenarios:
+            if scenario == "extract":
+                result = run_extract(site, min(args.extract_pages, args.pages * args.per_page))
+            elif scenario == "category":
+                result = run_category(site, args.workers)
+            else:
+                result = run_job(site, args.workers, args.fetch_mode)
+            result.update(revision=revision, timestamp=time.strftime("%Y-%m-%dT%H:%M:%S"), settings=settings)
+            results.append(result)
+            print(f"{scenario:<9} {result['pages']:>5} pages {result['pages_per_sec']:>8.2f}/s  "
+                  f"p50 {result['p50_ms']:.1f} ms  p95 {result['p95_ms']:.1f} ms  "
+                  f"rss {result['peak_rss_mb']} MB  db {result['db_rows_per_sec']} rows/s  "
+                  f"captchas {result['captcha_hits']}")
+            compare(result, history)
+    finally:
+        main.random_human_delay = original_delay
+        main.PACER = original_pacer
+        site.stop()
+    if not args.no_save:
+        os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+        with open(RESULTS_PATH, "a", encoding="utf8") as f:
+            for result in results:
+                f.write(json.dumps(result, sort_keys=True) + "\n")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--pages", type=int, default=5, help="Listing pages (pagination depth)")
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument("--latency", type=float, nargs="+", default=[0.02, 0.08],
+                        help="Server-side delay per request (s), fixed or a LOW HIGH range")
+    parser.add_argument("--missing-every", type=int, default=10, help="Every Nth product page lacks a price")
+    parser.add_argument("--captcha-every", type=int, default=0, help="Every Nth product page is a CAPTCHA")
+    parser.add_argument("--recorded", action="store_true", help="Serve the saved pages in fixtures/products")
+    parser.add_argument("--workers", type=int, default=main.DEFAULT_WORKERS)
+    parser.add_argument("--fetch-mode", choices=("browser", "http"), default="browser")
+    parser.add_argument("--extract-pages", type=int, default=30)
+    parser.add_argument("--delay-scale", type=float, default=0.0,
+                        help="Multiplier applied to random_human_delay pauses")
+    parser.add_argument("--pace", choices=("off", "adaptive"), default="off",
+                        help="Pace page loads with the scraper's own rate controller, or not at all")
+    parser.add_argument("--no-save", action="store_true", help="Don't append this run to the history file")
+    parser.add_argument("--history", action="store_true", help="Print the stored results and exit")
+    args = parser.parse_args()
+    main.init_db()
+    if args.history:
+        print_history(load_history())
+    else:
+        run(args)
@@ -0,0 +1,56 @@
+"""
+Measure scrape_products throughput (pages/sec) against the local fixture site
+for increasing worker counts. Needs Chrome, like the scraper itself.
+
+    python benchmarks/bench_workers.py --workers 1 2 4 8 --products 40
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import main  # noqa: E402
+from fixture_site import FixtureSite  # noqa: E402
+from rate_control import RateController  # noqa: E402
+
+
+def run(worker_counts, products, latency, delay_scale):
+    site = FixtureSite(pages=1, per_page=products, latency=latency).start()
+    if delay_scale != 1.0:
+        original_delay = main.random_human_delay
+        main.random_human_delay = lambda a=1.5, b=4.5: original_delay(a * delay_scale, b * delay_scale)
+    # Measure the workers, not the pacing in front of them
+    main.PACER = RateController(rate=1000.0, max_rate=1000.0, host_rate=None)
+    results = []
+    try:
+        links = site.product_urls()
+        for n in worker_counts:
+            main.job_results().clear()
+            main.set_status(products_scraped=0)
+            start = time.perf_counter()
+            main.scrape_products(links, workers=n)
+            elapsed = time.perf_counter() - start
+            scraped = main.SCRAPER_STATUS["products_scraped"]
+            results.append((n, scraped, elapsed, scraped / elapsed if elapsed else 0.0))
+    finally:
+        site.stop()
+    base = results[0][3] if results and results[0][3] else None
+    print(f"{'workers':>8} {'pages':>6} {'seconds':>9} {'pages/sec':>10} {'speedup':>8}")
+    for n, scraped, elapsed, rate in results:
+        speedup = f"{rate / base:.2f}x" if base else "-"
+        print(f"{n:>8} {scraped:>6} {elapsed:>9.2f} {rate:>10.3f} {speedup:>8}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--products", type=int, default=24)
+    parser.add_argument("--latency", type=float, default=0.2, help="Server-side delay per request (s)")
+    parser.add_argument("--delay-scale", type=float, default=0.1,
+                        help="Multiplier applied to random_human_delay pauses")
+    args = parser.parse_args()
+    main.init_db()
+    run(args.workers, args.products, args.latency, args.delay_scale)
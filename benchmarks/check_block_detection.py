@@ -0,0 +1,126 @@
+"""
+Check the block-page detector against the labelled pages in fixtures/blocks (plus the
+product pages in fixtures/products, all of which are real pages) and time it.
+labels.json gives each page the URL it was served at and whether it is a block page.
+
+Reports precision and recall for block_detection and for the old page_source
+substring scan, along with the signal that decided each page and the per-call
+latency. --live also loads every page in Chrome and times the one-script probe
+against pulling page_source over WebDriver. The URL signal can't be checked that way,
+since the pages are loaded from file://.
+
+    python benchmarks/check_block_detection.py
+    python benchmarks/check_block_detection.py --live
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+
+from block_detection import detect_html  # noqa: E402
+
+BLOCK_DIR = os.path.join(HERE, "fixtures", "blocks")
+PRODUCT_DIR = os.path.join(HERE, "fixtures", "products")
+# What is_captcha_page used to do with the whole page_source
+LEGACY_SUSPECTS = ['captcha', 'bot detection', 'verify', '/captcha/', '/challenge/']
+
+
+def legacy_detect(page_source):
+    text = page_source.lower()
+    return any(word in text for word in LEGACY_SUSPECTS)
+
+
+def load_corpus():
+    with open(os.path.join(BLOCK_DIR, "labels.json"), encoding="utf8") as f:
+        labels = json.load(f)
+    corpus = []
+    for name, label in sorted(labels.items()):
+        path = os.path.join(BLOCK_DIR, name + ".html")
+        with open(path, encoding="utf8") as f:
+            corpus.append((name, path, f.read(), label["url"], label["blocked"]))
+    for path in sorted(glob.glob(os.path.join(PRODUCT_DIR, "*.html"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, encoding="utf8") as f:
+            page_source = f.read()
+        with open(os.path.join(PRODUCT_DIR, name + ".json"), encoding="utf8") as f:
+            url = json.load(f)["url"]
+        corpus.append(("products/" + name, path, page_source, url, False))
+    return corpus
+
+
+def score(predictions):
+    """precision, recall from [(predicted, actual)]"""
+    tp = sum(1 for p, a in predictions if p and a)
+    fp = sum(1 for p, a in predictions if p and not a)
+    fn = sum(1 for p, a in predictions if not p and a)
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    return precision, recall
+
+
+def check(corpus):
+    ours, legacy, failures = [], [], 0
+    print(f"{'page':<30} {'label':>7} {'detector':>9} {'signal':>8} {'legacy':>7}")
+    for name, _, page_source, url, blocked in corpus:
+        verdict = detect_html(page_source, url)
+        old = legacy_detect(page_source)
+        ours.append((bool(verdict.blocked), blocked))
+        legacy.append((old, blocked))
+        mark = "" if bool(verdict.blocked) == blocked else "  <-- wrong"
+        failures += bool(mark)
+        print(f"{name:<30} {str(blocked):>7} {str(bool(verdict.blocked)):>9} {verdict.signal:>8} {str(old):>7}{mark}")
+    for label, predictions in (("block_detection", ours), ("legacy scan", legacy)):
+        precision, recall = score(predictions)
+        print(f"{label:<16} precision {precision:.2f}  recall {recall:.2f}")
+    return failures
+
+
+def time_offline(corpus, rounds):
+    for label, fn in (("block_detection", lambda html, url: detect_html(html, url)),
+                      ("cheap checks only", lambda html, url: detect_html(html, url, cheap_only=True)),
+                      ("legacy scan", lambda html, url: legacy_detect(html))):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for _, _, page_source, url, _ in corpus:
+                fn(page_source, url)
+        per_call = (time.perf_counter() - start) / (rounds * len(corpus))
+        print(f"offline {label:<18} {per_call * 1e6:8.1f} us/call")
+
+
+def time_live(corpus, rounds):
+    import main
+    from block_detection import detect_driver, probe
+    driver = main.get_selenium_driver()
+    try:
+        print(f"{'page':<30} {'probe ms':>9} {'detector ms':>12} {'page_source ms':>15} {'signal':>8}")
+        for name, path, _, _, _ in corpus:
+            driver.get("file://" + path)
+            timings = []
+            for fn in (lambda: probe(driver), lambda: detect_driver(driver),
+                       lambda: legacy_detect(driver.page_source)):
+                start = time.perf_counter()
+                for _ in range(rounds):
+                    fn()
+                timings.append((time.perf_counter() - start) * 1000 / rounds)
+            signal = detect_driver(driver).signal
+            print(f"{name:<30} {timings[0]:>9.2f} {timings[1]:>12.2f} {timings[2]:>15.2f} {signal:>8}")
+    finally:
+        driver.quit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="Time the WebDriver probe too (needs Chrome)")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    pages = load_corpus()
+    failed = check(pages)
+    time_offline(pages, args.rounds)
+    if args.live:
+        time_live(pages, max(1, args.rounds // 20))
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,101 @@
+"""
+Validate the snapshot extractors against the saved product pages in fixtures/products
+and time them. Each <name>.html has a <name>.json holding the page URL and the dict
+extract_product_data is expected to return. Pages with inline goods state are read
+from the JSON payload, the rest fall back to the XPath snapshot. The snapshot
+extractor is also checked on its own against every page without inline state (the
+state pages carry only partial markup).
+
+    python benchmarks/check_extraction.py            # offline check + parse timing
+    python benchmarks/check_extraction.py --live     # also time live vs snapshot in Chrome
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+
+from extraction import extract_from_html, extract_from_state, extract_product_from_html  # noqa: E402
+
+FIXTURE_DIR = os.path.join(HERE, "fixtures", "products")
+
+
+def load_fixtures():
+    for html_path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))):
+        name = os.path.splitext(os.path.basename(html_path))[0]
+        with open(html_path, encoding="utf8") as f:
+            page_source = f.read()
+        with open(os.path.join(FIXTURE_DIR, name + ".json"), encoding="utf8") as f:
+            meta = json.load(f)
+        yield name, html_path, page_source, meta
+
+
+def check(extractor=extract_product_from_html, label="state", skip_state=False):
+    failures = 0
+    for name, _, page_source, meta in load_fixtures():
+        if skip_state and extract_from_state(page_source):
+            continue
+        got = extractor(page_source, base_url=meta["url"])
+        expected = meta["expected"]
+        if got == expected:
+            print(f"ok    {label:<9} {name}")
+            continue
+        failures += 1
+        print(f"FAIL  {label:<9} {name}")
+        for key in expected:
+            if got.get(key) != expected[key]:
+                print(f"      {key}: expected {expected[key]!r}, got {got.get(key)!r}")
+    return failures
+
+
+def time_offline(extractor=extract_product_from_html, label="state", rounds=200):
+    fixtures = list(load_fixtures())
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for _, _, page_source, meta in fixtures:
+            extractor(page_source, base_url=meta["url"])
+    per_page = (time.perf_counter() - start) / (rounds * len(fixtures))
+    print(f"offline parse ({label}): {per_page * 1000:.2f} ms/page over {rounds * len(fixtures)} pages")
+
+
+def state_coverage():
+    with_state = [name for name, _, page_source, _ in load_fixtures() if extract_from_state(page_source)]
+    print(f"inline goods state found in {len(with_state)} fixture(s): {', '.join(with_state) or '-'}")
+
+
+def time_live():
+    import main
+    driver = main.get_selenium_driver()
+    try:
+        modes = ("live", "snapshot", "state")
+        print(f"{'fixture':<16} " + " ".join(f"{m + ' s':>10}" for m in modes) + f" {'same as live':>13}")
+        for name, html_path, _, _ in load_fixtures():
+            timings, outputs = [], []
+            for mode in modes:
+                driver.get("file://" + html_path)
+                start = time.perf_counter()
+                outputs.append(main.extract_product_data(driver, mode=mode))
+                timings.append(time.perf_counter() - start)
+            same = outputs[1] == outputs[0]
+            print(f"{name:<16} " + " ".join(f"{t:>10.2f}" for t in timings) + f" {str(same):>13}")
+    finally:
+        driver.quit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="Compare against the WebDriver path (needs Chrome)")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    failed = check()
+    failed += check(extract_from_html, "snapshot", skip_state=True)
+    state_coverage()
+    time_offline(extract_from_html, "snapshot", rounds=args.rounds)
+    time_offline(rounds=args.rounds)
+    if args.live:
+        time_live()
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,95 @@
+"""
+Exercise the proxy pool against local fake proxies: fast, slow, refusing, silent
+and dead ones. Checks that validation runs concurrently, that only working
+proxies survive, that they are ranked by latency, and that failures evict them.
+
+    python benchmarks/check_proxy_pool.py --fakes 200
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from proxy_pool import ProxyPool  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class FakeProxies:
+    """Serves CONNECT responses on local ports; behaviour is one of ok / slow / refuse / silent"""
+
+    def __init__(self, behaviours, slow_delay=0.4):
+        self.behaviours = behaviours
+        self.slow_delay = slow_delay
+        self.loop = asyncio.new_event_loop()
+        self.addresses = {}
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    async def _serve(self, behaviour):
+        async def handle(reader, writer):
+            await reader.readuntil(b"\r\n\r\n")
+            if behaviour == "silent":
+                await asyncio.sleep(60)
+            if behaviour == "slow":
+                await asyncio.sleep(self.slow_delay)
+            status = b"403 Forbidden" if behaviour == "refuse" else b"200 Connection established"
+            writer.write(b"HTTP/1.1 " + status + b"\r\n\r\n")
+            await writer.drain()
+            writer.close()
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        return server.sockets[0].getsockname()[1]
+
+    def start(self):
+        self.thread.start()
+        for i, behaviour in enumerate(self.behaviours):
+            if behaviour == "dead":
+                port = free_port()
+            else:
+                port = asyncio.run_coroutine_threadsafe(self._serve(behaviour), self.loop).result()
+            self.addresses[f"127.0.0.1:{port}"] = behaviour
+        return self
+
+
+def main(fakes, timeout):
+    kinds = ["ok", "slow", "refuse", "silent", "dead"]
+    proxies = FakeProxies([kinds[i % len(kinds)] for i in range(fakes)]).start()
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ProxyPool(os.path.join(tmp, "proxies.db"), target=("example.test", 443), timeout=timeout)
+        start = time.perf_counter()
+        alive = pool.refresh(list(proxies.addresses))
+        elapsed = time.perf_counter() - start
+        ranked = pool.ranked()
+        behaviours = [proxies.addresses[p] for p in ranked]
+        expected_alive = sum(1 for b in proxies.addresses.values() if b in ("ok", "slow"))
+        print(f"checked {fakes} proxies in {elapsed:.2f}s (timeout {timeout}s each), {alive} alive")
+        assert alive == expected_alive, (alive, expected_alive)
+        assert set(behaviours) <= {"ok", "slow"}
+        assert behaviours == sorted(behaviours, key=lambda b: b != "ok"), "fast proxies must rank first"
+        assert elapsed < timeout * 3, "validation should run concurrently"
+
+        reloaded = ProxyPool(pool.db_path, target=pool.target)
+        assert reloaded.healthy() == alive, "healthy proxies should be cached across runs"
+
+        best = pool.best()
+        for _ in range(pool.max_failures):
+            pool.report_failure(best)
+        assert best not in pool.ranked(), "failing proxy should be evicted"
+        print("ok")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fakes", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=1.5)
+    args = parser.parse_args()
+    main(args.fakes, args.timeout)
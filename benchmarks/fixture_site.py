@@ -0,0 +1,270 @@
+"""
+Local stand-in for the Shein category and product pages, used by the benchmarks.
+
+The markup mirrors the selectors in XPATHS so the real scraping code runs unchanged
+against it. Run directly to browse it: python benchmarks/fixture_site.py --port 8765
+"""
+import argparse
+import glob
+import os
+import random
+import threading
+import time
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+CATEGORY_PAGE = """<!DOCTYPE html>
+<html><head><title>Fixture Category {page}</title></head>
+<body>
+<div class="product-list">
+{links}
+</div>
+<div class="sui-pagination__center">
+{numbers}
+</div>
+{next_btn}
+</body></html>
+"""
+
+PRODUCT_PAGE = """<!DOCTYPE html>
+<html><head><title>Fixture Product {goods_id}</title></head>
+<body>
+<div class="product-intro">
+  <h1 class="product-intro__head-name">Fixture Product {goods_id}</h1>
+  <div class="from original"><span>R{price}.00</span></div>
+  <img class="lazyload crop-image-container__img" src="/img/{goods_id}-1.webp">
+  <img class="lazyload crop-image-container__img" src="/img/{goods_id}-2.webp">
+  <div class="product-intro__size">
+    <p class="product-intro__sizes-item-text--one">S</p>
+    <p class="product-intro__sizes-item-text--one">M</p>
+    <p class="product-intro__sizes-item-text--one">L</p>
+  </div>
+  <div class="product-intro__description">
+    <span class="head-icon">+</span>
+  </div>
+  <div class="product-intro__description-table">
+    <div class="product-intro__description-table-item"><div class="key">Material:</div><div class="val">Polyester</div></div>
+    <div class="product-intro__description-table-item"><div class="key">Style:</div><div class="val">Casual</div></div>
+  </div>
+</div>
+<div class="goods-color__radio-container">
+  <div class="goods-color__radio_block">Black</div>
+  <div class="goods-color__radio_block">White</div>
+</div>
+</body></html>
+"""
+
+
+CAPTCHA_PAGE = """<!DOCTYPE html>
+<html><head><title>Verify you are human</title></head>
+<body><div id="captcha-container" class="geetest_panel">Please complete the captcha to continue</div></body></html>
+"""
+
+ERROR_PAGE = """<!DOCTYPE html>
+<html><head><title>503 Service Unavailable</title></head><body><h1>Service Unavailable</h1></body></html>
+"""
+
+RECORDED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "products")
+
+
+def recorded_product_pages(directory=RECORDED_DIR):
+    """The saved pages in fixtures/products (including the empty one), for FixtureSite(product_pages=...)"""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        with open(path, encoding="utf8") as f:
+            pages.append(f.read())
+    return pages
+
+
+class FixtureSite:
+    """
+    Threaded HTTP server serving `pages` category pages of `per_page` products each.
+
+    `latency` is a fixed per-request delay, or a (low, high) range drawn uniformly.
+    `captcha_every` serves every Nth product page as a CAPTCHA page and `captcha_pages`
+    does the same for the listed category page numbers. `product_pages` replaces the
+    generated product markup with recorded HTML, picked by goods id.
+
+    `rate_limit` = (requests, seconds) throttles each client to that many page requests
+    per sliding window. A client over the limit gets the CAPTCHA page with a 429. Clients
+    are told apart by the X-Fixture-Client header (to simulate proxies), else by address.
+
+    `tracking_params` adds Shein-style src_*/scici parameters to listing links (different
+    on every page), and `overlap` repeats that many products of the next page on each
+    page, so the same goods id shows up under several URLs.
+
+    `flaky` = (every, times) answers every Nth product page (and category page N, 2N, ...)
+    with a 503 error page the first `times` times it is requested, to exercise retries.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, pages=3, per_page=20, latency=0.0, missing_every=0,
+                 captcha_every=0, captcha_pages=(), product_pages=None, image_bytes=0, rate_limit=None,
+                 tracking_params=False, overlap=0, flaky=None):
+        self.pages = pages
+        self.per_page = per_page
+        self.latency = latency
+        # Every Nth product page is served without its price block (0 = never)
+        self.missing_every = missing_every
+        self.captcha_every = captcha_every
+        self.captcha_pages = set(captcha_pages)
+        self.product_pages = product_pages or []
+        # Size of the dummy body served for /img/* requests (0 = 404, like before)
+        self.image_bytes = image_bytes
+        self.rate_limit = rate_limit
+        self.tracking_params = tracking_params
+        self.overlap = overlap
+        self.flaky = flaky
+        self.failures = {}
+        self.recent = {}
+        self.lock = threading.Lock()
+        self.throttled = 0
+        self.bytes_served = 0
+        self.hits = 0
+        self.captchas_served = 0
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                site.hits += 1
+                delay = random.uniform(*site.latency) if isinstance(site.latency, tuple) else site.latency
+                if delay:
+                    time.sleep(delay)
+                headers = {}
+                if site.image_bytes and self.path.startswith("/img/"):
+                    # Every image has the same body (so they dedupe) and a stable validator
+                    headers["ETag"] = f'"{site.image_bytes}"'
+                    if self.headers.get("If-None-Match") == headers["ETag"]:
+                        self.send_response(304)
+                        self.send_header("ETag", headers["ETag"])
+                        self.end_headers()
+                        return
+                    payload, content_type, status = b"\0" * site.image_bytes, "image/webp", 200
+                elif site.throttle(self.headers.get("X-Fixture-Client") or self.client_address[0]):
+                    payload, content_type, status = CAPTCHA_PAGE.encode("utf8"), "text/html; charset=utf-8", 429
+                else:
+                    body, status = site.render(self.path)
+                    payload, content_type = body.encode("utf8"), "text/html; charset=utf-8"
+                site.bytes_served += len(payload)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def category_url(self):
+        return f"{self.base_url}/Fixture-Category-c-1.html"
+
+    def product_urls(self):
+        total = self.pages * self.per_page
+        return [f"{self.base_url}/fixture-product-p-{i}.html" for i in range(1, total + 1)]
+
+    def throttle(self, client):
+        """Record a page request from `client`; True when it is over the rate limit"""
+        if not self.rate_limit:
+            return False
+        limit, window = self.rate_limit
+        now = time.monotonic()
+        with self.lock:
+            times = self.recent.setdefault(client, deque())
+            while times and times[0] <= now - window:
+                times.popleft()
+            times.append(now)
+            if len(times) > limit:
+                self.throttled += 1
+                return True
+        return False
+
+    def fail_once_more(self, key, number):
+        """True while page `key` (numbered `number`) is still due one of its flaky failures"""
+        if not self.flaky or number % self.flaky[0]:
+            return False
+        with self.lock:
+            served = self.failures.get(key, 0)
+            self.failures[key] = served + 1
+        return served < self.flaky[1]
+
+    def render(self, path):
+        parsed = urlparse(path)
+        if parsed.path.endswith("-c-1.html"):
+            page = int(parse_qs(parsed.query).get("page", ["1"])[0])
+            if self.fail_once_more(("category", page), page):
+                return ERROR_PAGE, 503
+            if page in self.captcha_pages:
+                self.captchas_served += 1
+                return CAPTCHA_PAGE, 200
+            return self.render_category(page), 200
+        if "-p-" in parsed.path:
+            goods_id = parsed.path.rsplit("-p-", 1)[1].split(".")[0]
+            if self.fail_once_more(("product", goods_id), int(goods_id)):
+                return ERROR_PAGE, 503
+            if self.captcha_every and int(goods_id) % self.captcha_every == 0:
+                self.captchas_served += 1
+                return CAPTCHA_PAGE, 200
+            if self.product_pages:
+                page = self.product_pages[int(goods_id) % len(self.product_pages)]
+            else:
+                page = PRODUCT_PAGE.format(goods_id=goods_id, price=100 + int(goods_id) % 400)
+            if self.missing_every and int(goods_id) % self.missing_every == 0:
+                page = page.replace('<div class="from original">', '<div class="price-pending">')
+            return page, 200
+        return "<html><body>not found</body></html>", 404
+
+    def render_category(self, page):
+        first = (page - 1) * self.per_page + 1
+        total = self.pages * self.per_page
+        query = f"?src_module=list&src_identifier=page{page}&scici=c-1-{page}" if self.tracking_params else ""
+        links = "\n".join(
+            f'<a class="goods-item__link" href="{self.base_url}/fixture-product-p-{i}.html{query}">Product {i}</a>'
+            for i in range(first, min(total, first + self.per_page + self.overlap - 1) + 1)
+        ) if 1 <= page <= self.pages else ""
+        numbers = "\n".join(
+            f'<span class="sui-pagination__inner">{n}</span>' for n in range(1, self.pages + 1)
+        )
+        next_btn = (
+            f'<a href="?page={page + 1}"><span aria-label="Page Next">&gt;</span></a>'
+            if page < self.pages else ""
+        )
+        return CATEGORY_PAGE.format(page=page, links=links, numbers=numbers, next_btn=next_btn)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--captcha-every", type=int, default=0)
+    parser.add_argument("--recorded", action="store_true", help="Serve the saved pages in fixtures/products")
+    args = parser.parse_args()
+    site = FixtureSite(port=args.port, pages=args.pages, per_page=args.per_page, latency=args.latency,
+                       captcha_every=args.captcha_every,
+                       product_pages=recorded_product_pages() if args.recorded else None)
+    print(f"Serving fixture site on {site.base_url}")
+    try:
+        site.server.serve_forever()
+    except KeyboardInterrupt:
+        pass